@@ -0,0 +1,105 @@
+"""زمن إكمال أسماء العملاء من الفهرس في الذاكرة
+
+    python benchmarks/autocomplete.py --clients 100000 --projects 1000000
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DB = os.path.join(ROOT, 'src', 'database', 'app.db')
+
+PREFIXES = ('', 'ش', 'شر', 'شركه', 'شركة ال', 'مؤسسة البناء', 'الذهب', 'العتيبي', 'مكتب الهندسة الراقية', 'غير موجود')
+
+
+def populate(db_path, clients, projects, seed):
+    sys.path.insert(0, ROOT)
+    from src.services.datagen import CLIENT_KINDS, CLIENT_NAMES, CLIENT_QUALIFIERS, LAST_NAMES
+    rng = random.Random(seed)
+    names = list({
+        f'{rng.choice(CLIENT_KINDS)} {rng.choice(LAST_NAMES)} {rng.choice(CLIENT_NAMES)} '
+        f'{rng.choice(CLIENT_QUALIFIERS)} {index}'
+        for index in range(clients)
+    })
+    weights = [1.0 / (rank + 1) for rank in range(len(names))]
+    start = date.today() - timedelta(days=3 * 365)
+    connection = sqlite3.connect(db_path)
+    with connection:
+        connection.executemany(
+            'INSERT INTO projects (employee_id, client_name, project_value, product_type, signature_date, '
+            'is_from_social_media, marketing_cost_allocated) VALUES (1, ?, 1000, ?, ?, 0, 0)',
+            (
+                (name, 'خشب', (start + timedelta(days=rng.randrange(3 * 365))).isoformat())
+                for name in rng.choices(names, weights=weights, k=projects)
+            )
+        )
+    connection.close()
+    return len(names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=100000)
+    parser.add_argument('--projects', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='autocomplete-bench-')
+    try:
+        db_path = os.path.join(workdir, 'app.db')
+        shutil.copy(SOURCE_DB, db_path)
+        started = time.perf_counter()
+        distinct = populate(db_path, args.clients, args.projects, args.seed)
+        print(f'populated {args.projects} projects / {distinct} clients in {time.perf_counter() - started:.1f}s')
+
+        os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+        os.environ['PERF_PROFILER_ENABLED'] = '0'
+        from src.main import app
+        from src.services.autocomplete import client_autocomplete
+
+        with app.app_context():
+            started = time.perf_counter()
+            client_autocomplete.rebuild()
+            print(f'index build: {time.perf_counter() - started:.2f}s {client_autocomplete.stats()}')
+
+        client = app.test_client()
+        print(f"{'prefix':<22} {'hits':>5} {'lookup p50/p99 us':>18} {'api p50/p99 ms':>15}")
+        for prefix in PREFIXES:
+            lookups = []
+            for _ in range(args.repeat):
+                begin = time.perf_counter()
+                items = client_autocomplete.lookup(prefix, 10)
+                lookups.append(time.perf_counter() - begin)
+            calls = []
+            for _ in range(args.repeat // 4):
+                begin = time.perf_counter()
+                client.get('/api/clients/autocomplete', query_string={'q': prefix})
+                calls.append(time.perf_counter() - begin)
+            lookups.sort()
+            calls.sort()
+            print(f'{prefix:<22} {len(items):>5} '
+                  f'{statistics.median(lookups) * 1e6:>8.0f}/{lookups[int(len(lookups) * 0.99)] * 1e6:<9.0f} '
+                  f'{statistics.median(calls) * 1000:>7.2f}/{calls[int(len(calls) * 0.99)] * 1000:<7.2f}')
+
+        # تحديث تدريجي: إنشاء مشروع ثم ظهوره في أول النتائج
+        begin = time.perf_counter()
+        response = client.post('/api/projects', json={
+            'employee_id': 1, 'client_name': 'شركة الاختبار للقياس', 'project_value': 1000,
+            'product_type': 'خشب', 'signature_date': date.today().isoformat()
+        })
+        print(f'create project: {response.status_code} in {(time.perf_counter() - begin) * 1000:.1f} ms; '
+              f"'شركة الاختبار' -> {client_autocomplete.lookup('شركة الاختبار', 1)}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
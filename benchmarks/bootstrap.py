@@ -0,0 +1,77 @@
+"""زمن تحميل لوحة الإدارة: طلبات منفصلة مقابل طلب التهيئة الواحد
+
+    python benchmarks/bootstrap.py --employees 500
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DB = os.path.join(ROOT, 'src', 'database', 'app.db')
+
+RESOURCES = ('users', 'teams', 'kpis', 'employees')
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--employees', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bootstrap-bench-')
+    try:
+        db_path = os.path.join(workdir, 'app.db')
+        shutil.copy(SOURCE_DB, db_path)
+        os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+        os.environ['PERF_PROFILER_ENABLED'] = '0'
+        sys.path.insert(0, ROOT)
+        from src.main import app
+        from src.models.user import db
+        from src.models.auth import User, UserSession
+        from src.services.datagen import generate_data
+
+        with app.app_context():
+            generate_data(teams=10, employees_per_team=args.employees // 10, months=1,
+                          projects_per_rep=1, seed=5, replace=True)
+            admin = User.query.filter_by(role='admin').first()
+            db.session.add(UserSession(user_id=admin.id, session_token='bench-token', is_active=True,
+                                       expires_at=datetime.utcnow() + timedelta(hours=1)))
+            db.session.commit()
+
+        client = app.test_client()
+        headers = {'Authorization': 'Bearer bench-token'}
+        paths = {'users': '/api/auth/users', 'teams': '/api/admin/teams',
+                 'kpis': '/api/admin/kpis', 'employees': '/api/admin/employees'}
+        query = f"/api/admin/bootstrap?resources={','.join(RESOURCES)}"
+
+        client.get(query, headers=headers)
+        separate = timed(lambda: [client.get(paths[name], headers=headers) for name in RESOURCES], args.repeat)
+        combined = timed(lambda: client.get(query, headers=headers), args.repeat)
+        body = client.get(query, headers=headers).get_json()['resources']
+        etags = ','.join(f"{name}:{item['etag']}" for name, item in body.items())
+        revalidate = timed(lambda: client.get(f'{query}&etags={etags}', headers=headers), args.repeat)
+        size = len(client.get(f'{query}&etags={etags}', headers=headers).data)
+
+        print(f"{'separate requests x4':<26} {separate:>8.2f} ms")
+        print(f"{'bootstrap':<26} {combined:>8.2f} ms")
+        print(f"{'bootstrap, all unchanged':<26} {revalidate:>8.2f} ms ({size} bytes)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
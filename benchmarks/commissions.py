@@ -0,0 +1,68 @@
+"""زمن حساب العمولات المتكرر مع بصمات المدخلات
+
+    python benchmarks/commissions.py --employees 500 --projects 200000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DB = os.path.join(ROOT, 'src', 'database', 'app.db')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--employees', type=int, default=500)
+    parser.add_argument('--projects', type=int, default=200000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='commissions-bench-')
+    try:
+        db_path = os.path.join(workdir, 'app.db')
+        shutil.copy(SOURCE_DB, db_path)
+        os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+        os.environ['PERF_PROFILER_ENABLED'] = '0'
+        sys.path.insert(0, ROOT)
+        from sqlalchemy import event
+        from src.main import app
+        from src.models.user import db
+        from src.models.sales import Project
+        from src.routes.sales import run_commission_calculation
+        from src.services.datagen import generate_data
+
+        year, month = 2024, 6
+        with app.app_context():
+            generate_data(teams=10, employees_per_team=args.employees // 10, months=1, start_year=year,
+                          start_month=month, projects_per_rep=max(1, args.projects // args.employees),
+                          seed=11, replace=True)
+
+            def run(label):
+                writes = []
+
+                def listener(conn, cursor, statement, *_):
+                    if statement.lstrip().upper().startswith(('INSERT', 'UPDATE')):
+                        writes.append(statement)
+
+                event.listen(db.engine, 'before_cursor_execute', listener)
+                started = time.perf_counter()
+                stats = run_commission_calculation(month, year)['stats']
+                elapsed = (time.perf_counter() - started) * 1000
+                event.remove(db.engine, 'before_cursor_execute', listener)
+                print(f"{label:<24} {elapsed:>9.1f} ms  computed={stats['computed']:<5} "
+                      f"unchanged={stats['unchanged']:<5} updated={stats['updated']:<5} write statements={len(writes)}")
+
+            run('first run')
+            run('repeat, no changes')
+            project = Project.query.first()
+            project.project_value += 1000
+            db.session.commit()
+            run('repeat, one project')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""حجم البيانات المرسلة وكلفة المعالج لضغط استجابات JSON حسب الحجم والمستوى
+
+الحمولة صفوف بشكل استجابة /api/projects مولدة ببذرة ثابتة.
+
+    python benchmarks/compression.py --rows 10 100 1000 10000 100000 --levels 1 6 9
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.services.compression import gzip_bytes, gzip_stream  # noqa: E402
+from src.services.datagen import CLIENT_KINDS, CLIENT_NAMES, FIRST_NAMES, LAST_NAMES, PRODUCT_TYPES  # noqa: E402
+
+
+def project_rows(count, seed=1):
+    rng = random.Random(seed)
+    rows = []
+    for index in range(count):
+        product_type = rng.choice(PRODUCT_TYPES)
+        rows.append({
+            'id': index + 1,
+            'employee_id': rng.randint(1, 200),
+            'employee_name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'client_name': f'{rng.choice(CLIENT_KINDS)} {rng.choice(CLIENT_NAMES)}',
+            'project_value': round(rng.lognormvariate(11.3, 0.6), -2),
+            'product_type': product_type,
+            'signature_date': date(2024, rng.randint(1, 12), rng.randint(1, 28)).isoformat(),
+            'is_from_social_media': rng.random() < 0.3,
+            'marketing_cost_allocated': round(rng.uniform(0, 5000), 2),
+            'commission_rate': None,
+            'final_commission': None,
+            'notes': f'مشروع تجريبي - {product_type}'
+        })
+    return rows
+
+
+def timed(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 6, 9])
+    parser.add_argument('--chunk-rows', type=int, default=500, help='صفوف كل قطعة في الضغط المتدفق')
+    args = parser.parse_args()
+
+    print(f"{'rows':>7} {'raw KB':>9} {'level':>5} {'gzip KB':>9} {'ratio':>6} {'ms':>8} {'MB/s':>7} {'stream KB':>10} {'stream ms':>10}")
+    for count in args.rows:
+        rows = project_rows(count)
+        body = json.dumps(rows, ensure_ascii=False).encode('utf-8')
+        chunks = [
+            json.dumps(rows[i:i + args.chunk_rows], ensure_ascii=False).encode('utf-8')
+            for i in range(0, count, args.chunk_rows)
+        ]
+        repeat = max(1, min(50, 2_000_000 // max(len(body), 1)))
+        for level in args.levels:
+            seconds, compressed = timed(lambda: gzip_bytes(body, level), repeat)
+            stream_seconds, streamed = timed(lambda: b''.join(gzip_stream(iter(chunks), level)), repeat)
+            print(
+                f'{count:>7} {len(body) / 1024:>9.1f} {level:>5} {len(compressed) / 1024:>9.1f} '
+                f'{len(body) / len(compressed):>6.1f} {seconds * 1000:>8.2f} '
+                f'{len(body) / seconds / 1e6:>7.0f} {len(streamed) / 1024:>10.1f} {stream_seconds * 1000:>10.2f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
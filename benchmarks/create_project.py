@@ -0,0 +1,94 @@
+"""إنشاء المشاريع من عدة عمليات كتابة متزامنة: الزمن ومعاملات الكتابة لكل طلب
+
+    python benchmarks/create_project.py --writers 4 --requests 100
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DB = os.path.join(ROOT, 'src', 'database', 'app.db')
+
+
+def writer(args):
+    """عملية كتابة واحدة: تعيد أزمنة طلباتها وعدد معاملات الكتابة وحالات الفشل"""
+    seed, requests, employee_ids, months = args
+    from sqlalchemy import event
+    from src.main import app
+    from src.models.user import db
+
+    begins = []
+    with app.app_context():
+        event.listen(db.engine, 'begin', lambda connection: begins.append(1))
+
+    rng = random.Random(seed)
+    client = app.test_client()
+    latencies, failures = [], 0
+    for index in range(requests):
+        year, month = rng.choice(months)
+        started = time.perf_counter()
+        response = client.post('/api/projects', json={
+            'employee_id': rng.choice(employee_ids),
+            'client_name': f'عميل {seed}-{index}',
+            'project_value': rng.randint(10, 500) * 1000,
+            'product_type': 'حديد إنشائي',
+            'signature_date': f'{year}-{month:02d}-{rng.randint(1, 28):02d}',
+            'is_from_social_media': rng.random() < 0.3
+        })
+        latencies.append(time.perf_counter() - started)
+        if response.status_code != 201:
+            failures += 1
+    return latencies, len(begins), failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=100, help='طلبات لكل عملية')
+    parser.add_argument('--projects', type=int, default=100000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='create-project-bench-')
+    try:
+        db_path = os.path.join(workdir, 'app.db')
+        shutil.copy(SOURCE_DB, db_path)
+        os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+        os.environ['PERF_PROFILER_ENABLED'] = '0'
+        sys.path.insert(0, ROOT)
+        from src.main import app
+        from src.models.sales import Employee
+        from src.services.datagen import generate_data
+
+        months = [(2024, month) for month in range(1, 13)]
+        with app.app_context():
+            generate_data(teams=10, employees_per_team=20, months=12, start_year=2024, start_month=1,
+                          projects_per_rep=max(1, args.projects // (200 * 12)), seed=7, replace=True)
+            employee_ids = [employee.id for employee in Employee.query.filter_by(role='sales_rep')]
+
+        for writers in sorted({1, args.writers}):
+            jobs = [(seed, args.requests, employee_ids, months) for seed in range(writers)]
+            started = time.perf_counter()
+            with multiprocessing.get_context('fork').Pool(writers) as pool:
+                results = pool.map(writer, jobs)
+            elapsed = time.perf_counter() - started
+
+            latencies = sorted(sample for samples, _, _ in results for sample in samples)
+            total = len(latencies)
+            transactions = sum(begins for _, begins, _ in results)
+            failures = sum(failed for _, _, failed in results)
+            print(f'writers={writers:<3} {total / elapsed:>7.1f} req/s  '
+                  f'p50={statistics.median(latencies) * 1000:>7.1f} ms  '
+                  f'p95={latencies[int(total * 0.95) - 1] * 1000:>7.1f} ms  '
+                  f'write transactions/request={transactions / total:.2f}  failures={failures}')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""زمن الاستعلامات الثقيلة مع مهلة القراءة وكلفة فحصها على الاستعلامات العادية
+
+    python benchmarks/deadlines.py --projects 1000000 --deadline 0.5
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DB = os.path.join(ROOT, 'src', 'database', 'app.db')
+
+
+def timed(func, repeat):
+    samples, statuses = [], set()
+    for _ in range(repeat):
+        started = time.perf_counter()
+        statuses.add(func().status_code)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000, sorted(statuses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--projects', type=int, default=1000000)
+    parser.add_argument('--deadline', type=float, default=0.5, help='مهلة مخطط sales بالثواني')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='deadlines-bench-')
+    try:
+        db_path = os.path.join(workdir, 'app.db')
+        shutil.copy(SOURCE_DB, db_path)
+        os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+        os.environ['PERF_PROFILER_ENABLED'] = '0'
+        sys.path.insert(0, ROOT)
+        from sqlalchemy import event
+        from src.main import app
+        from src.models.user import db
+        from src.models.sales import Employee
+        from src.services.datagen import generate_data
+        from src.services.deadlines import query_deadlines
+
+        reps = 200
+        with app.app_context():
+            generate_data(teams=10, employees_per_team=reps // 10 + 1, months=12, start_year=2024, start_month=1,
+                          projects_per_rep=max(1, args.projects // (reps * 12)), seed=13, replace=True)
+            employee_id = Employee.query.filter_by(role='sales_rep').first().id
+            engines = list(db.engines.values())
+
+        def without_handler(dbapi_connection, connection_record, connection_proxy):
+            dbapi_connection.set_progress_handler(None, 0)
+
+        client = app.test_client()
+        cases = (
+            ('unfiltered /api/projects', lambda: client.get('/api/projects')),
+            ('one employee-month', lambda: client.get('/api/projects', query_string={
+                'employee_id': employee_id, 'month': 6, 'year': 2024})),
+        )
+        modes = (('no progress handler', None), ('handler, no deadline', {}),
+                 (f'deadline {args.deadline}s', {'sales': args.deadline}))
+
+        print(f"{'request':<26} {'mode':<22} {'median ms':>10} {'status':>8}")
+        for label, request in cases:
+            for mode, deadlines in modes:
+                if deadlines is None:
+                    for engine in engines:
+                        event.listen(engine, 'checkout', without_handler)
+                else:
+                    query_deadlines.deadlines = deadlines
+                try:
+                    elapsed, statuses = timed(request, args.repeat)
+                finally:
+                    for engine in engines:
+                        if event.contains(engine, 'checkout', without_handler):
+                            event.remove(engine, 'checkout', without_handler)
+                print(f"{label:<26} {mode:<22} {elapsed:>10.1f} {','.join(map(str, statuses)):>8}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""قياس زمن استجابة المسارات الرئيسية وإنتاجيتها على بيانات بأحجام مختلفة
+
+لكل حجم تُنشأ نسخة مؤقتة من قاعدة البيانات وتُملأ بمولد البيانات التجريبية
+(بذرة ثابتة)، ثم يُستدعى كل مسار عبر عميل اختبار Flask في خيط واحد ثم
+بمجمع خيوط. تُسجل النسب المئوية p50/p95/p99 والإنتاجية.
+
+    python benchmarks/endpoints.py --sizes 1k 100k --save-baseline /tmp/baseline.json
+    python benchmarks/endpoints.py --sizes 1k 100k --baseline /tmp/baseline.json --tolerance 0.25
+
+عند المقارنة بخط أساس يخرج البرنامج بالرمز 1 إذا تراجع أي قياس أكثر من
+نسبة السماح (p95 أبطأ، أو إنتاجية أقل، أو أخطاء أكثر).
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DB = os.path.join(ROOT, 'src', 'database', 'app.db')
+
+# معاملات المولد لكل حجم (عدد المشاريع = المناديب × الأشهر × مشاريع المندوب)
+SIZES = {
+    '1k': {'teams': 2, 'employees_per_team': 6, 'months': 4, 'projects_per_rep': 25},
+    '100k': {'teams': 5, 'employees_per_team': 11, 'months': 10, 'projects_per_rep': 200},
+    '1m': {'teams': 10, 'employees_per_team': 21, 'months': 10, 'projects_per_rep': 500},
+}
+SEED = 2024
+ADMIN = {'username': 'admin', 'password': 'admin123'}
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def build_scenarios(app, year, month):
+    """(الاسم، نوع الحمل، دالة الطلب) لكل مسار مقاس"""
+    from src.models.sales import Employee
+
+    with app.app_context():
+        manager_id = Employee.query.filter_by(role='sales_manager').first().id
+
+    client = app.test_client()
+    token = client.post('/api/auth/login', json=ADMIN).get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+    budget_months = itertools.count()
+    period = f'month={month}&year={year}'
+
+    def new_budget(client):
+        # شهر جديد في كل استدعاء حتى لا يُرفض الطلب كميزانية مكررة
+        n = next(budget_months)
+        return client.post('/api/marketing-budget', json={
+            'month': n % 12 + 1, 'year': 2100 + n // 12, 'total_budget': 50000, 'created_by': manager_id
+        })
+
+    return [
+        ('auth.login', 'write', lambda c: c.post('/api/auth/login', json=ADMIN)),
+        ('auth.me', 'read', lambda c: c.get('/api/auth/me', headers=headers)),
+        ('auth.users', 'read', lambda c: c.get('/api/auth/users', headers=headers)),
+        ('sales.projects', 'read', lambda c: c.get(f'/api/projects?{period}')),
+        ('sales.commissions.calculate', 'write',
+         lambda c: c.post('/api/commissions/calculate', json={'month': month, 'year': year})),
+        ('sales.marketing_budget.create', 'write', new_budget),
+        ('admin.employees', 'read', lambda c: c.get('/api/admin/employees', headers=headers)),
+        ('admin.teams', 'read', lambda c: c.get('/api/admin/teams', headers=headers)),
+        ('admin.kpis', 'read', lambda c: c.get('/api/admin/kpis', headers=headers)),
+        ('admin.projects', 'read', lambda c: c.get(f'/api/admin/projects?{period}', headers=headers)),
+    ]
+
+
+def measure(app, call, requests, threads):
+    local = threading.local()
+    statuses = {}
+    lock = threading.Lock()
+
+    def timed(_):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        started = time.perf_counter()
+        response = call(client)
+        elapsed = time.perf_counter() - started
+        with lock:
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        return elapsed
+
+    started = time.perf_counter()
+    if threads == 1:
+        latencies = [timed(i) for i in range(requests)]
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            latencies = list(pool.map(timed, range(requests)))
+    wall = time.perf_counter() - started
+
+    return {
+        'requests': requests,
+        'threads': threads,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'throughput_rps': round(requests / wall, 1),
+        'errors': sum(count for status, count in statuses.items() if status >= 400),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())}
+    }
+
+
+def run_worker(size, requests, write_requests, threads, warmup):
+    sys.path.insert(0, ROOT)
+    from src.main import app
+    from src.services.datagen import generate_data
+
+    params = SIZES[size]
+    with app.app_context():
+        generated = generate_data(seed=SEED, replace=True, **params)
+    year, month = 2024, params['months']
+
+    results = {'generated': generated['rows'], 'endpoints': {}}
+    for name, kind, call in build_scenarios(app, year, month):
+        count = requests if kind == 'read' else write_requests
+        measure(app, call, min(warmup, count), 1)
+        results['endpoints'][name] = {
+            'single': measure(app, call, count, 1),
+            'threaded': measure(app, call, count, threads)
+        }
+        print(f'{size} {name}: done', file=sys.stderr)
+    print(json.dumps(results))
+
+
+def compare(baseline, current, tolerance):
+    """قائمة التراجعات مقارنة بخط الأساس"""
+    regressions = []
+    for size, data in current['sizes'].items():
+        base_size = baseline.get('sizes', {}).get(size)
+        if base_size is None:
+            continue
+        for name, modes in data['endpoints'].items():
+            for mode, result in modes.items():
+                base = base_size['endpoints'].get(name, {}).get(mode)
+                if base is None:
+                    continue
+                label = f'{size} {name} [{mode}]'
+                if result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+                    regressions.append(f"{label}: p95 {base['p95_ms']} -> {result['p95_ms']} ms")
+                if result['throughput_rps'] < base['throughput_rps'] * (1 - tolerance):
+                    regressions.append(
+                        f"{label}: throughput {base['throughput_rps']} -> {result['throughput_rps']} req/s"
+                    )
+                if result['errors'] > base['errors']:
+                    regressions.append(f"{label}: errors {base['errors']} -> {result['errors']}")
+    return regressions
+
+
+def print_table(report):
+    print(f"{'size':>5} {'endpoint':<32} {'mode':<9} {'p50':>9} {'p95':>9} {'p99':>9} {'req/s':>9} {'err':>5}")
+    for size, data in report['sizes'].items():
+        for name, modes in data['endpoints'].items():
+            for mode, r in modes.items():
+                print(
+                    f"{size:>5} {name:<32} {mode:<9} {r['p50_ms']:>9} {r['p95_ms']:>9} "
+                    f"{r['p99_ms']:>9} {r['throughput_rps']:>9} {r['errors']:>5}"
+                )
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['1k', '100k'])
+    parser.add_argument('--requests', type=int, default=200, help='عدد طلبات كل مسار قراءة')
+    parser.add_argument('--write-requests', type=int, default=20, help='عدد طلبات كل مسار كتابة')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--save-baseline', metavar='PATH')
+    parser.add_argument('--baseline', metavar='PATH', help='خط أساس للمقارنة')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='نسبة التراجع المسموح بها')
+    parser.add_argument('--output', metavar='PATH', help='حفظ نتائج هذا التشغيل')
+    parser.add_argument('--worker', metavar='SIZE', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.requests, args.write_requests, args.threads, args.warmup)
+        return 0
+
+    report = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'seed': SEED,
+        'threads': args.threads,
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'sizes': {}
+    }
+    for size in args.sizes:
+        workdir = tempfile.mkdtemp(prefix='endpoint-bench-')
+        try:
+            db_path = os.path.join(workdir, 'app.db')
+            shutil.copy(SOURCE_DB, db_path)
+            # حد محاولات الدخول يحوّل مسار auth.login إلى قياس ردود 429
+            env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', RATELIMIT_ENABLED='0')
+            output = subprocess.run(
+                [sys.executable, __file__, '--worker', size,
+                 '--requests', str(args.requests), '--write-requests', str(args.write_requests),
+                 '--threads', str(args.threads), '--warmup', str(args.warmup)],
+                env=env, check=True, stdout=subprocess.PIPE, text=True
+            ).stdout
+            report['sizes'][size] = json.loads(output.strip().splitlines()[-1])
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_table(report)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as handle:
+                json.dump(report, handle, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        regressions = compare(baseline, report, args.tolerance)
+        if regressions:
+            print(f'\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:')
+            for line in regressions:
+                print(f'  {line}')
+            return 1
+        print(f'\nno regressions beyond {args.tolerance:.0%} against {args.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""كلفة تسجيل المقاييس لكل طلب مع خيوط متزامنة
+
+    python benchmarks/metrics.py --threads 1 4 16 --routes 40
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.services.metrics import Metrics  # noqa: E402
+
+
+def run(threads, routes, per_thread):
+    metrics = Metrics()
+    keys = [('sales', f'/api/route-{n}', 'GET', 200) for n in range(routes)]
+    rng = random.Random(1)
+    latencies = [rng.lognormvariate(-4, 1) for _ in range(1024)]
+    barrier = threading.Barrier(threads + 1)
+
+    def worker():
+        barrier.wait()
+        for i in range(per_thread):
+            blueprint, route, method, status = keys[i % routes]
+            metrics.observe(blueprint, route, method, status, latencies[i & 1023])
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = metrics.snapshot()
+    assert sum(total.requests.values()) == threads * per_thread
+    return elapsed / (threads * per_thread) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--routes', type=int, default=40)
+    parser.add_argument('--per-thread', type=int, default=200000)
+    args = parser.parse_args()
+
+    print(f"{'threads':>7} {'us/observe':>11}")
+    for threads in args.threads:
+        print(f'{threads:>7} {run(threads, args.routes, args.per_thread):>11.2f}')
+
+
+if __name__ == '__main__':
+    main()
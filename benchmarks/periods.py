@@ -0,0 +1,82 @@
+"""زمن قراءة شهر مغلق من لقطته مقارنة بالبيانات الحية
+
+    python benchmarks/periods.py --projects 1000000
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DB = os.path.join(ROOT, 'src', 'database', 'app.db')
+
+KINDS = ('commissions', 'targets', 'projects')
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--projects', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='periods-bench-')
+    try:
+        db_path = os.path.join(workdir, 'app.db')
+        shutil.copy(SOURCE_DB, db_path)
+        os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+        os.environ['PERF_PROFILER_ENABLED'] = '0'
+        sys.path.insert(0, ROOT)
+        from src.main import app
+        from src.routes.sales import run_commission_calculation
+        from src.services.datagen import generate_data
+        from src.services.periods import period_close
+
+        reps, year, month = 200, 2024, 6
+        with app.app_context():
+            generate_data(teams=10, employees_per_team=reps // 10 + 1, months=12, start_year=2024, start_month=1,
+                          projects_per_rep=max(1, args.projects // (reps * 12)), seed=3, replace=True)
+            started = time.perf_counter()
+            run_commission_calculation(month, year)
+            print(f'commission calculation {month}/{year}: {time.perf_counter() - started:.2f}s')
+
+        client = app.test_client()
+        live = {}
+        for kind in KINDS:
+            live[kind] = timed(lambda: client.get(f'/api/{kind}', query_string={'month': month, 'year': year}),
+                               args.repeat)
+
+        with app.app_context():
+            started = time.perf_counter()
+            period = period_close.close(year, month)
+            print(f"close {month}/{year}: {time.perf_counter() - started:.2f}s rows={period['row_counts']}")
+
+        print(f"{'endpoint':<14} {'rows':>7} {'live ms':>9} {'closed ms':>10} {'304 ms':>8}")
+        for kind in KINDS:
+            live_ms, response = live[kind]
+            closed_ms, snapshot = timed(
+                lambda: client.get(f'/api/{kind}', query_string={'month': month, 'year': year}), args.repeat
+            )
+            assert sorted(map(str, response.get_json())) == sorted(map(str, snapshot.get_json()))
+            etag = snapshot.headers['ETag']
+            cached_ms, _ = timed(lambda: client.get(
+                f'/api/{kind}', query_string={'month': month, 'year': year}, headers={'If-None-Match': etag}
+            ), args.repeat)
+            print(f'{kind:<14} {len(snapshot.get_json()):>7} {live_ms:>9.1f} {closed_ms:>10.1f} {cached_ms:>8.2f}')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""قياس كلفة محلل SQL لكل طلب (مفعّل مقابل معطّل)
+
+    python benchmarks/profiler_overhead.py --requests 2000
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DB = os.path.join(ROOT, 'src', 'database', 'app.db')
+
+ENDPOINTS = (
+    '/api/projects',
+    '/api/employees',
+    '/api/commissions?month=12&year=2024',
+)
+
+
+def measure(client, requests):
+    timings = []
+    for index in range(requests):
+        started = time.perf_counter()
+        client.get(ENDPOINTS[index % len(ENDPOINTS)])
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='profiler-bench-')
+    try:
+        db_path = os.path.join(workdir, 'app.db')
+        shutil.copy(SOURCE_DB, db_path)
+        os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+        sys.path.insert(0, ROOT)
+        from src.main import app
+        from src.services.perf import profiler
+
+        client = app.test_client()
+        measure(client, 200)  # تسخين
+
+        results = {'disabled': [], 'enabled': []}
+        queries = 0
+        for _ in range(args.rounds):
+            profiler.disable()
+            results['disabled'].append(statistics.mean(measure(client, args.requests)))
+            profiler.enable()
+            results['enabled'].append(statistics.mean(measure(client, args.requests)))
+        for summary in profiler.slowest():
+            queries = max(queries, summary['query_count'])
+
+        disabled = statistics.median(results['disabled']) * 1e6
+        enabled = statistics.median(results['enabled']) * 1e6
+        print(f'disabled: {disabled:10.1f} us/request')
+        print(f'enabled:  {enabled:10.1f} us/request')
+        print(f'overhead: {enabled - disabled:10.1f} us/request ({(enabled / disabled - 1) * 100:.1f}%)')
+        print(f'max queries in one request: {queries}')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
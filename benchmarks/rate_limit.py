@@ -0,0 +1,51 @@
+"""معدل قرارات محدد المعدل تحت التزامن: أجزاء متعددة مقابل قفل واحد
+
+    python benchmarks/rate_limit.py --threads 1 4 16 --keys 10000
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.services.rate_limit import RateLimiter, parse_rate  # noqa: E402
+
+
+def run(limiter, threads, keys, per_thread):
+    capacity, rate = parse_rate('20/minute')
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(offset):
+        barrier.wait()
+        for i in range(per_thread):
+            limiter.hit(f'login:ip:10.0.{(offset + i) % keys}', capacity, rate, 'login:ip')
+
+    pool = [threading.Thread(target=worker, args=(n * 7919,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    return threads * per_thread / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--keys', type=int, default=10000)
+    parser.add_argument('--per-thread', type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{'threads':>7} {'shards':>6} {'decisions/s':>12}")
+    for threads in args.threads:
+        for shards in (1, 64):
+            rate = run(RateLimiter(shards=shards), threads, args.keys, args.per_thread)
+            print(f'{threads:>7} {shards:>6} {rate:>12,.0f}')
+
+
+if __name__ == '__main__':
+    main()
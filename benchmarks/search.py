@@ -0,0 +1,79 @@
+"""زمن البحث النصي عبر FTS5 مقارنة بـ LIKE على مليون مشروع
+
+    python benchmarks/search.py --projects 1000000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DB = os.path.join(ROOT, 'src', 'database', 'app.db')
+
+QUERIES = (
+    'شركة',               # كلمة شائعة جداً: ترتيب حسب الأحدث
+    'مؤسسه البناء',       # كلمتان شائعتان
+    'معرض الواجهات الذهبيه',
+    'مصنع النجار',        # بادئة
+    'تجريبي خشب',         # في الملاحظات
+    'غير موجود',
+)
+
+
+def timed(func, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--projects', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='search-bench-')
+    try:
+        db_path = os.path.join(workdir, 'app.db')
+        shutil.copy(SOURCE_DB, db_path)
+        os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+        os.environ['PERF_PROFILER_ENABLED'] = '0'
+        sys.path.insert(0, ROOT)
+        from src.main import app
+        from src.models.user import db
+        from src.models.sales import Project
+        from src.services.datagen import generate_data
+        from src.services.search import search_index
+
+        reps = 200
+        with app.app_context():
+            started = time.perf_counter()
+            result = generate_data(teams=10, employees_per_team=reps // 10 + 1, months=12,
+                                   projects_per_rep=max(1, args.projects // (reps * 12)), seed=3, replace=True)
+            print(f"rows: {result['rows'].get('projects')} projects, generated and indexed in "
+                  f'{time.perf_counter() - started:.1f}s')
+            rebuild = search_index.rebuild()
+            print(f"full rebuild: {rebuild['seconds']}s")
+
+        client = app.test_client()
+        print(f"{'query':<24} {'total':>6} {'order':>6} {'api ms':>8} {'LIKE ms':>8}")
+        for query in QUERIES:
+            api_time, response = timed(lambda: client.get('/api/search', query_string={'q': query}), args.repeat)
+            body = response.get_json()['projects']
+            with app.app_context():
+                first = query.split()[0]
+                like_time, _ = timed(lambda: db.session.query(Project.id).filter(
+                    Project.client_name.like(f'%{first}%') | Project.notes.like(f'%{first}%')
+                ).limit(20).all(), 1)
+            print(f"{query:<24} {body['total']:>6} {body['ordering']:>6} {api_time * 1000:>8.1f} {like_time * 1000:>8.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
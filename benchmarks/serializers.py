@@ -0,0 +1,109 @@
+"""مقارنة المحولات المولدة بالقواميس المبنية يدوياً على 100 ألف مشروع
+
+    python benchmarks/serializers.py --projects 100000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DB = os.path.join(ROOT, 'src', 'database', 'app.db')
+
+
+def hand_built(projects):
+    # نسخة من الاستجابة اليدوية السابقة لـ GET /api/projects
+    return [{
+        'id': proj.id,
+        'employee_id': proj.employee_id,
+        'employee_name': proj.employee.name,
+        'client_name': proj.client_name,
+        'project_value': proj.project_value,
+        'product_type': proj.product_type,
+        'signature_date': proj.signature_date.isoformat(),
+        'is_from_social_media': proj.is_from_social_media,
+        'marketing_cost_allocated': proj.marketing_cost_allocated,
+        'commission_rate': proj.commission_rate,
+        'final_commission': proj.final_commission,
+        'notes': proj.notes
+    } for proj in projects]
+
+
+def best_of(func, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--projects', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='serializer-bench-')
+    try:
+        db_path = os.path.join(workdir, 'app.db')
+        shutil.copy(SOURCE_DB, db_path)
+        os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+        os.environ['PERF_PROFILER_ENABLED'] = '0'
+        sys.path.insert(0, ROOT)
+        from src.main import app
+        from src.models.user import db
+        from src.models.sales import Employee, Project
+        from src.services.datagen import generate_data
+        from src.services.serializers import serializer
+
+        reps = 50
+        with app.app_context():
+            generate_data(teams=5, employees_per_team=reps // 5 + 1, months=10,
+                          projects_per_rep=max(1, args.projects // (reps * 10)), seed=7, replace=True)
+            projects = serializer(Project, 'list')
+
+            def orm_objects():
+                db.session.expunge_all()
+                return Project.query.order_by(Project.signature_date.desc()).all()
+
+            def column_rows():
+                return db.session.query(Project).outerjoin(Employee, Employee.id == Project.employee_id) \
+                    .with_entities(*projects.columns(Project, employee=Employee)) \
+                    .order_by(Project.signature_date.desc()).all()
+
+            objects = orm_objects()
+            for obj in objects:
+                obj.employee  # تحميل العلاقات مسبقاً حتى يُقاس التحويل وحده
+            rows = column_rows()
+            print(f'projects: {len(objects)}')
+
+            hand_time, expected = best_of(lambda: hand_built(objects), args.repeat)
+            generated_time, produced = best_of(lambda: projects.many(objects), args.repeat)
+            rows_time, from_rows = best_of(lambda: projects.rows(rows), args.repeat)
+            assert produced == expected and sorted(from_rows, key=lambda r: r['id']) == sorted(expected, key=lambda r: r['id'])
+
+            print('serialization only (ms):')
+            print(f'  hand-built dicts, ORM objects  {hand_time * 1000:10.1f}')
+            print(f'  generated, ORM objects         {generated_time * 1000:10.1f}')
+            print(f'  generated, row tuples          {rows_time * 1000:10.1f}')
+
+            def old_endpoint():
+                return hand_built(orm_objects())
+
+            def new_endpoint():
+                return projects.rows(column_rows())
+
+            old_time, _ = best_of(old_endpoint, 1)
+            new_time, _ = best_of(new_endpoint, args.repeat)
+            print('query + serialization (ms):')
+            print(f'  ORM objects + lazy employee   {old_time * 1000:10.1f}')
+            print(f'  joined rows + generated       {new_time * 1000:10.1f}')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
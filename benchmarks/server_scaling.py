@@ -0,0 +1,116 @@
+"""قياس توسع خادم الإنتاج مع عدد العمال على مسارات القراءة
+
+يشغّل src.server بعدد عمال مختلف على نسخة مؤقتة من قاعدة البيانات، ثم
+يضغط عليه بعمليات عميل مستقلة (اتصالات keep-alive) ويقيس الطلبات في
+الثانية. التوسع الخطي يتطلب أنوية فارغة للعمال وللعملاء معاً.
+
+    python benchmarks/server_scaling.py --workers 1 2 4 --clients 8 --duration 5
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DB = os.path.join(ROOT, 'src', 'database', 'app.db')
+PATHS = ('/api/employees', '/api/projects?month=12&year=2024', '/api/targets?month=12&year=2024')
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def wait_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', PATHS[0])
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+def client(port, duration, results):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    done = errors = 0
+    stop_at = time.monotonic() + duration
+    while time.monotonic() < stop_at:
+        try:
+            connection.request('GET', PATHS[done % len(PATHS)])
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors += 1
+            done += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    results.put((done, errors))
+
+
+def run(workers, threads, clients, duration, db_path):
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', APP_PROFILE='production')
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'src.server', '--host', '127.0.0.1', '--port', str(port),
+         '--workers', str(workers), '--threads', str(threads)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL
+    )
+    try:
+        wait_ready(port)
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=client, args=(port, duration, results)) for _ in range(clients)
+        ]
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+    done = sum(count for count, _ in totals)
+    return done / duration, sum(errors for _, errors in totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=5.0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='server-bench-')
+    try:
+        db_path = os.path.join(workdir, 'app.db')
+        shutil.copy(SOURCE_DB, db_path)
+        print(f'cpus: {os.cpu_count()}  clients: {args.clients}  threads/worker: {args.threads}')
+        print(f"{'workers':>7} {'req/s':>10} {'speedup':>8} {'efficiency':>10} {'errors':>7}")
+        base = None
+        for workers in args.workers:
+            rate, errors = run(workers, args.threads, args.clients, args.duration, db_path)
+            base = base or rate / workers
+            speedup = rate / base
+            print(f'{workers:>7} {rate:>10.1f} {speedup:>8.2f} {speedup / workers:>10.0%} {errors:>7}')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""قياس إنتاجية القراءة/الكتابة المختلطة لملفات تعريف SQLite
+
+يشغّل لكل ملف تعريف عملية مستقلة على نسخة من قاعدة البيانات، ثم يضغط
+على المسارات عبر عميل اختبار Flask بعدد خيوط من 1 إلى 32.
+
+    python benchmarks/sqlite_throughput.py
+    python benchmarks/sqlite_throughput.py --profiles default wal --duration 3 --write-ratio 0.2
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DB = os.path.join(ROOT, 'src', 'database', 'app.db')
+THREAD_COUNTS = (1, 2, 4, 8, 16, 32)
+
+
+def run_worker(duration, write_ratio, thread_counts):
+    sys.path.insert(0, ROOT)
+    from src.main import app
+    from src.models.sales import Employee
+
+    with app.app_context():
+        employee_ids = [emp.id for emp in Employee.query.all()]
+
+    results = []
+    for threads in thread_counts:
+        counts = {'reads': 0, 'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+        stop_at = time.perf_counter() + duration
+
+        def hammer(seed):
+            rng = random.Random(seed)
+            client = app.test_client()
+            local = {'reads': 0, 'writes': 0, 'errors': 0}
+            while time.perf_counter() < stop_at:
+                if rng.random() < write_ratio:
+                    employee_id = rng.choice(employee_ids)
+                    response = client.put(f'/api/employees/{employee_id}', json={'phone': str(rng.randint(10**8, 10**9))})
+                    kind = 'writes'
+                else:
+                    response = client.get('/api/projects?month=12&year=2024')
+                    kind = 'reads'
+                local[kind if response.status_code < 400 else 'errors'] += 1
+            with lock:
+                for key, value in local.items():
+                    counts[key] += value
+
+        workers = [threading.Thread(target=hammer, args=(i,)) for i in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        results.append({
+            'threads': threads,
+            'ops_per_sec': round((counts['reads'] + counts['writes']) / duration, 1),
+            **counts
+        })
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profiles', nargs='+', default=['default', 'wal'])
+    parser.add_argument('--duration', type=float, default=2.0)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--threads', type=int, nargs='+', default=list(THREAD_COUNTS))
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.duration, args.write_ratio, args.threads)
+        return
+
+    table = {}
+    for profile in args.profiles:
+        workdir = tempfile.mkdtemp(prefix='sqlite-bench-')
+        try:
+            db_path = os.path.join(workdir, 'app.db')
+            shutil.copy(SOURCE_DB, db_path)
+            env = dict(os.environ, SQLITE_PROFILE=profile, DATABASE_URL=f'sqlite:///{db_path}')
+            output = subprocess.run(
+                [sys.executable, __file__, '--worker', '--duration', str(args.duration),
+                 '--write-ratio', str(args.write_ratio), '--threads', *map(str, args.threads)],
+                env=env, check=True, capture_output=True, text=True
+            ).stdout
+            table[profile] = json.loads(output.strip().splitlines()[-1])
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    header = f"{'threads':>7} " + ' '.join(f'{p + " ops/s":>14} {p + " err":>10}' for p in args.profiles)
+    print(header)
+    for index, threads in enumerate(args.threads):
+        row = f'{threads:>7} '
+        for profile in args.profiles:
+            result = table[profile][index]
+            row += f"{result['ops_per_sec']:>14} {result['errors']:>10} "
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""قياس زمن بدء عملية عامل جديدة حتى أول استجابة
+
+كل تشغيل عملية Python جديدة تستورد src.main وتخدم أول طلب، فيُقاس ما
+يدفعه كل عامل أو اختبار أو أمر CLI عند بدئه.
+
+    python benchmarks/startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DB = os.path.join(ROOT, 'src', 'database', 'app.db')
+
+# الإعداد القديم (استيراد كل المخططات وcreate_all عند الاستيراد) مقابل الجديد
+MODES = {
+    'eager': {'APP_PROFILE': 'development', 'LAZY_BLUEPRINTS': '0', 'AUTO_CREATE_SCHEMA': '1'},
+    'lazy': {'APP_PROFILE': 'production', 'LAZY_BLUEPRINTS': '1', 'AUTO_CREATE_SCHEMA': '0'},
+}
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+from src.main import app
+created = time.perf_counter()
+response = app.test_client().get({path!r})
+served = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({{
+    'import_ms': (created - started) * 1000,
+    'first_request_ms': (served - created) * 1000,
+    'total_ms': (served - started) * 1000,
+    'modules': len(sys.modules)
+}}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--path', default='/api/employees')
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='startup-bench-')
+    try:
+        db_path = os.path.join(workdir, 'app.db')
+        shutil.copy(SOURCE_DB, db_path)
+        probe = PROBE.format(root=ROOT, path=args.path)
+
+        print(f"{'mode':<7} {'import ms':>10} {'first req ms':>13} {'total ms':>10} {'wall ms':>9} {'modules':>8}")
+        for mode in args.modes:
+            env = dict(
+                os.environ, DATABASE_URL=f'sqlite:///{db_path}', PERF_PROFILER_ENABLED='1', **MODES[mode]
+            )
+            samples = []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                output = subprocess.run(
+                    [sys.executable, '-c', probe], env=env, check=True, capture_output=True, text=True
+                ).stdout
+                sample = json.loads(output.strip().splitlines()[-1])
+                sample['wall_ms'] = (time.perf_counter() - started) * 1000
+                samples.append(sample)
+
+            def median(key):
+                return statistics.median(sample[key] for sample in samples)
+
+            print(
+                f"{mode:<7} {median('import_ms'):>10.1f} {median('first_request_ms'):>13.1f} "
+                f"{median('total_ms'):>10.1f} {median('wall_ms'):>9.1f} {int(median('modules')):>8}"
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card'
 import { Button } from '@/components/ui/button'
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '@/components/ui/table'
@@ -20,18 +20,37 @@ function AdminPanel() {
 
   const API_BASE = 'https://9yhyi3cz0k7q.manus.space/api'
 
-  const fetchData = async (endpoint, key) => {
+  // ETag لكل مورد: الموارد غير المتغيرة لا تُعاد في طلب التهيئة
+  const etagsRef = useRef({})
+
+  const fetchBootstrap = async (resources) => {
     try {
-      const response = await fetch(`${API_BASE}/admin/${endpoint}`, {
+      const etags = Object.entries(etagsRef.current)
+        .filter(([name]) => resources.includes(name))
+        .map(([name, etag]) => `${name}:${etag}`)
+        .join(',')
+      const query = `resources=${resources.join(',')}` + (etags ? `&etags=${encodeURIComponent(etags)}` : '')
+      const response = await fetch(`${API_BASE}/admin/bootstrap?${query}`, {
         headers: {
           'Authorization': `Bearer ${token}`
         }
       })
       if (!response.ok) {
-        throw new Error(`فشل في جلب بيانات ${key}`)
+        throw new Error('فشل في جلب بيانات لوحة الإدارة')
       }
       const result = await response.json()
-      setData(prev => ({ ...prev, [key]: result }))
+      const updates = {}
+      Object.entries(result.resources).forEach(([name, resource]) => {
+        etagsRef.current[name] = resource.etag
+        if (!resource.not_modified) {
+          updates[name] = resource.data
+        }
+      })
+      setData(prev => ({ ...prev, ...updates }))
+      const errors = Object.values(result.errors || {})
+      if (errors.length) {
+        setError(errors[0])
+      }
     } catch (err) {
       setError(err.message)
     }
@@ -40,12 +59,7 @@ function AdminPanel() {
   useEffect(() => {
     if (user && (user.role === 'admin' || user.role === 'sales_manager')) {
       setLoading(true)
-      Promise.all([
-        fetchData('users', 'users'),
-        fetchData('teams', 'teams'),
-        fetchData('kpis', 'kpis'),
-        // fetchData('marketing-budget?month=1&year=2025', 'marketingBudget'), // مثال لجلب ميزانية شهر معين
-      ]).finally(() => setLoading(false))
+      fetchBootstrap(['users', 'teams', 'kpis']).finally(() => setLoading(false))
     } else {
       setError('ليس لديك صلاحية لعرض هذه الصفحة.')
       setLoading(false)
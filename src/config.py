@@ -0,0 +1,125 @@
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_flag(name, default):
+    return os.environ.get(name, '1' if default else '0') == '1'
+
+
+def _env_seconds(name, default):
+    """'admin=15,sales=10' -> {'admin': 15.0, 'sales': 10.0}"""
+    value = os.environ.get(name, default)
+    pairs = (item.split('=', 1) for item in value.split(',') if '=' in item)
+    return {key.strip(): float(seconds) for key, seconds in pairs}
+
+
+class Config:
+    """الإعدادات المشتركة؛ كل قيمة قابلة للتجاوز بمتغير بيئة بالاسم نفسه"""
+
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
+    DEBUG = False
+    TESTING = False
+
+    SQLALCHEMY_DATABASE_URI = os.environ.get(
+        'DATABASE_URL',
+        f"sqlite:///{os.path.join(BASE_DIR, 'database', 'app.db')}"
+    )
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # إنشاء الجداول تلقائياً عند التشغيل؛ في الإنتاج يُستخدم flask init-db
+    AUTO_CREATE_SCHEMA = _env_flag('AUTO_CREATE_SCHEMA', False)
+    # تحميل لوحة الإدارة والبيانات التجريبية عند أول طلب لها فقط
+    LAZY_BLUEPRINTS = _env_flag('LAZY_BLUEPRINTS', True)
+
+    # ضغط الملفات الثابتة عند التشغيل بدلاً من أول طلب؛ server.py يفعّله مع التحميل المسبق
+    STATIC_PRECOMPRESS = _env_flag('STATIC_PRECOMPRESS', False)
+
+    # ضغط استجابات JSON الكبيرة
+    COMPRESS_LEVEL = _env_int('COMPRESS_LEVEL', 6)
+    COMPRESS_MIN_SIZE = _env_int('COMPRESS_MIN_SIZE', 1024)
+
+    # ملف تعريف SQLite: wal (افتراضي) أو default
+    SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'wal')
+    SQLITE_READ_POOL_SIZE = _env_int('SQLITE_READ_POOL_SIZE', 8)
+
+    # أرشيف السنوات المغلقة في ملفات مستقلة
+    ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR')
+
+    # المهام الخلفية للعمليات الثقيلة
+    JOBS_MAX_WORKERS = _env_int('JOBS_MAX_WORKERS', 2)
+    JOBS_MAX_QUEUED = _env_int('JOBS_MAX_QUEUED', 20)
+    JOBS_PROGRESS_INTERVAL = float(os.environ.get('JOBS_PROGRESS_INTERVAL', 1))  # ثوانٍ بين حفظ التقدم
+
+    # بث أحداث التغيير للوحات المتابعة
+    EVENTS_CLIENT_BUFFER = _env_int('EVENTS_CLIENT_BUFFER', 100)
+    EVENTS_MAX_CLIENTS = _env_int('EVENTS_MAX_CLIENTS', 500)
+    # الأحداث تمر عبر جدول change_events فتصل عملاء كل العمليات العاملة
+    EVENTS_POLL_INTERVAL = float(os.environ.get('EVENTS_POLL_INTERVAL', 0.5))
+    EVENTS_RETENTION = _env_int('EVENTS_RETENTION', 10000)
+
+    # تحليل استعلامات SQL لكل طلب
+    PERF_PROFILER_ENABLED = _env_flag('PERF_PROFILER_ENABLED', True)
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 100))
+    SLOW_QUERY_DUMP_PATH = os.environ.get('SLOW_QUERY_DUMP_PATH')
+
+    # مدة الثقة بإصدارات بيانات المرجع قبل مقارنتها بالقاعدة (ثوانٍ)
+    REFERENCE_CACHE_TTL = float(os.environ.get('REFERENCE_CACHE_TTL', 2))
+
+    # إكمال أسماء العملاء: إعادة بناء الفهرس في الخلفية (ثوانٍ) وميزانية الطلب
+    AUTOCOMPLETE_REFRESH_INTERVAL = float(os.environ.get('AUTOCOMPLETE_REFRESH_INTERVAL', 300))
+    AUTOCOMPLETE_BUDGET_MS = float(os.environ.get('AUTOCOMPLETE_BUDGET_MS', 10))
+    # أقصى مدة قبل ملاحظة أسماء أضافتها عملية أخرى (مقارنة إصدار clients)
+    AUTOCOMPLETE_VERSION_INTERVAL = float(os.environ.get('AUTOCOMPLETE_VERSION_INTERVAL', 2))
+
+    # مدة الثقة بفهرس الأشهر المغلقة عند القراءة (ثوانٍ)
+    PERIODS_CATALOG_TTL = float(os.environ.get('PERIODS_CATALOG_TTL', 5))
+
+    # مهلة استعلامات طلبات القراءة لكل مخطط أو مسار (ثوانٍ)؛ 0 = بلا مهلة
+    QUERY_DEADLINES = _env_seconds('QUERY_DEADLINES', 'sales=10,admin=15,search=3,auth=5,user=5')
+    QUERY_DEADLINE_DEFAULT = float(os.environ.get('QUERY_DEADLINE_DEFAULT', 0))
+    QUERY_DEADLINE_RETRY_AFTER = _env_int('QUERY_DEADLINE_RETRY_AFTER', 5)
+    QUERY_DEADLINE_CHECK_INTERVAL = _env_int('QUERY_DEADLINE_CHECK_INTERVAL', 10000)  # تعليمات SQLite بين كل فحص
+
+    # مقاييس Prometheus على /metrics
+    METRICS_ENABLED = _env_flag('METRICS_ENABLED', True)
+    # مع عدة عمال: مجلد يكتب فيه كل عامل عداداته ليجمعها /metrics من كلهم (يضبطه server.py)
+    METRICS_MULTIPROCESS_DIR = os.environ.get('METRICS_MULTIPROCESS_DIR') or None
+    METRICS_WRITE_INTERVAL = float(os.environ.get('METRICS_WRITE_INTERVAL', 5))
+
+    # حدود محاولات الدخول لكل عنوان IP ولكل اسم مستخدم
+    RATELIMIT_ENABLED = _env_flag('RATELIMIT_ENABLED', True)
+    RATELIMIT_LOGIN_PER_IP = os.environ.get('RATELIMIT_LOGIN_PER_IP', '20/minute')
+    RATELIMIT_LOGIN_PER_USER = os.environ.get('RATELIMIT_LOGIN_PER_USER', '5/minute')
+    RATELIMIT_INIT_ADMIN_PER_IP = os.environ.get('RATELIMIT_INIT_ADMIN_PER_IP', '3/minute')
+    # عدد الوكلاء العكسيين الموثوقين أمام التطبيق؛ عنوان العميل يُؤخذ من X-Forwarded-For
+    # عبرهم فقط. 0 = اتصال مباشر ويُتجاهل الترويس (لا يمكن للعميل تزويره)
+    TRUSTED_PROXY_COUNT = _env_int('TRUSTED_PROXY_COUNT', 0)
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+    AUTO_CREATE_SCHEMA = _env_flag('AUTO_CREATE_SCHEMA', True)
+
+
+class ProductionConfig(Config):
+    PERF_PROFILER_ENABLED = _env_flag('PERF_PROFILER_ENABLED', False)
+
+
+class TestingConfig(Config):
+    TESTING = True
+    RATELIMIT_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite://')
+    AUTO_CREATE_SCHEMA = True
+    LAZY_BLUEPRINTS = False
+
+
+PROFILES = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+}
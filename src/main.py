@@ -3,50 +3,129 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
+from src.config import PROFILES
 from src.models.user import db
 from src.routes.user import user_bp
 from src.routes.sales import sales_bp
-from src.routes.init_data import init_bp
 from src.routes.auth import auth_bp
-from src.routes.admin import admin_bp
-
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
-
-# تمكين CORS لجميع المسارات
-CORS(app)
-
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(sales_bp, url_prefix='/api')
-app.register_blueprint(init_bp, url_prefix='/api')
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(admin_bp, url_prefix='/api/admin')
-
-# uncomment if you need to use database
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-with app.app_context():
-    db.create_all()
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-            return "Static folder not configured", 404
+from src.routes.jobs import jobs_bp
+from src.routes.events import events_bp
+from src.routes.search import search_bp
+from src.services.jobs import job_runner
+from src.services.events import broadcaster
+from src.services.compression import compressor
+from src.services.db_engine import (
+    configure_engine_options, create_missing_indexes, install_engine_profile, install_fork_safety, init_db_command
+)
+from src.services.archive import install_archive_routing, archive_year_command
+from src.services.datagen import generate_data_command
+from src.services.lazy_views import LazyBlueprint
+from src.services.metrics import metrics
+from src.services.perf import profiler, slow_query_log
+from src.services.rate_limit import limiter
+from src.services.search import search_index, search_reindex_command
+from src.services.autocomplete import client_autocomplete
+from src.services.bootstrap import admin_bootstrap
+from src.services.periods import period_close
+from src.services.recompute import recompute_planner
+from src.services.deadlines import query_deadlines
+from src.services.reference_cache import reference_cache
+from src.services.request_profiler import request_profiler
+from src.services.static_assets import static_assets
+
+
+def create_app(profile=None):
+    """إنشاء التطبيق بملف إعدادات: development أو production أو testing"""
+    profile = profile or os.environ.get('APP_PROFILE', 'development')
+    if profile not in PROFILES:
+        raise ValueError(f'ملف إعدادات غير معروف: {profile}')
+
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config.from_object(PROFILES[profile])
+    app.config['APP_PROFILE'] = profile
+
+    # عنوان العميل الحقيقي خلف الوكلاء الموثوقين (حدود المعدل لكل IP تعتمد عليه)
+    if app.config['TRUSTED_PROXY_COUNT']:
+        proxies = app.config['TRUSTED_PROXY_COUNT']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
+    # تمكين CORS لجميع المسارات
+    CORS(app)
+    # يُسجل أولاً فيعمل بعد كل دوال after_request الأخرى
+    compressor.init_app(app)
+
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(sales_bp, url_prefix='/api')
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(jobs_bp, url_prefix='/api')
+    app.register_blueprint(events_bp, url_prefix='/api')
+    app.register_blueprint(search_bp, url_prefix='/api')
+
+    # مخططات نادرة الاستخدام تُستورد عند أول طلب لها
+    if app.config['LAZY_BLUEPRINTS']:
+        LazyBlueprint('src.routes.init_data:init_bp', '/api', paths=('/init-sample-data',)).init_app(app)
+        LazyBlueprint('src.routes.admin:admin_bp', '/api/admin').init_app(app)
     else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+        from src.routes.init_data import init_bp
+        from src.routes.admin import admin_bp
+        app.register_blueprint(init_bp, url_prefix='/api')
+        app.register_blueprint(admin_bp, url_prefix='/api/admin')
+
+    # قاعدة البيانات
+    configure_engine_options(app)
+    db.init_app(app)
+    install_engine_profile(app, db)
+    install_fork_safety(app, db)
+    install_archive_routing(app, db)
+
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(archive_year_command)
+    app.cli.add_command(generate_data_command)
+    app.cli.add_command(search_reindex_command)
+
+    job_runner.init_app(app)
+    broadcaster.init_app(app)
+    profiler.init_app(app)
+    slow_query_log.init_app(app)
+    limiter.init_app(app)
+    metrics.init_app(app)
+    request_profiler.init_app(app)
+    admin_bootstrap.init_app(app)
+    period_close.init_app(app)
+    recompute_planner.init_app(app)
+    query_deadlines.init_app(app)
+
+    if app.config['AUTO_CREATE_SCHEMA']:
+        with app.app_context():
+            db.create_all()
+            create_missing_indexes(db)
+
+    # بيانات المرجع تُحمل مسبقاً بعد التأكد من وجود الجداول
+    reference_cache.init_app(app)
+    search_index.init_app(app)
+    client_autocomplete.init_app(app)
+
+    # الواجهة الأمامية من فهرس في الذاكرة
+    static_assets.init_app(app)
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        if app.static_folder is None:
+            return "Static folder not configured", 404
+
+        asset = static_assets.get(path)
+        if asset is None:
+            return "Not found", 404
+        return static_assets.respond(asset)
+
+    return app
+
 
+app = create_app()
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.run(host='0.0.0.0', port=5000, debug=app.config['DEBUG'])
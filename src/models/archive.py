@@ -0,0 +1,21 @@
+from src.models.user import db
+from datetime import datetime
+import json
+
+class ArchivedYear(db.Model):
+    __tablename__ = 'archive_catalog'
+
+    id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.Integer, unique=True, nullable=False)
+    path = db.Column(db.String(500), nullable=False)  # مسار ملف قاعدة بيانات الأرشيف
+    row_counts = db.Column(db.Text, nullable=True)  # عدد الصفوف المنقولة لكل جدول بصيغة JSON
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'year': self.year,
+            'path': self.path,
+            'row_counts': json.loads(self.row_counts) if self.row_counts else {},
+            'archived_at': self.archived_at.isoformat() if self.archived_at else None
+        }
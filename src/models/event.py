@@ -0,0 +1,14 @@
+from src.models.user import db
+from datetime import datetime
+
+class ChangeEvent(db.Model):
+    __tablename__ = 'change_events'
+
+    id = db.Column(db.Integer, primary_key=True)  # تسلسل الحدث المشترك بين كل العمليات (SSE id)
+    table_name = db.Column(db.String(50), nullable=False)
+    op = db.Column(db.String(10), nullable=False)  # insert, update, delete
+    row_id = db.Column(db.Integer, nullable=True)
+    employee_id = db.Column(db.Integer, nullable=True)
+    period = db.Column(db.String(7), nullable=True)  # YYYY-MM
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
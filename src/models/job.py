@@ -0,0 +1,52 @@
+from src.models.user import db
+from datetime import datetime
+from sqlalchemy import text
+import json
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # commissions, marketing_redistribution
+    dedup_key = db.Column(db.String(200), nullable=False)  # مفتاح منع التكرار مثل commissions:2024:12
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    progress_done = db.Column(db.Integer, default=0)
+    progress_total = db.Column(db.Integer, nullable=True)
+    params = db.Column(db.Text, nullable=True)  # مدخلات المهمة بصيغة JSON
+    result = db.Column(db.Text, nullable=True)  # نتيجة المهمة بصيغة JSON
+    error = db.Column(db.Text, nullable=True)
+    worker_pid = db.Column(db.Integer, nullable=True)  # العملية التي تنفذ المهمة
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    # مهمة نشطة واحدة فقط لكل مفتاح، حتى مع تعدد العمليات
+    __table_args__ = (
+        db.Index(
+            'ix_jobs_active_dedup_key', 'dedup_key', unique=True,
+            sqlite_where=text("status IN ('queued', 'running')")
+        ),
+    )
+
+    ACTIVE_STATUSES = ('queued', 'running')
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'dedup_key': self.dedup_key,
+            'status': self.status,
+            'progress': {
+                'done': self.progress_done or 0,
+                'total': self.progress_total
+            },
+            'params': json.loads(self.params) if self.params else None,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
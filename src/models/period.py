@@ -0,0 +1,36 @@
+from src.models.user import db
+from datetime import datetime
+import json
+
+class ClosedPeriod(db.Model):
+    __tablename__ = 'closed_periods'
+    __table_args__ = (db.UniqueConstraint('year', 'month', name='uq_closed_periods_year_month'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    checksum = db.Column(db.String(64), nullable=False)  # SHA-256 لمحتوى اللقطة بترتيبها
+    row_counts = db.Column(db.Text, nullable=True)  # عدد صفوف اللقطة لكل نوع بصيغة JSON
+    closed_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    closed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'year': self.year,
+            'month': self.month,
+            'checksum': self.checksum,
+            'row_counts': json.loads(self.row_counts) if self.row_counts else {},
+            'closed_by': self.closed_by,
+            'closed_at': self.closed_at.isoformat() if self.closed_at else None
+        }
+
+class PeriodSnapshot(db.Model):
+    __tablename__ = 'period_snapshots'
+    __table_args__ = (db.Index('ix_period_snapshots_period_kind_employee', 'period_id', 'kind', 'employee_id'),)
+
+    id = db.Column(db.Integer, primary_key=True)  # ترتيب الإدراج هو ترتيب العرض
+    period_id = db.Column(db.Integer, db.ForeignKey('closed_periods.id'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # commissions, targets, projects
+    employee_id = db.Column(db.Integer, nullable=True)
+    payload = db.Column(db.Text, nullable=False)  # الصف كما تعيده واجهة القراءة، JSON مرمّز مسبقاً
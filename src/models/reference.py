@@ -0,0 +1,16 @@
+from src.models.user import db
+from datetime import datetime
+
+class ReferenceVersion(db.Model):
+    __tablename__ = 'reference_versions'
+
+    name = db.Column(db.String(50), primary_key=True)  # kpis, commission_rates, teams, budgets
+    version = db.Column(db.Integer, nullable=False, default=0)  # يزيد مع كل معاملة تعدل بيانات المرجع
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'version': self.version,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
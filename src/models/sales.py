@@ -1,9 +1,16 @@
 from src.models.user import db
+from src.services.serializers import SerializerMixin
 from datetime import datetime
 from sqlalchemy import func
 
-class Employee(db.Model):
+class Employee(SerializerMixin, db.Model):
     __tablename__ = 'employees'
+    __serializers__ = {
+        'default': ('id', 'name', 'role', 'base_salary', 'team_id', 'team_name=team.name', 'phone',
+                    'email', 'hire_date', 'is_active', 'created_at'),
+        'list': ('id', 'name', 'role', 'base_salary', 'team_id', 'team_name=team.name', 'phone',
+                 'email', 'hire_date'),
+    }
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -22,8 +29,11 @@ class Employee(db.Model):
     targets = db.relationship('Target', backref='employee')
     performance_scores = db.relationship('PerformanceScore', backref='employee')
 
-class Team(db.Model):
+class Team(SerializerMixin, db.Model):
     __tablename__ = 'teams'
+    __serializers__ = {
+        'default': ('id', 'name', 'leader_id', 'leader_name=leader.name', 'created_at'),
+    }
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -33,8 +43,21 @@ class Team(db.Model):
     # العلاقات
     leader = db.relationship('Employee', foreign_keys=[leader_id], post_update=True)
 
-class Project(db.Model):
+class Project(SerializerMixin, db.Model):
     __tablename__ = 'projects'
+    # نفس فهارس ملفات الأرشيف: قراءة شهر الموظف وإعادة حسابه دون مسح الجدول
+    __table_args__ = (
+        db.Index('ix_projects_employee_id_signature_date', 'employee_id', 'signature_date'),
+        db.Index('ix_projects_signature_date', 'signature_date'),
+    )
+    __serializers__ = {
+        'default': ('id', 'employee_id', 'employee_name=employee.name', 'client_name', 'project_value',
+                    'product_type', 'signature_date', 'is_from_social_media', 'marketing_cost_allocated',
+                    'commission_rate', 'final_commission', 'notes', 'created_at', 'updated_at'),
+        'list': ('id', 'employee_id', 'employee_name=employee.name', 'client_name', 'project_value',
+                 'product_type', 'signature_date', 'is_from_social_media', 'marketing_cost_allocated',
+                 'commission_rate', 'final_commission', 'notes'),
+    }
     
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
@@ -50,8 +73,15 @@ class Project(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-class Target(db.Model):
+class Target(SerializerMixin, db.Model):
     __tablename__ = 'targets'
+    __table_args__ = (db.Index('ix_targets_employee_id_year_month', 'employee_id', 'year', 'month'),)
+    __serializers__ = {
+        'default': ('id', 'employee_id', 'employee_name=employee.name', 'month', 'year', 'target_amount',
+                    'achieved_amount', 'achievement_percentage', 'created_at', 'updated_at'),
+        'list': ('id', 'employee_id', 'employee_name=employee.name', 'month', 'year', 'target_amount',
+                 'achieved_amount', 'achievement_percentage'),
+    }
     
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
@@ -63,8 +93,14 @@ class Target(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-class MarketingBudget(db.Model):
+class MarketingBudget(SerializerMixin, db.Model):
     __tablename__ = 'marketing_budgets'
+    __serializers__ = {
+        'default': ('id', 'month', 'year', 'total_budget', 'allocated_budget', 'remaining_budget',
+                    'created_by', 'creator_name=creator.name', 'created_at', 'updated_at'),
+        'list': ('id', 'month', 'year', 'total_budget', 'allocated_budget', 'remaining_budget',
+                 'created_by', 'creator_name=creator.name'),
+    }
     
     id = db.Column(db.Integer, primary_key=True)
     month = db.Column(db.Integer, nullable=False)
@@ -79,8 +115,11 @@ class MarketingBudget(db.Model):
     # العلاقات
     creator = db.relationship('Employee', backref='marketing_budgets')
 
-class PerformanceKPI(db.Model):
+class PerformanceKPI(SerializerMixin, db.Model):
     __tablename__ = 'performance_kpis'
+    __serializers__ = {
+        'list': ('id', 'name', 'description', 'weight', 'max_score'),
+    }
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)  # اسم مؤشر الأداء
@@ -90,8 +129,13 @@ class PerformanceKPI(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-class PerformanceScore(db.Model):
+class PerformanceScore(SerializerMixin, db.Model):
     __tablename__ = 'performance_scores'
+    __table_args__ = (db.Index('ix_performance_scores_employee_id_year_month', 'employee_id', 'year', 'month'),)
+    __serializers__ = {
+        'list': ('id', 'employee_id', 'employee_name=employee.name', 'kpi_id', 'kpi_name=kpi.name',
+                 'month', 'year', 'score', 'weighted_score', 'notes'),
+    }
     
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
@@ -107,8 +151,14 @@ class PerformanceScore(db.Model):
     # العلاقات
     kpi = db.relationship('PerformanceKPI', backref='scores')
 
-class Commission(db.Model):
+class Commission(SerializerMixin, db.Model):
     __tablename__ = 'commissions'
+    __table_args__ = (db.Index('ix_commissions_employee_id_year_month', 'employee_id', 'year', 'month'),)
+    __serializers__ = {
+        'list': ('id', 'employee_id', 'employee_name=employee.name', 'month', 'year', 'base_commission',
+                 'marketing_deduction', 'performance_bonus', 'final_commission', 'total_salary',
+                 'is_approved', 'approved_by', 'approved_at'),
+    }
     
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
@@ -129,6 +179,17 @@ class Commission(db.Model):
     employee = db.relationship('Employee', foreign_keys=[employee_id], backref='commissions')
     approver = db.relationship('Employee', foreign_keys=[approved_by])
 
+class CommissionFingerprint(db.Model):
+    __tablename__ = 'commission_fingerprints'
+    __table_args__ = (db.UniqueConstraint('employee_id', 'year', 'month', name='uq_commission_fingerprints_cell'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)  # SHA-256 لمدخلات آخر حساب للعمولة
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class CommissionRate(db.Model):
     __tablename__ = 'commission_rates'
     
@@ -1,8 +1,22 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from src.models.user import db
+from src.models.auth import User
 from src.models.sales import Employee, Team, Project, Target, PerformanceKPI, PerformanceScore, Commission, MarketingBudget
 from src.routes.auth import require_auth, require_role
+from src.routes.sales import closed_period_error
+from src.services import archive
+from src.services.bootstrap import admin_bootstrap
+from src.services.datagen import generate_data
+from src.services.jobs import wants_async, submit_job
+from src.services.periods import period_close, PeriodError
+from src.services.perf import profiler, slow_query_log
+from src.services.rate_limit import limiter
+from src.services.reference_cache import reference_cache
+from src.services.request_profiler import DEFAULT_MODE, request_profiler
+from src.services.serializers import serializer
 from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -218,16 +232,16 @@ def get_all_projects():
         year = request.args.get('year', type=int)
         employee_id = request.args.get('employee_id', type=int)
         
-        query = Project.query
+        query, project = archive.query(Project, year if month and year else None)
         
         if month and year:
             query = query.filter(
-                db.extract('month', Project.signature_date) == month,
-                db.extract('year', Project.signature_date) == year
+                db.extract('month', project.signature_date) == month,
+                db.extract('year', project.signature_date) == year
             )
         
         if employee_id:
-            query = query.filter(Project.employee_id == employee_id)
+            query = query.filter(project.employee_id == employee_id)
         
         projects = query.all()
         return jsonify([proj.to_dict() for proj in projects]), 200
@@ -250,6 +264,13 @@ def update_project(project_id):
             if not project.employee or project.employee.team_id != request.current_user.employee.team_id:
                 return jsonify({'error': 'ليس لديك صلاحية لتعديل هذا المشروع'}), 403
         
+        # الشهر الحالي للمشروع والشهر الذي يُنقل إليه كلاهما يجب أن يكون مفتوحاً
+        error = closed_period_error(project.signature_date.year, project.signature_date.month)
+        if not error and 'signature_date' in data:
+            error = closed_period_error(data['signature_date'][:4], data['signature_date'][5:7])
+        if error:
+            return error
+        
         if 'client_name' in data:
             project.client_name = data['client_name']
         if 'project_value' in data:
@@ -263,11 +284,13 @@ def update_project(project_id):
         if 'notes' in data:
             project.notes = data['notes']
         
+        # الأهداف والعمولات ونسب التسويق للأشهر المتأثرة تُعاد حسابها قبل الالتزام
         db.session.commit()
         
         return jsonify({
             'message': 'تم تحديث المشروع بنجاح',
-            'project': project.to_dict()
+            'project': project.to_dict(),
+            'recomputed': db.session.info.pop('recomputed', None)
         }), 200
         
     except Exception as e:
@@ -282,10 +305,17 @@ def delete_project(project_id):
     try:
         project = Project.query.get_or_404(project_id)
         
+        error = closed_period_error(project.signature_date.year, project.signature_date.month)
+        if error:
+            return error
+        
         db.session.delete(project)
         db.session.commit()
         
-        return jsonify({'message': 'تم حذف المشروع بنجاح'}), 200
+        return jsonify({
+            'message': 'تم حذف المشروع بنجاح',
+            'recomputed': db.session.info.pop('recomputed', None)
+        }), 200
         
     except Exception as e:
         db.session.rollback()
@@ -305,6 +335,13 @@ def create_target():
             if field not in data:
                 return jsonify({'error': f'الحقل {field} مطلوب'}), 400
         
+        if archive.catalog.is_archived(data['year']):
+            return jsonify({'error': f"السنة {data['year']} مؤرشفة ولا يمكن تعديل بياناتها"}), 409
+        
+        error = closed_period_error(data['year'], data['month'])
+        if error:
+            return error
+        
         # التحقق من عدم وجود هدف للموظف في نفس الشهر
         existing_target = Target.query.filter_by(
             employee_id=data['employee_id'],
@@ -343,6 +380,10 @@ def update_target(target_id):
         target = Target.query.get_or_404(target_id)
         data = request.get_json()
         
+        error = closed_period_error(target.year, target.month)
+        if error:
+            return error
+        
         if 'target_amount' in data:
             target.target_amount = float(data['target_amount'])
         
@@ -365,6 +406,10 @@ def delete_target(target_id):
     try:
         target = Target.query.get_or_404(target_id)
         
+        error = closed_period_error(target.year, target.month)
+        if error:
+            return error
+        
         db.session.delete(target)
         db.session.commit()
         
@@ -499,6 +544,10 @@ def set_marketing_budget():
             if field not in data:
                 return jsonify({'error': f'الحقل {field} مطلوب'}), 400
         
+        error = closed_period_error(data['year'], data['month'])
+        if error:
+            return error
+        
         # البحث عن ميزانية موجودة أو إنشاء جديدة
         budget = MarketingBudget.query.filter_by(
             month=data['month'],
@@ -530,3 +579,281 @@ def set_marketing_budget():
         db.session.rollback()
         return jsonify({'error': f'خطأ في تحديد ميزانية التسويق: {str(e)}'}), 500
 
+# ===== تهيئة شاشات الإدارة =====
+@admin_bootstrap.resource('users', roles=['admin', 'sales_manager'])
+def bootstrap_users(session):
+    users = session.scalars(select(User).options(selectinload(User.employee)))
+    return [user.to_dict() for user in users]
+
+@admin_bootstrap.resource('employees')
+def bootstrap_employees(session):
+    employees = session.scalars(select(Employee).options(selectinload(Employee.team)))
+    return serializer(Employee).many(employees)
+
+@admin_bootstrap.resource('teams')
+def bootstrap_teams(session):
+    teams = session.scalars(select(Team).options(selectinload(Team.leader)))
+    return serializer(Team).many(teams)
+
+@admin_bootstrap.resource('kpis')
+def bootstrap_kpis(session):
+    return serializer(PerformanceKPI).many(session.scalars(select(PerformanceKPI)))
+
+@admin_bootstrap.resource('marketing_budgets', roles=['admin', 'sales_manager'])
+def bootstrap_marketing_budgets(session):
+    budgets = session.scalars(
+        select(MarketingBudget).options(selectinload(MarketingBudget.creator))
+        .order_by(MarketingBudget.year.desc(), MarketingBudget.month.desc())
+    )
+    return serializer(MarketingBudget, 'list').many(budgets)
+
+@admin_bp.route('/bootstrap', methods=['GET'])
+@require_auth
+def bootstrap():
+    """عدة موارد في استجابة واحدة: ?resources=users,teams&etags=users:<etag>
+
+    الموارد التي يطابق ETag المرسل لها ترجع not_modified دون بيانات.
+    """
+    try:
+        names = [name for name in request.args.get('resources', '').split(',') if name]
+        if not names:
+            return jsonify({'error': 'الموارد المطلوبة غير محددة'}), 400
+        unknown = [name for name in names if name not in admin_bootstrap.resources]
+        if unknown:
+            return jsonify({'error': f"موارد غير معروفة: {', '.join(unknown)}"}), 400
+
+        etags = dict(
+            item.split(':', 1) for item in request.args.get('etags', '').split(',') if ':' in item
+        )
+        body = admin_bootstrap.load(list(dict.fromkeys(names)), etags, request.current_user.role)
+        return Response(body, mimetype='application/json')
+    except Exception as e:
+        return jsonify({'error': f'خطأ في تهيئة لوحة الإدارة: {str(e)}'}), 500
+
+# ===== إغلاق الأشهر =====
+@admin_bp.route('/periods', methods=['GET'])
+@require_auth
+@require_role(['admin', 'sales_manager'])
+def get_closed_periods():
+    """الأشهر المغلقة ولقطاتها"""
+    try:
+        return jsonify([period.to_dict() for period in period_close.periods()]), 200
+    except Exception as e:
+        return jsonify({'error': f'خطأ في جلب الأشهر المغلقة: {str(e)}'}), 500
+
+@admin_bp.route('/periods/<int:year>/<int:month>/close', methods=['POST'])
+@require_auth
+@require_role(['admin', 'sales_manager'])
+def close_period(year, month):
+    """إغلاق شهر: لقطة ثابتة للعمولات والأهداف وتوزيع التسويق"""
+    try:
+        if not 1 <= month <= 12:
+            return jsonify({'error': 'الشهر غير صالح'}), 400
+        period = period_close.close(year, month, closed_by=request.current_user.id)
+        return jsonify({'message': f'تم إغلاق الشهر {month}/{year}', 'period': period}), 201
+    except PeriodError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'خطأ في إغلاق الشهر: {str(e)}'}), 500
+
+@admin_bp.route('/periods/<int:year>/<int:month>/reopen', methods=['POST'])
+@require_auth
+@require_role(['admin'])
+def reopen_period(year, month):
+    """إعادة فتح شهر مغلق وحذف لقطته"""
+    try:
+        period = period_close.reopen(year, month)
+        return jsonify({'message': f'تمت إعادة فتح الشهر {month}/{year}', 'period': period}), 200
+    except PeriodError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'خطأ في إعادة فتح الشهر: {str(e)}'}), 500
+
+@admin_bp.route('/periods/<int:year>/<int:month>/verify', methods=['GET'])
+@require_auth
+@require_role(['admin', 'sales_manager'])
+def verify_period(year, month):
+    """التحقق من سلامة لقطة الشهر بإعادة حساب checksum"""
+    try:
+        return jsonify(period_close.verify(year, month)), 200
+    except PeriodError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': f'خطأ في التحقق من الشهر: {str(e)}'}), 500
+
+# ===== مراقبة الأداء =====
+@admin_bp.route('/perf/requests', methods=['GET'])
+@require_auth
+@require_role(['admin'])
+def get_slowest_requests():
+    """أبطأ الطلبات مع عدد استعلامات SQL وزمنها"""
+    limit = request.args.get('limit', type=int)
+    return jsonify({
+        'enabled': profiler.enabled,
+        'capacity': profiler.capacity,
+        'requests': profiler.slowest(limit)
+    }), 200
+
+@admin_bp.route('/perf/requests', methods=['DELETE'])
+@require_auth
+@require_role(['admin'])
+def reset_slowest_requests():
+    """مسح سجل أبطأ الطلبات"""
+    profiler.reset()
+    return jsonify({'message': 'تم مسح سجل الطلبات'}), 200
+
+@admin_bp.route('/perf/slow-queries', methods=['GET'])
+@require_auth
+@require_role(['admin'])
+def get_slow_queries():
+    """الاستعلامات البطيئة مجمعة حسب البصمة مع خطة التنفيذ"""
+    order_by = request.args.get('order_by', 'total_ms')
+    if order_by not in ('total_ms', 'count', 'p95_ms', 'max_ms'):
+        return jsonify({'error': 'حقل الترتيب غير صالح'}), 400
+    limit = request.args.get('limit', type=int)
+    return jsonify({
+        'enabled': slow_query_log.enabled,
+        'threshold_ms': slow_query_log.threshold * 1000,
+        'queries': slow_query_log.entries(order_by)[:limit]
+    }), 200
+
+@admin_bp.route('/perf/slow-queries', methods=['DELETE'])
+@require_auth
+@require_role(['admin'])
+def reset_slow_queries():
+    """مسح سجل الاستعلامات البطيئة"""
+    slow_query_log.reset()
+    return jsonify({'message': 'تم مسح سجل الاستعلامات البطيئة'}), 200
+
+@admin_bp.route('/perf/slow-queries/dump', methods=['POST'])
+@require_auth
+@require_role(['admin'])
+def dump_slow_queries():
+    """حفظ سجل الاستعلامات البطيئة في ملف JSON داخل مجلد SLOW_QUERY_DUMP_PATH"""
+    try:
+        written = slow_query_log.dump_snapshot()
+        if not written:
+            return jsonify({'error': 'لم يُضبط SLOW_QUERY_DUMP_PATH على الخادم'}), 400
+        return jsonify({'message': 'تم حفظ السجل', 'path': written}), 200
+    except Exception as e:
+        return jsonify({'error': f'خطأ في حفظ السجل: {str(e)}'}), 500
+
+@admin_bp.route('/perf/rate-limits', methods=['GET'])
+@require_auth
+@require_role(['admin'])
+def get_rate_limits():
+    """عدادات القبول والرفض لمحدد المعدل في هذه العملية"""
+    return jsonify({
+        'enabled': limiter.enabled,
+        'tracked_keys': limiter.tracked_keys(),
+        'counters': limiter.counters()
+    }), 200
+
+@admin_bp.route('/perf/reference-cache', methods=['GET'])
+@require_auth
+@require_role(['admin'])
+def get_reference_cache():
+    """إصدارات بيانات المرجع المحملة في هذه العملية"""
+    return jsonify({'ttl': reference_cache.ttl, 'versions': reference_cache.versions()}), 200
+
+@admin_bp.route('/perf/reference-cache', methods=['DELETE'])
+@require_auth
+@require_role(['admin'])
+def reset_reference_cache():
+    """إسقاط ذاكرة بيانات المرجع لتُحمل من القاعدة عند أول طلب"""
+    reference_cache.invalidate()
+    return jsonify({'message': 'تم مسح ذاكرة بيانات المرجع'}), 200
+
+@admin_bp.route('/perf/profile', methods=['POST'])
+@require_auth
+@require_role(['admin'])
+def start_profile():
+    """تحليل الطلبات القادمة المطابقة لمسار أو نسبة عينة في هذه العملية"""
+    try:
+        data = request.get_json(silent=True) or {}
+        session = request_profiler.start(
+            route=data.get('route') or None,
+            requests=int(data.get('requests', 10)),
+            sample_rate=float(data.get('sample_rate', 1.0)),
+            mode=data.get('mode', DEFAULT_MODE),
+            interval_ms=float(data.get('interval_ms', 5))
+        )
+        return jsonify({'message': 'بدأ التحليل', 'session': session.to_dict()}), 201
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+@admin_bp.route('/perf/profile', methods=['GET'])
+@require_auth
+@require_role(['admin'])
+def get_profile():
+    """نتيجة آخر جلسة تحليل: json أو pstats أو collapsed للرسم اللهبي"""
+    session = request_profiler.session
+    if session is None:
+        return jsonify({'error': 'لا توجد جلسة تحليل'}), 404
+
+    output = request.args.get('format', 'json')
+    sort = request.args.get('sort', 'cumulative')
+    limit = request.args.get('limit', 50, type=int)
+    if output == 'collapsed':
+        return Response(session.collapsed_text(), mimetype='text/plain')
+    try:
+        text = session.pstats_text(sort, limit)
+    except KeyError:
+        return jsonify({'error': 'حقل الترتيب غير صالح'}), 400
+    if output == 'pstats':
+        return Response(text, mimetype='text/plain')
+    return jsonify({
+        'session': session.to_dict(),
+        'pstats': text,
+        'collapsed': session.collapsed_text()
+    }), 200
+
+@admin_bp.route('/perf/profile', methods=['DELETE'])
+@require_auth
+@require_role(['admin'])
+def stop_profile():
+    """إيقاف جلسة التحليل الجارية مع الاحتفاظ بنتائجها"""
+    session = request_profiler.stop()
+    if session is None:
+        return jsonify({'error': 'لا توجد جلسة تحليل'}), 404
+    return jsonify({'message': 'تم إيقاف التحليل', 'session': session.to_dict()}), 200
+
+# ===== البيانات التجريبية =====
+# الاستبدال (حذف بيانات المبيعات الحالية) متاح من سطر الأوامر فقط: flask generate-data --replace
+GENERATE_DATA_FIELDS = {
+    'teams': int, 'employees_per_team': int, 'months': int, 'projects_per_rep': int,
+    'social_share': float, 'start_year': int, 'start_month': int, 'seed': int
+}
+
+@admin_bp.route('/generate-data', methods=['POST'])
+@require_auth
+@require_role(['admin'])
+def generate_sample_data():
+    """توليد بيانات تجريبية بحجم قابل للضبط (?async=1 للتنفيذ في الخلفية)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            params = {
+                name: cast(data[name]) for name, cast in GENERATE_DATA_FIELDS.items() if name in data
+            }
+        except (TypeError, ValueError):
+            return jsonify({'error': 'قيم المدخلات غير صالحة'}), 400
+        if data.get('replace'):
+            return jsonify({'error': 'استبدال البيانات متاح من سطر الأوامر فقط'}), 400
+
+        if wants_async():
+            key = tuple(f'{name}={params[name]}' for name in sorted(params))
+            return submit_job('generate_data', key or ('default',), generate_data, params)
+
+        result = generate_data(**params)
+        return jsonify({'message': 'تم توليد البيانات التجريبية', **result}), 201
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'خطأ في توليد البيانات: {str(e)}'}), 500
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify, session
 from src.models.user import db
 from src.models.auth import User, UserSession, Permission, RolePermission
 from src.models.sales import Employee
+from src.services.rate_limit import limiter
 from datetime import datetime, timedelta
 import secrets
 from functools import wraps
@@ -90,6 +91,7 @@ def register():
         return jsonify({'error': f'خطأ في إنشاء المستخدم: {str(e)}'}), 500
 
 @auth_bp.route('/login', methods=['POST'])
+@limiter.limit('login')
 def login():
     """تسجيل الدخول"""
     try:
@@ -236,6 +238,7 @@ def delete_user(user_id):
         return jsonify({'error': f'خطأ في حذف المستخدم: {str(e)}'}), 500
 
 @auth_bp.route('/init-admin', methods=['POST'])
+@limiter.limit('init_admin')
 def init_admin():
     """إنشاء حساب المدير الأول (يستخدم مرة واحدة فقط)"""
     try:
@@ -0,0 +1,30 @@
+from flask import Blueprint, Response, request, jsonify
+from src.services.events import broadcaster
+
+events_bp = Blueprint('events', __name__)
+
+TRACKED_TABLES = {'projects', 'targets', 'commissions', 'marketing_budgets'}
+
+@events_bp.route('/events', methods=['GET'])
+def stream_events():
+    """بث أحداث التغيير (Server-Sent Events)"""
+    tables = None
+    if request.args.get('tables'):
+        tables = set(request.args['tables'].split(',')) & TRACKED_TABLES
+
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+
+    client = broadcaster.subscribe(tables=tables, last_event_id=last_event_id)
+    if client is None:
+        response = jsonify({'error': 'تم بلوغ الحد الأقصى لعدد الاتصالات'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+
+    return Response(
+        broadcaster.stream(client),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
@@ -0,0 +1,46 @@
+from flask import Blueprint, request, jsonify
+from src.models.job import Job
+from src.services.jobs import job_runner
+import json
+
+jobs_bp = Blueprint('jobs', __name__)
+
+@jobs_bp.route('/jobs', methods=['GET'])
+def get_jobs():
+    """قائمة آخر المهام"""
+    kind = request.args.get('kind')
+    status = request.args.get('status')
+    limit = min(request.args.get('limit', 50, type=int), 200)
+
+    query = Job.query
+    if kind:
+        query = query.filter_by(kind=kind)
+    if status:
+        query = query.filter_by(status=status)
+
+    jobs = query.order_by(Job.id.desc()).limit(limit).all()
+    return jsonify([job_runner.status(job) for job in jobs])
+
+@jobs_bp.route('/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """حالة المهمة وتقدمها"""
+    job = Job.query.get_or_404(job_id)
+    return jsonify(job_runner.status(job))
+
+@jobs_bp.route('/jobs/<int:job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """نتيجة المهمة بعد اكتمالها"""
+    job = Job.query.get_or_404(job_id)
+
+    if job.is_active:
+        response = jsonify(job_runner.status(job))
+        response.headers['Retry-After'] = '2'
+        return response, 202
+
+    if job.status == 'failed':
+        return jsonify({'error': job.error, 'job': job.to_dict()}), 500
+
+    return jsonify({
+        'job': job.to_dict(),
+        'result': json.loads(job.result) if job.result else None
+    })
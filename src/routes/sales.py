@@ -2,29 +2,46 @@ from flask import Blueprint, request, jsonify
 from src.models.user import db
 from src.models.sales import (
     Employee, Team, Project, Target, MarketingBudget, 
-    PerformanceKPI, PerformanceScore, Commission, CommissionRate
+    PerformanceKPI, PerformanceScore, Commission, CommissionFingerprint, CommissionRate
 )
+from src.services.jobs import wants_async, submit_job
+from src.services import archive
+from src.services.autocomplete import client_autocomplete
+from src.services.periods import period_close, PeriodError
+from src.services.reference_cache import reference_cache
+from src.services.serializers import serializer
+from src.services.unit_of_work import project_unit_of_work
 from datetime import datetime, date
 from sqlalchemy import func, and_, extract
+from sqlalchemy.orm import noload
 import calendar
+import hashlib
 
 sales_bp = Blueprint('sales', __name__)
 
+def archived_year_error(year):
+    """رد 409 إذا كانت السنة مؤرشفة (مغلقة) ولا تقبل التعديل"""
+    if archive.catalog.is_archived(year):
+        return jsonify({'error': f'السنة {year} مؤرشفة ولا يمكن تعديل بياناتها'}), 409
+    return None
+
+def closed_period_error(year, month):
+    """رد 409 إذا كان الشهر مغلقاً ولا يقبل إعادة الحساب أو التعديل قبل إعادة فتحه"""
+    if period_close.is_closed(year, month):
+        return jsonify({'error': f'الشهر {month}/{year} مغلق ولا يمكن تعديل بياناته قبل إعادة فتحه'}), 409
+    return None
+
 # ===== مسارات الموظفين =====
 @sales_bp.route('/employees', methods=['GET'])
 def get_employees():
-    employees = Employee.query.filter_by(is_active=True).all()
-    return jsonify([{
-        'id': emp.id,
-        'name': emp.name,
-        'role': emp.role,
-        'base_salary': emp.base_salary,
-        'team_id': emp.team_id,
-        'team_name': emp.team.name if emp.team else None,
-        'phone': emp.phone,
-        'email': emp.email,
-        'hire_date': emp.hire_date.isoformat() if emp.hire_date else None
-    } for emp in employees])
+    # أسماء الفرق من ذاكرة بيانات المرجع بدلاً من تحميل كل فريق
+    employees = Employee.query.options(noload(Employee.team)).filter_by(is_active=True).all()
+    result = serializer(Employee, 'list').many(employees)
+    teams = reference_cache.teams()
+    for item in result:
+        team = teams.get(item['team_id'])
+        item['team_name'] = team.name if team else None
+    return jsonify(result)
 
 @sales_bp.route('/employees', methods=['POST'])
 def create_employee():
@@ -71,70 +88,53 @@ def get_projects():
     month = request.args.get('month')
     year = request.args.get('year')
     
-    query = Project.query
+    # الشهر المغلق يُقرأ من لقطته كما هي
+    if month and year:
+        snapshot = period_close.snapshot_response(year, month, 'projects', employee_id)
+        if snapshot is not None:
+            return snapshot
+    
+    query, project = archive.query(Project, year if month and year else None)
     
     if employee_id:
-        query = query.filter_by(employee_id=employee_id)
+        query = query.filter(project.employee_id == employee_id)
     if month and year:
         query = query.filter(
-            extract('month', Project.signature_date) == int(month),
-            extract('year', Project.signature_date) == int(year)
+            extract('month', project.signature_date) == int(month),
+            extract('year', project.signature_date) == int(year)
         )
     
-    projects = query.order_by(Project.signature_date.desc()).all()
-    
-    return jsonify([{
-        'id': proj.id,
-        'employee_id': proj.employee_id,
-        'employee_name': proj.employee.name,
-        'client_name': proj.client_name,
-        'project_value': proj.project_value,
-        'product_type': proj.product_type,
-        'signature_date': proj.signature_date.isoformat(),
-        'is_from_social_media': proj.is_from_social_media,
-        'marketing_cost_allocated': proj.marketing_cost_allocated,
-        'commission_rate': proj.commission_rate,
-        'final_commission': proj.final_commission,
-        'notes': proj.notes
-    } for proj in projects])
+    # صفوف أعمدة مع اسم الموظف في استعلام واحد بدلاً من تحميل كل موظف على حدة
+    projects = serializer(Project, 'list')
+    rows = query.outerjoin(Employee, Employee.id == project.employee_id).with_entities(
+        *projects.columns(project, employee=Employee)
+    ).order_by(project.signature_date.desc()).all()
+    
+    return jsonify(projects.rows(rows))
+
+@sales_bp.route('/clients/autocomplete', methods=['GET'])
+def autocomplete_clients():
+    """أسماء العملاء المطابقة لما يكتبه المندوب، من الفهرس في الذاكرة دون استعلام"""
+    query = request.args.get('q', '')
+    items = client_autocomplete.lookup(query, request.args.get('limit', 10, type=int))
+    if items is None:
+        # الفهرس قيد البناء: نتيجة فارغة بدلاً من انتظار القاعدة
+        return jsonify({'query': query, 'items': [], 'ready': False})
+    return jsonify({'query': query, 'items': items, 'ready': True})
 
 @sales_bp.route('/projects', methods=['POST'])
 def create_project():
     data = request.get_json()
     
-    project = Project(
-        employee_id=data['employee_id'],
-        client_name=data['client_name'],
-        project_value=data['project_value'],
-        product_type=data['product_type'],
-        signature_date=datetime.strptime(data['signature_date'], '%Y-%m-%d').date(),
-        is_from_social_media=data.get('is_from_social_media', False),
-        notes=data.get('notes')
-    )
-    
-    # حساب العمولة الأولية
-    employee = Employee.query.get(data['employee_id'])
-    achievement_rate = calculate_achievement_rate(employee.id, project.signature_date.month, project.signature_date.year)
-    commission_rate = get_commission_rate(employee.role, achievement_rate)
-    
-    # تطبيق خصم السوشيال ميديا
-    if project.is_from_social_media:
-        commission_rate -= 0.005  # خصم 0.5%
-    
-    project.commission_rate = commission_rate
-    project.final_commission = project.project_value * commission_rate
+    error = archived_year_error(data['signature_date'][:4]) or \
+        closed_period_error(data['signature_date'][:4], data['signature_date'][5:7])
+    if error:
+        return error
     
-    db.session.add(project)
-    db.session.commit()
-    
-    # تحديث الأهداف المحققة
-    update_target_achievement(employee.id, project.signature_date.month, project.signature_date.year)
-    
-    # توزيع تكلفة التسويق إذا كان المشروع من السوشيال ميديا
-    if project.is_from_social_media:
-        allocate_marketing_cost(project.id, project.signature_date.month, project.signature_date.year)
+    # المشروع وعمولته والهدف وتكلفة التسويق في معاملة واحدة
+    project_id = project_unit_of_work.create_project(data)
     
-    return jsonify({'message': 'تم إنشاء المشروع بنجاح', 'id': project.id}), 201
+    return jsonify({'message': 'تم إنشاء المشروع بنجاح', 'id': project_id}), 201
 
 # ===== مسارات الأهداف =====
 @sales_bp.route('/targets', methods=['GET'])
@@ -143,30 +143,33 @@ def get_targets():
     month = request.args.get('month')
     year = request.args.get('year')
     
-    query = Target.query
+    if month and year:
+        snapshot = period_close.snapshot_response(year, month, 'targets', employee_id)
+        if snapshot is not None:
+            return snapshot
+    
+    query, entity = archive.query(Target, year if month and year else None)
     
     if employee_id:
-        query = query.filter_by(employee_id=employee_id)
+        query = query.filter(entity.employee_id == employee_id)
     if month and year:
-        query = query.filter_by(month=int(month), year=int(year))
-    
-    targets = query.all()
-    
-    return jsonify([{
-        'id': target.id,
-        'employee_id': target.employee_id,
-        'employee_name': target.employee.name,
-        'month': target.month,
-        'year': target.year,
-        'target_amount': target.target_amount,
-        'achieved_amount': target.achieved_amount,
-        'achievement_percentage': target.achievement_percentage
-    } for target in targets])
+        query = query.filter(entity.month == int(month), entity.year == int(year))
+    
+    targets = serializer(Target, 'list')
+    rows = query.outerjoin(Employee, Employee.id == entity.employee_id).with_entities(
+        *targets.columns(entity, employee=Employee)
+    ).all()
+    
+    return jsonify(targets.rows(rows))
 
 @sales_bp.route('/targets', methods=['POST'])
 def create_target():
     data = request.get_json()
     
+    error = archived_year_error(data['year']) or closed_period_error(data['year'], data['month'])
+    if error:
+        return error
+    
     # التحقق من وجود هدف للموظف في نفس الشهر
     existing_target = Target.query.filter_by(
         employee_id=data['employee_id'],
@@ -198,35 +201,21 @@ def get_marketing_budget():
     if month and year:
         budget = MarketingBudget.query.filter_by(month=int(month), year=int(year)).first()
         if budget:
-            return jsonify({
-                'id': budget.id,
-                'month': budget.month,
-                'year': budget.year,
-                'total_budget': budget.total_budget,
-                'allocated_budget': budget.allocated_budget,
-                'remaining_budget': budget.remaining_budget,
-                'created_by': budget.created_by,
-                'creator_name': budget.creator.name
-            })
+            return jsonify(budget.to_dict('list'))
         else:
             return jsonify({'error': 'لا توجد ميزانية لهذا الشهر'}), 404
     
     budgets = MarketingBudget.query.order_by(MarketingBudget.year.desc(), MarketingBudget.month.desc()).all()
-    return jsonify([{
-        'id': budget.id,
-        'month': budget.month,
-        'year': budget.year,
-        'total_budget': budget.total_budget,
-        'allocated_budget': budget.allocated_budget,
-        'remaining_budget': budget.remaining_budget,
-        'created_by': budget.created_by,
-        'creator_name': budget.creator.name
-    } for budget in budgets])
+    return jsonify(serializer(MarketingBudget, 'list').many(budgets))
 
 @sales_bp.route('/marketing-budget', methods=['POST'])
 def create_marketing_budget():
     data = request.get_json()
     
+    error = closed_period_error(data['year'], data['month'])
+    if error:
+        return error
+    
     # التحقق من وجود ميزانية للشهر
     existing_budget = MarketingBudget.query.filter_by(
         month=data['month'],
@@ -248,6 +237,13 @@ def create_marketing_budget():
     db.session.commit()
     
     # إعادة توزيع التكاليف على المشاريع الموجودة
+    if wants_async():
+        return submit_job(
+            'marketing_redistribution', (data['year'], data['month']),
+            redistribute_marketing_costs, {'month': data['month'], 'year': data['year']},
+            id=budget.id
+        )
+    
     redistribute_marketing_costs(data['month'], data['year'])
     
     return jsonify({'message': 'تم إنشاء ميزانية التسويق بنجاح', 'id': budget.id}), 201
@@ -256,13 +252,7 @@ def create_marketing_budget():
 @sales_bp.route('/performance-kpis', methods=['GET'])
 def get_performance_kpis():
     kpis = PerformanceKPI.query.filter_by(is_active=True).all()
-    return jsonify([{
-        'id': kpi.id,
-        'name': kpi.name,
-        'description': kpi.description,
-        'weight': kpi.weight,
-        'max_score': kpi.max_score
-    } for kpi in kpis])
+    return jsonify(serializer(PerformanceKPI, 'list').many(kpis))
 
 @sales_bp.route('/performance-kpis', methods=['POST'])
 def create_performance_kpi():
@@ -287,32 +277,28 @@ def get_performance_scores():
     month = request.args.get('month')
     year = request.args.get('year')
     
-    query = PerformanceScore.query
+    query, entity = archive.query(PerformanceScore, year if month and year else None)
     
     if employee_id:
-        query = query.filter_by(employee_id=employee_id)
+        query = query.filter(entity.employee_id == employee_id)
     if month and year:
-        query = query.filter_by(month=int(month), year=int(year))
-    
-    scores = query.all()
-    
-    return jsonify([{
-        'id': score.id,
-        'employee_id': score.employee_id,
-        'employee_name': score.employee.name,
-        'kpi_id': score.kpi_id,
-        'kpi_name': score.kpi.name,
-        'month': score.month,
-        'year': score.year,
-        'score': score.score,
-        'weighted_score': score.weighted_score,
-        'notes': score.notes
-    } for score in scores])
+        query = query.filter(entity.month == int(month), entity.year == int(year))
+    
+    scores = serializer(PerformanceScore, 'list')
+    rows = query.outerjoin(Employee, Employee.id == entity.employee_id).outerjoin(
+        PerformanceKPI, PerformanceKPI.id == entity.kpi_id
+    ).with_entities(*scores.columns(entity, employee=Employee, kpi=PerformanceKPI)).all()
+    
+    return jsonify(scores.rows(rows))
 
 @sales_bp.route('/performance-scores', methods=['POST'])
 def create_performance_score():
     data = request.get_json()
     
+    error = archived_year_error(data['year']) or closed_period_error(data['year'], data['month'])
+    if error:
+        return error
+    
     # التحقق من وجود نقاط للموظف في نفس الشهر ونفس المؤشر
     existing_score = PerformanceScore.query.filter_by(
         employee_id=data['employee_id'],
@@ -321,10 +307,13 @@ def create_performance_score():
         year=data['year']
     ).first()
     
+    kpi = reference_cache.kpi(data['kpi_id'])
+    if kpi is None:
+        return jsonify({'error': 'مؤشر الأداء غير موجود'}), 404
+    
     if existing_score:
         # تحديث النقاط الموجودة
         existing_score.score = data['score']
-        kpi = PerformanceKPI.query.get(data['kpi_id'])
         existing_score.weighted_score = data['score'] * kpi.weight
         existing_score.notes = data.get('notes')
         existing_score.updated_at = datetime.utcnow()
@@ -333,7 +322,6 @@ def create_performance_score():
         return jsonify({'message': 'تم تحديث نقاط الأداء بنجاح'})
     else:
         # إنشاء نقاط جديدة
-        kpi = PerformanceKPI.query.get(data['kpi_id'])
         score = PerformanceScore(
             employee_id=data['employee_id'],
             kpi_id=data['kpi_id'],
@@ -356,30 +344,24 @@ def get_commissions():
     month = request.args.get('month')
     year = request.args.get('year')
     
-    query = Commission.query
+    if month and year:
+        snapshot = period_close.snapshot_response(year, month, 'commissions', employee_id)
+        if snapshot is not None:
+            return snapshot
+    
+    query, entity = archive.query(Commission, year if month and year else None)
     
     if employee_id:
-        query = query.filter_by(employee_id=employee_id)
+        query = query.filter(entity.employee_id == employee_id)
     if month and year:
-        query = query.filter_by(month=int(month), year=int(year))
-    
-    commissions = query.all()
-    
-    return jsonify([{
-        'id': comm.id,
-        'employee_id': comm.employee_id,
-        'employee_name': comm.employee.name,
-        'month': comm.month,
-        'year': comm.year,
-        'base_commission': comm.base_commission,
-        'marketing_deduction': comm.marketing_deduction,
-        'performance_bonus': comm.performance_bonus,
-        'final_commission': comm.final_commission,
-        'total_salary': comm.total_salary,
-        'is_approved': comm.is_approved,
-        'approved_by': comm.approved_by,
-        'approved_at': comm.approved_at.isoformat() if comm.approved_at else None
-    } for comm in commissions])
+        query = query.filter(entity.month == int(month), entity.year == int(year))
+    
+    commissions = serializer(Commission, 'list')
+    rows = query.outerjoin(Employee, Employee.id == entity.employee_id).with_entities(
+        *commissions.columns(entity, employee=Employee)
+    ).all()
+    
+    return jsonify(commissions.rows(rows))
 
 @sales_bp.route('/commissions/calculate', methods=['POST'])
 def calculate_commissions():
@@ -388,40 +370,51 @@ def calculate_commissions():
     year = data['year']
     employee_ids = data.get('employee_ids', [])
     
-    if not employee_ids:
-        # حساب العمولات لجميع الموظفين النشطين
-        employees = Employee.query.filter_by(is_active=True).all()
-        employee_ids = [emp.id for emp in employees]
+    error = archived_year_error(year) or closed_period_error(year, month)
+    if error:
+        return error
     
-    results = []
+    if wants_async():
+        key = (year, month, ','.join(str(i) for i in sorted(employee_ids)) or 'all')
+        return submit_job(
+            'commissions', key, run_commission_calculation,
+            {'month': month, 'year': year, 'employee_ids': employee_ids}
+        )
     
-    for employee_id in employee_ids:
-        commission = calculate_employee_commission(employee_id, month, year)
-        results.append(commission)
+    outcome = run_commission_calculation(month, year, employee_ids)
     
     return jsonify({
         'message': f'تم حساب العمولات لشهر {month}/{year}',
-        'results': results
+        'results': outcome['results'],
+        'stats': outcome['stats']
     })
 
 # ===== الدوال المساعدة =====
-def calculate_achievement_rate(employee_id, month, year):
-    """حساب نسبة تحقيق الهدف للموظف"""
-    target = Target.query.filter_by(employee_id=employee_id, month=month, year=year).first()
-    if not target:
-        return 0.0
-    
-    # حساب إجمالي المبيعات للشهر
-    total_sales = db.session.query(func.sum(Project.project_value)).filter(
-        Project.employee_id == employee_id,
-        extract('month', Project.signature_date) == month,
-        extract('year', Project.signature_date) == year
-    ).scalar() or 0.0
+def run_commission_calculation(month, year, employee_ids=None, progress=None, batch_size=500):
+    """حساب العمولات لمجموعة موظفين (أو جميع النشطين) بمعاملة لكل دفعة"""
+    # المهام الخلفية قد تبدأ بعد إغلاق الشهر
+    if period_close.is_closed(year, month):
+        raise PeriodError(f'الشهر {month}/{year} مغلق ولا يمكن إعادة حساب عمولاته')
     
-    if target.target_amount == 0:
-        return 0.0
+    if not employee_ids:
+        # حساب العمولات لجميع الموظفين النشطين
+        employee_ids = [row.id for row in db.session.query(Employee.id).filter_by(is_active=True)]
+    
+    stats = {'computed': 0, 'unchanged': 0, 'updated': 0}
+    results = []
     
-    return total_sales / target.target_amount
+    for offset in range(0, len(employee_ids), batch_size):
+        batch = employee_ids[offset:offset + batch_size]
+        inputs = commission_inputs(batch, month, year)
+        for employee_id in batch:
+            results.append(calculate_employee_commission(employee_id, month, year, inputs.get(employee_id), stats))
+        
+        # التزام واحد لكل دفعة؛ لا كتابة أصلاً إذا لم يتغير شيء
+        db.session.commit()
+        if progress:
+            progress(len(results), len(employee_ids))
+    
+    return {'results': results, 'stats': stats}
 
 def get_commission_rate(role, achievement_rate):
     """الحصول على نسبة العمولة بناءً على الدور ونسبة التحقيق"""
@@ -449,32 +442,13 @@ def get_commission_rate(role, achievement_rate):
     
     return 0.0
 
-def update_target_achievement(employee_id, month, year):
-    """تحديث نسبة تحقيق الهدف"""
-    target = Target.query.filter_by(employee_id=employee_id, month=month, year=year).first()
-    if not target:
-        return
-    
-    # حساب إجمالي المبيعات المحققة
-    total_sales = db.session.query(func.sum(Project.project_value)).filter(
-        Project.employee_id == employee_id,
-        extract('month', Project.signature_date) == month,
-        extract('year', Project.signature_date) == year
-    ).scalar() or 0.0
-    
-    target.achieved_amount = total_sales
-    target.achievement_percentage = total_sales / target.target_amount if target.target_amount > 0 else 0.0
-    target.updated_at = datetime.utcnow()
-    
-    db.session.commit()
-
 def allocate_marketing_cost(project_id, month, year):
     """توزيع تكلفة التسويق على المشروع"""
     project = Project.query.get(project_id)
     if not project or not project.is_from_social_media:
         return
     
-    # الحصول على ميزانية التسويق للشهر
+    # الحصول على ميزانية التسويق للشهر من معاملة الكتابة نفسها لا من ذاكرة المرجع
     budget = MarketingBudget.query.filter_by(month=month, year=year).first()
     if not budget:
         return
@@ -501,8 +475,11 @@ def allocate_marketing_cost(project_id, month, year):
     
     db.session.commit()
 
-def redistribute_marketing_costs(month, year):
+def redistribute_marketing_costs(month, year, progress=None):
     """إعادة توزيع تكاليف التسويق على جميع المشاريع في الشهر"""
+    if period_close.is_closed(year, month):
+        raise PeriodError(f'الشهر {month}/{year} مغلق ولا يمكن إعادة توزيع تكاليفه')
+    
     # الحصول على جميع المشاريع من السوشيال ميديا في الشهر
     social_projects = Project.query.filter(
         Project.is_from_social_media == True,
@@ -511,78 +488,141 @@ def redistribute_marketing_costs(month, year):
     ).all()
     
     if not social_projects:
-        return
+        return {'projects_allocated': 0}
     
     # إعادة حساب التكاليف لكل مشروع
-    for project in social_projects:
-        allocate_marketing_cost(project.id, month, year)
+    project_ids = [project.id for project in social_projects]
+    for index, project_id in enumerate(project_ids, 1):
+        allocate_marketing_cost(project_id, month, year)
+        if progress:
+            progress(index, len(project_ids))
+    
+    return {'projects_allocated': len(project_ids)}
+
+def commission_inputs(employee_ids, month, year, chunk_size=500):
+    """مدخلات عمولة كل موظف في الشهر بتجميعات مشتركة للدفعة كلها
+    
+    يعيد لكل موظف مجاميع مشاريعه ونقاط أدائه وراتبه، مع سجل العمولة
+    وبصمة آخر حساب المحفوظين إن وُجدا.
+    """
+    start = date(year, month, 1)
+    end = date(year + month // 12, month % 12 + 1, 1)
+    inputs = {}
+    
+    employee_ids = list(dict.fromkeys(employee_ids))
+    for offset in range(0, len(employee_ids), chunk_size):
+        chunk = employee_ids[offset:offset + chunk_size]
+        for employee in Employee.query.filter(Employee.id.in_(chunk)):
+            inputs[employee.id] = {
+                'employee': employee,
+                'projects': (0, 0.0, 0.0, 0.0), 'scores': (0, 0.0),
+                'commission': None, 'fingerprint': None
+            }
+        
+        projects = db.session.query(
+            Project.employee_id, func.count(Project.id), func.sum(Project.project_value),
+            func.sum(Project.final_commission), func.sum(Project.marketing_cost_allocated)
+        ).filter(
+            Project.employee_id.in_(chunk), Project.signature_date >= start, Project.signature_date < end
+        ).group_by(Project.employee_id)
+        for employee_id, count, value, final, allocated in projects:
+            if employee_id in inputs:
+                inputs[employee_id]['projects'] = (count, value or 0.0, final or 0.0, allocated or 0.0)
+        
+        scores = db.session.query(
+            PerformanceScore.employee_id, func.count(PerformanceScore.id), func.sum(PerformanceScore.weighted_score)
+        ).filter(
+            PerformanceScore.employee_id.in_(chunk), PerformanceScore.month == month, PerformanceScore.year == year
+        ).group_by(PerformanceScore.employee_id)
+        for employee_id, count, weighted in scores:
+            if employee_id in inputs:
+                inputs[employee_id]['scores'] = (count, weighted or 0.0)
+        
+        for commission in Commission.query.filter(
+            Commission.employee_id.in_(chunk), Commission.month == month, Commission.year == year
+        ):
+            if commission.employee_id in inputs:
+                inputs[commission.employee_id]['commission'] = commission
+        
+        for fingerprint in CommissionFingerprint.query.filter(
+            CommissionFingerprint.employee_id.in_(chunk),
+            CommissionFingerprint.month == month, CommissionFingerprint.year == year
+        ):
+            if fingerprint.employee_id in inputs:
+                inputs[fingerprint.employee_id]['fingerprint'] = fingerprint
+    
+    return inputs
+
+def inputs_fingerprint(inputs):
+    """بصمة مدخلات العمولة: قيم المشاريع وتوزيعها والنقاط والراتب"""
+    parts = (*inputs['projects'], *inputs['scores'], inputs['employee'].base_salary)
+    return hashlib.sha256('|'.join(repr(part) for part in parts).encode('utf-8')).hexdigest()
 
-def calculate_employee_commission(employee_id, month, year):
-    """حساب العمولة الشاملة للموظف"""
-    employee = Employee.query.get(employee_id)
-    if not employee:
+def calculate_employee_commission(employee_id, month, year, inputs=None, stats=None):
+    """حساب العمولة الشاملة للموظف دون التزام
+    
+    إذا طابقت بصمة المدخلات بصمة آخر حساب وسجل العمولة موجود يُعاد السجل
+    كما هو دون حساب أو كتابة؛ وإلا يُحسب ويُكتب فقط إذا تغيرت قيمه.
+    """
+    if inputs is None:
+        inputs = commission_inputs([employee_id], month, year).get(employee_id)
+    if not inputs:
         return None
+    if stats is None:
+        stats = {'computed': 0, 'unchanged': 0, 'updated': 0}
+    
+    employee = inputs['employee']
+    existing_commission = inputs['commission']
+    stored = inputs['fingerprint']
+    fingerprint = inputs_fingerprint(inputs)
+    
+    if existing_commission and stored and stored.fingerprint == fingerprint:
+        stats['unchanged'] += 1
+        return {
+            'employee_id': employee_id,
+            'employee_name': employee.name,
+            'base_commission': existing_commission.base_commission,
+            'marketing_deduction': existing_commission.marketing_deduction,
+            'performance_bonus': existing_commission.performance_bonus,
+            'final_commission': existing_commission.final_commission,
+            'total_salary': existing_commission.total_salary
+        }
+    
+    stats['computed'] += 1
     
     # حساب العمولة الأساسية من المشاريع
-    projects = Project.query.filter(
-        Project.employee_id == employee_id,
-        extract('month', Project.signature_date) == month,
-        extract('year', Project.signature_date) == year
-    ).all()
-    
-    base_commission = sum(proj.final_commission or 0 for proj in projects)
-    marketing_deduction = sum(proj.marketing_cost_allocated or 0 for proj in projects)
+    _, _, base_commission, marketing_deduction = inputs['projects']
     
     # حساب مكافأة الأداء
-    performance_scores = PerformanceScore.query.filter_by(
-        employee_id=employee_id,
-        month=month,
-        year=year
-    ).all()
-    
-    total_weighted_score = sum(score.weighted_score or 0 for score in performance_scores)
+    _, total_weighted_score = inputs['scores']
     performance_bonus = total_weighted_score * 1000  # 1000 ريال لكل نقطة أداء
     
     # العمولة النهائية
     final_commission = base_commission + performance_bonus
     total_salary = employee.base_salary + final_commission
-    
-    # حفظ أو تحديث العمولة في قاعدة البيانات
-    existing_commission = Commission.query.filter_by(
-        employee_id=employee_id,
-        month=month,
-        year=year
-    ).first()
-    
-    if existing_commission:
-        existing_commission.base_commission = base_commission
-        existing_commission.marketing_deduction = marketing_deduction
-        existing_commission.performance_bonus = performance_bonus
-        existing_commission.final_commission = final_commission
-        existing_commission.total_salary = total_salary
-        existing_commission.updated_at = datetime.utcnow()
-    else:
-        commission = Commission(
-            employee_id=employee_id,
-            month=month,
-            year=year,
-            base_commission=base_commission,
-            marketing_deduction=marketing_deduction,
-            performance_bonus=performance_bonus,
-            final_commission=final_commission,
-            total_salary=total_salary
-        )
-        db.session.add(commission)
-    
-    db.session.commit()
-    
-    return {
-        'employee_id': employee_id,
-        'employee_name': employee.name,
+    values = {
         'base_commission': base_commission,
         'marketing_deduction': marketing_deduction,
         'performance_bonus': performance_bonus,
         'final_commission': final_commission,
         'total_salary': total_salary
     }
+    
+    # حفظ أو تحديث العمولة في قاعدة البيانات إذا تغيرت قيمها
+    if existing_commission:
+        if any(getattr(existing_commission, key) != value for key, value in values.items()):
+            for key, value in values.items():
+                setattr(existing_commission, key, value)
+            existing_commission.updated_at = datetime.utcnow()
+            stats['updated'] += 1
+    else:
+        db.session.add(Commission(employee_id=employee_id, month=month, year=year, **values))
+        stats['updated'] += 1
+    
+    if stored:
+        stored.fingerprint = fingerprint
+    else:
+        db.session.add(CommissionFingerprint(employee_id=employee_id, month=month, year=year, fingerprint=fingerprint))
+    
+    return {'employee_id': employee_id, 'employee_name': employee.name, **values}
 
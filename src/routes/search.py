@@ -0,0 +1,57 @@
+from flask import Blueprint, request, jsonify
+from sqlalchemy.orm import noload
+from src.models.user import db
+from src.models.sales import Employee, Project
+from src.services.reference_cache import reference_cache
+from src.services.search import SOURCES, search_index
+from src.services.serializers import serializer
+
+search_bp = Blueprint('search', __name__)
+
+def _projects(ids):
+    projects = serializer(Project, 'list')
+    rows = db.session.query(Project).outerjoin(Employee, Employee.id == Project.employee_id).with_entities(
+        *projects.columns(Project, employee=Employee)
+    ).filter(Project.id.in_(ids)).all()
+    return projects.rows(rows)
+
+def _employees(ids):
+    employees = Employee.query.options(noload(Employee.team)).filter(Employee.id.in_(ids)).all()
+    result = serializer(Employee, 'list').many(employees)
+    teams = reference_cache.teams()
+    for item in result:
+        team = teams.get(item['team_id'])
+        item['team_name'] = team.name if team else None
+    return result
+
+LOADERS = {'projects': _projects, 'employees': _employees}
+
+@search_bp.route('/search', methods=['GET'])
+def search():
+    """بحث نصي في العملاء والملاحظات والموظفين مرتب حسب الصلة"""
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'error': 'نص البحث مطلوب'}), 400
+    if not search_index.available:
+        return jsonify({'error': 'فهرس البحث غير متاح، شغّل flask search-reindex'}), 503
+
+    kind = request.args.get('type', 'all')
+    if kind != 'all' and kind not in SOURCES:
+        return jsonify({'error': 'نوع البحث غير صالح'}), 400
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+
+    response = {'query': query}
+    for name in (SOURCES if kind == 'all' else (kind,)):
+        found = search_index.search(name, query, page=page, per_page=per_page)
+        # ترتيب الصفوف كما رتبها الفهرس
+        items = {item['id']: item for item in LOADERS[name](found['ids'])} if found['ids'] else {}
+        response[name] = {
+            'total': found['total'],
+            'total_is_capped': found['total_is_capped'],
+            'ordering': found['ordering'],
+            'page': max(1, page),
+            'items': [items[i] for i in found['ids'] if i in items]
+        }
+
+    return jsonify(response)
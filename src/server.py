@@ -0,0 +1,288 @@
+"""خادم الإنتاج: عمليات عاملة متعددة (pre-fork) بمجمع خيوط في كل عامل
+
+    python -m src.server --workers 4 --threads 8 --port 5000
+
+العملية الرئيسية تفتح المقبس مرة واحدة ثم تنشئ العمال بـ fork فيتشاركون
+القبول عليه. الإشارات:
+    SIGHUP   إعادة تشغيل سلسة: عمال جدد ثم إيقاف القدامى بعد إنهاء طلباتهم
+    SIGTERM  إيقاف سلس لكل العمال ثم الخروج (SIGINT كذلك)
+العامل الذي يتوقف بشكل غير متوقع يُستبدل تلقائياً.
+
+كل اتصال يشغل خيطاً من مجمع العامل طوال عمره، لذلك:
+    --max-streams  حد اتصالات SSE لكل عامل (EVENTS_MAX_CLIENTS)، أقل من --threads
+                   حتى يبقى للطلبات العادية خيوط؛ ما زاد يُرد بـ 503
+    --max-queue    اتصالات تنتظر خيطاً فارغاً؛ ما زاد يُرد فوراً بـ 503
+
+كل عامل يكتب عدادات المقاييس في METRICS_MULTIPROCESS_DIR (مجلد مؤقت إن لم
+يُضبط) فيعيد /metrics مجموع كل العمال أياً كان العامل الذي استقبل الجمع.
+"""
+import argparse
+import importlib
+import json
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# DON'T CHANGE THIS !!!
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+
+_BUSY_BODY = json.dumps({'error': 'الخادم مشغول، يرجى المحاولة لاحقاً'}, ensure_ascii=False).encode()
+_BUSY_RESPONSE = (
+    b'HTTP/1.1 503 Service Unavailable\r\n'
+    b'Content-Type: application/json\r\n'
+    b'Retry-After: 1\r\n'
+    b'Connection: close\r\n'
+    b'Content-Length: ' + str(len(_BUSY_BODY)).encode() + b'\r\n\r\n' + _BUSY_BODY
+)
+
+
+class _RequestHandler(WSGIRequestHandler):
+    timeout = 5  # اتصال keep-alive خامل يحرر خيطه بعد هذه المدة
+    access_log = False
+
+    def log_request(self, code='-', size='-'):
+        if self.access_log:
+            super().log_request(code, size)
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """خادم Werkzeug بعدد خيوط محدود بدلاً من خيط لكل اتصال
+
+    الاتصالات المقبولة فوق threads + max_queue لا تُوضع في الطابور: يُرد
+    عليها بـ 503 من خيط القبول وتُغلق، فلا يتراكم انتظار بلا حد.
+    """
+
+    multithread = True
+
+    def __init__(self, app, fd, threads, access_log=False, max_queue=64, keepalive=5):
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='http')
+        self._capacity = threads + max_queue
+        self._active = 0  # اتصالات قيد التنفيذ أو في الطابور
+        self._active_lock = threading.Lock()
+        _RequestHandler.access_log = access_log
+        _RequestHandler.timeout = keepalive
+        super().__init__('0.0.0.0', 0, app, handler=_RequestHandler, fd=fd)
+
+    def process_request(self, request, client_address):
+        with self._active_lock:
+            accepted = self._active < self._capacity
+            if accepted:
+                self._active += 1
+        if not accepted:
+            self._reject(request)
+            return
+        self._pool.submit(self._handle, request, client_address)
+
+    def _reject(self, request):
+        try:
+            request.sendall(_BUSY_RESPONSE)
+        except OSError:
+            pass
+        finally:
+            self.shutdown_request(request)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            with self._active_lock:
+                self._active -= 1
+
+    def drain(self):
+        """انتظار انتهاء الطلبات الجارية"""
+        self._pool.shutdown(wait=True)
+
+
+def load_app(target):
+    module, _, attribute = target.partition(':')
+    return getattr(importlib.import_module(module), attribute or 'app')
+
+
+def run_worker(listener, options):
+    """حلقة عامل واحد؛ لا تعود"""
+    signal.signal(signal.SIGHUP, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # الرئيسية هي من تقرر الإيقاف
+    app = options.app_object or load_app(options.app)
+    server = PooledWSGIServer(app, listener.fileno(), options.threads, options.access_log,
+                              max_queue=options.max_queue, keepalive=options.keepalive)
+
+    def stop(signum, frame):
+        # shutdown ينتظر خروج serve_forever، فلا يُستدعى من خيطها نفسه
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    status = 0
+    try:
+        server.serve_forever(poll_interval=0.5)
+        server.drain()
+    except Exception:
+        status = 1
+    finally:
+        server.server_close()
+        # آخر العدادات قبل الخروج حتى لا تنقص المجاميع بعد إعادة التشغيل
+        metrics = getattr(app, 'extensions', {}).get('metrics')
+        if metrics is not None:
+            try:
+                metrics.write()
+            except Exception:
+                pass
+        os._exit(status)
+
+
+class Arbiter:
+    """العملية الرئيسية: إنشاء العمال ومراقبتهم وإعادة تشغيلهم"""
+
+    def __init__(self, options):
+        self.options = options
+        self.workers = {}  # pid -> generation
+        self.generation = 0
+        self.listener = None
+        self._signals = []
+
+    def listen(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((self.options.host, self.options.port))
+        listener.listen(self.options.backlog)
+        listener.set_inheritable(True)
+        self.listener = listener
+        return listener
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            run_worker(self.listener, self.options)
+        self.workers[pid] = self.generation
+        return pid
+
+    def spawn_all(self):
+        for _ in range(self.options.workers):
+            self.spawn()
+
+    def run(self):
+        if self.listener is None:
+            self.listen()
+        host, port = self.listener.getsockname()[:2]
+        print(f'listening on http://{host}:{port} (pid {os.getpid()}, '
+              f'{self.options.workers} workers x {self.options.threads} threads)', flush=True)
+
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda signum, frame: self._signals.append(signum))
+        self.spawn_all()
+
+        while True:
+            if self._signals:
+                signum = self._signals.pop(0)
+                if signum == signal.SIGHUP:
+                    self.reload()
+                else:
+                    self.stop()
+                    return
+            self.reap()
+            time.sleep(0.2)
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            generation = self.workers.pop(pid, None)
+            if generation == self.generation:
+                print(f'worker {pid} exited unexpectedly (status {status}), respawning', file=sys.stderr, flush=True)
+                self.spawn()
+
+    def reload(self):
+        old = [pid for pid, generation in self.workers.items() if generation == self.generation]
+        self.generation += 1
+        self.spawn_all()
+        for pid in old:
+            self._kill(pid, signal.SIGTERM)
+        print(f'reloaded: {len(old)} old workers stopping gracefully', flush=True)
+
+    def stop(self):
+        for pid in list(self.workers):
+            self._kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.options.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid:
+                self.workers.pop(pid, None)
+            else:
+                time.sleep(0.1)
+        for pid in list(self.workers):
+            self._kill(pid, signal.SIGKILL)
+        self.listener.close()
+
+    def _kill(self, pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            self.workers.pop(pid, None)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--app', default='src.main:app', help='module:attribute')
+    parser.add_argument('--host', default=os.environ.get('SERVER_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('SERVER_WORKERS', os.cpu_count() or 1)))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('SERVER_THREADS', 8)))
+    parser.add_argument('--max-streams', type=int, default=None,
+                        help='اتصالات SSE لكل عامل (الافتراضي ربع --threads)')
+    parser.add_argument('--max-queue', type=int, default=int(os.environ.get('SERVER_MAX_QUEUE', 64)),
+                        help='اتصالات تنتظر خيطاً لكل عامل قبل الرد بـ 503')
+    parser.add_argument('--keepalive', type=float, default=float(os.environ.get('SERVER_KEEPALIVE', 5)))
+    parser.add_argument('--backlog', type=int, default=2048)
+    parser.add_argument('--graceful-timeout', type=float, default=30.0)
+    parser.add_argument('--no-preload', dest='preload', action='store_false',
+                        help='استيراد التطبيق في كل عامل بعد fork (يلتقط الشيفرة الجديدة عند SIGHUP)')
+    parser.add_argument('--access-log', action='store_true')
+    options = parser.parse_args(argv)
+    if options.max_streams is None:
+        options.max_streams = int(os.environ.get('EVENTS_MAX_CLIENTS', max(1, options.threads // 4)))
+    if not 0 <= options.max_streams < options.threads:
+        parser.error('--max-streams يجب أن يكون أقل من --threads')
+    if options.max_queue < 0:
+        parser.error('--max-queue لا يكون سالباً')
+    return options
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    os.environ.setdefault('APP_PROFILE', 'production')
+    # تُقرأ في الإعدادات عند استيراد التطبيق، قبل fork أو بعده
+    os.environ['EVENTS_MAX_CLIENTS'] = str(options.max_streams)
+    if options.preload:
+        os.environ.setdefault('STATIC_PRECOMPRESS', '1')
+    metrics_dir = None
+    if not os.environ.get('METRICS_MULTIPROCESS_DIR'):
+        metrics_dir = os.environ['METRICS_MULTIPROCESS_DIR'] = tempfile.mkdtemp(prefix='metrics-')
+    try:
+        # التحميل المسبق يشارك صفحات الذاكرة بين العمال؛ الاتصالات تُسقط بعد fork
+        options.app_object = load_app(options.app) if options.preload else None
+        Arbiter(options).run()
+    finally:
+        if metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,315 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import (
+    Column, Index, MetaData, Table, create_engine, event, exists, func, select, union_all
+)
+from sqlalchemy.orm import aliased
+
+from src.models.user import db
+from src.models.archive import ArchivedYear
+from src.models.sales import Project, Target, PerformanceScore, Commission
+
+
+class ArchiveError(Exception):
+    """تعذر تنفيذ عملية الأرشفة"""
+
+
+def _year_clause(table, year):
+    # شرط السنة على كل جدول؛ تاريخ التوقيع يُقارن كنص ISO ليستفيد من الفهارس
+    if 'signature_date' in table.c:
+        return (table.c.signature_date >= date(year, 1, 1)) & (table.c.signature_date < date(year + 1, 1, 1))
+    return table.c.year == year
+
+# الجداول المؤرشفة وفهارس ملفات الأرشيف
+ARCHIVED_MODELS = {
+    Project: (('employee_id', 'signature_date'), ('signature_date',)),
+    Target: (('employee_id', 'year', 'month'),),
+    PerformanceScore: (('employee_id', 'year', 'month'),),
+    Commission: (('employee_id', 'year', 'month'),),
+}
+
+
+def archive_alias(year):
+    return f'archive_{int(year)}'
+
+
+def _copy_table(model, metadata, schema=None):
+    table = Table(
+        model.__tablename__, metadata,
+        *[Column(c.name, c.type, primary_key=c.primary_key) for c in model.__table__.columns],
+        schema=schema
+    )
+    for columns in ARCHIVED_MODELS[model]:
+        Index(f"ix_{model.__tablename__}_{'_'.join(columns)}", *[table.c[name] for name in columns])
+    return table
+
+
+class ArchiveCatalog:
+    """نسخة العملية من فهرس الأرشيف مع تحديث دوري رخيص
+
+    يُحدَّث الفهرس عند سحب اتصال من المجمع إذا انتهت صلاحيته، ثم تُرفق
+    ملفات الأرشيف الجديدة بذلك الاتصال قبل استخدامه.
+    """
+
+    def __init__(self):
+        self._years = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._tables = {}
+        self.ttl = 5.0
+
+    def years(self):
+        """السنوات المؤرشفة: {year: path}"""
+        return self._years
+
+    def is_archived(self, year):
+        try:
+            return int(year) in self._years
+        except (TypeError, ValueError):
+            return False
+
+    def set(self, years):
+        self._years = dict(years)
+        self._loaded_at = time.monotonic()
+
+    def refresh_from(self, dbapi_connection):
+        if time.monotonic() - self._loaded_at < self.ttl:
+            return
+        with self._lock:
+            if time.monotonic() - self._loaded_at < self.ttl:
+                return
+            cursor = dbapi_connection.cursor()
+            try:
+                rows = cursor.execute('SELECT year, path FROM archive_catalog').fetchall()
+            except sqlite3.OperationalError:
+                rows = []  # قاعدة بيانات لم يُنشأ فيها الفهرس بعد
+            finally:
+                cursor.close()
+            self.set(rows)
+
+    def table(self, model, year):
+        key = (model.__tablename__, int(year))
+        table = self._tables.get(key)
+        if table is None:
+            table = _copy_table(model, MetaData(), schema=archive_alias(year))
+            self._tables[key] = table
+        return table
+
+
+catalog = ArchiveCatalog()
+
+
+def _archive_select(model, year):
+    archived = catalog.table(model, year)
+    hot = model.__table__
+    # الصف الموجود في القاعدة الساخنة (نقل غير مكتمل) يُقرأ من هناك فقط
+    return select(archived).where(~exists().where(hot.c.id == archived.c.id))
+
+
+def store(model, year=None):
+    """الكيان الذي يُستعلم منه لنموذج مؤرشف
+
+    سنة غير مؤرشفة: الجدول الساخن مباشرة (المسار الشائع دون أي كلفة).
+    سنة مؤرشفة: الجدول الساخن مع ملف أرشيفها. دون سنة: عرض موحد لكل المخازن.
+    """
+    years = catalog.years()
+    if year is not None:
+        if not catalog.is_archived(year):
+            return model
+        selected = [int(year)]
+    elif not years:
+        return model
+    else:
+        selected = sorted(years, reverse=True)
+
+    union = union_all(
+        select(model.__table__),
+        *[_archive_select(model, y) for y in selected]
+    ).subquery(f"{model.__tablename__}_{'_'.join(map(str, selected))}")
+    return aliased(model, union, adapt_on_names=True)
+
+
+def query(model, year=None):
+    """استعلام ORM على المخزن المناسب؛ يعيد (query, entity)"""
+    entity = store(model, year)
+    return db.session.query(entity), entity
+
+
+def install_archive_routing(app, db):
+    """إرفاق ملفات الأرشيف بكل اتصال عند سحبه من المجمع"""
+    app.config.setdefault('ARCHIVE_DIR', None)  # افتراضياً: مجلد قاعدة البيانات
+    app.config.setdefault('ARCHIVE_CATALOG_TTL', 5.0)
+    catalog.ttl = app.config['ARCHIVE_CATALOG_TTL']
+
+    with app.app_context():
+        for key, engine in db.engines.items():
+            if engine.dialect.name != 'sqlite':
+                continue
+            event.listen(engine, 'checkout', _attach_listener(read_only=key == 'reader'))
+
+        try:
+            with db.engines[None].connect() as connection:
+                rows = connection.exec_driver_sql('SELECT year, path FROM archive_catalog').fetchall()
+        except Exception:
+            rows = []
+        catalog.set(rows)
+
+
+def _attach_listener(read_only):
+    def attach(dbapi_connection, connection_record, connection_proxy):
+        catalog.refresh_from(dbapi_connection)
+        for year, path in list(catalog.years().items()):
+            _attach(dbapi_connection, connection_record.info, year, path, read_only)
+    return attach
+
+
+def _attach(dbapi_connection, info, year, path, read_only=False):
+    attached = info.setdefault('archives', set())
+    if year in attached:
+        return
+    target = f'file:{path}?mode=ro' if read_only else path
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f'ATTACH DATABASE ? AS {archive_alias(year)}', (target,))
+    except sqlite3.OperationalError as e:
+        if 'already in use' not in str(e):
+            raise
+    finally:
+        cursor.close()
+    attached.add(year)
+
+
+def archive_directory():
+    directory = current_app.config.get('ARCHIVE_DIR')
+    if not directory:
+        directory = os.path.dirname(db.engines[None].url.database)
+    return directory
+
+
+def archive_year(year, batch_size=5000, log=None):
+    """نقل سنة مغلقة من القاعدة الساخنة إلى ملف أرشيف مستقل
+
+    يعمل والتطبيق قيد التشغيل: يُسجَّل الأرشيف في الفهرس أولاً حتى تبدأ كل
+    العمليات بقراءة المخزنين معاً، ثم تُنقل الصفوف على دفعات صغيرة؛ كل دفعة
+    تُنسخ ثم تُحذف من القاعدة الساخنة في معاملتين قصيرتين. إعادة تشغيل
+    الأمر بعد انقطاع تكمل النقل دون تكرار.
+    """
+    log = log or (lambda message: None)
+    year = int(year)
+    if year >= date.today().year:
+        raise ArchiveError(f'لا يمكن أرشفة سنة غير مغلقة: {year}')
+
+    writer = db.engines[None]
+    if writer.dialect.name != 'sqlite' or not writer.url.database:
+        raise ArchiveError('الأرشفة مدعومة لقواعد SQLite في ملفات فقط')
+
+    path = os.path.join(archive_directory(), f'{archive_alias(year)}.db')
+    catalog_table = ArchivedYear.__table__
+
+    with writer.connect() as connection:
+        for model in ARCHIVED_MODELS:
+            hot = model.__table__
+            in_year = _year_clause(hot, year)
+            moving_max = connection.execute(select(func.max(hot.c.id)).where(in_year)).scalar()
+            remaining_max = connection.execute(select(func.max(hot.c.id)).where(~in_year)).scalar()
+            # SQLite يعيد استخدام أكبر rowid بعد حذفه، فتتصادم المعرفات مع الأرشيف
+            if moving_max is not None and (remaining_max is None or remaining_max < moving_max):
+                raise ArchiveError(
+                    f'لا يمكن أرشفة {hot.name}: أحدث صف فيه من سنة {year} وستُعاد معرفاته'
+                )
+
+        entry = connection.execute(
+            select(catalog_table.c.path, catalog_table.c.row_counts).where(catalog_table.c.year == year)
+        ).first()
+        connection.rollback()
+
+        if entry is None:
+            _create_archive_file(path)
+            log(f'ملف الأرشيف: {path}')
+            with connection.begin():
+                connection.execute(catalog_table.insert().values(
+                    year=year, path=path, archived_at=datetime.utcnow()
+                ))
+            # ننتظر حتى تلاحظ العمليات الأخرى الفهرس الجديد قبل نقل أي صف
+            wait = current_app.config['ARCHIVE_CATALOG_TTL'] + 1
+            log(f'انتظار {wait} ثانية حتى تُرفق العمليات الأخرى الأرشيف')
+            time.sleep(wait)
+            counts = {}
+        else:
+            path = entry.path
+            counts = json.loads(entry.row_counts) if entry.row_counts else {}
+            log(f'استكمال الأرشفة في {path}')
+
+        catalog.set({**catalog.years(), year: path})
+        _attach(connection.connection.driver_connection, connection.connection.info, year, path)
+
+        for model in ARCHIVED_MODELS:
+            hot = model.__table__
+            archived = catalog.table(model, year)
+            in_year = _year_clause(hot, year)
+            moved = 0
+            while True:
+                with connection.begin():
+                    ids = connection.execute(
+                        select(hot.c.id).where(in_year).order_by(hot.c.id).limit(batch_size)
+                    ).scalars().all()
+                    if not ids:
+                        break
+                    connection.execute(
+                        archived.insert().prefix_with('OR IGNORE').from_select(
+                            [c.name for c in hot.columns],
+                            select(hot).where(hot.c.id.in_(ids))
+                        )
+                    )
+                with connection.begin():
+                    connection.execute(hot.delete().where(hot.c.id.in_(ids)))
+                moved += len(ids)
+                log(f'{hot.name}: نُقل {moved} صف')
+            counts[hot.name] = counts.get(hot.name, 0) + moved
+
+        archived_at = datetime.utcnow()
+        with connection.begin():
+            connection.execute(
+                catalog_table.update().where(catalog_table.c.year == year).values(
+                    row_counts=json.dumps(counts), archived_at=archived_at
+                )
+            )
+
+    return {
+        'year': year,
+        'path': path,
+        'row_counts': counts,
+        'archived_at': archived_at.isoformat()
+    }
+
+
+def _create_archive_file(path):
+    metadata = MetaData()
+    for model in ARCHIVED_MODELS:
+        _copy_table(model, metadata)
+    engine = create_engine(f'sqlite:///{path}')
+    try:
+        metadata.create_all(engine)
+    finally:
+        engine.dispose()
+
+
+@click.command('archive-year')
+@click.argument('year', type=int)
+@click.option('--batch-size', default=5000, show_default=True, help='عدد الصفوف في كل دفعة نقل')
+@with_appcontext
+def archive_year_command(year, batch_size):
+    """أرشفة سنة مغلقة في ملف SQLite مستقل"""
+    try:
+        result = archive_year(year, batch_size=batch_size, log=click.echo)
+    except ArchiveError as e:
+        raise click.ClickException(str(e))
+    click.echo(json.dumps(result, ensure_ascii=False, indent=2))
@@ -0,0 +1,401 @@
+import bisect
+import heapq
+import logging
+import math
+import threading
+import time
+from contextlib import nullcontext
+from datetime import date
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
+
+from src.models.user import db
+from src.models.reference import ReferenceVersion
+from src.models.sales import Project
+from src.services.metrics import metrics
+from src.services.reference_cache import bump_versions
+from src.services.search import normalize
+
+logger = logging.getLogger(__name__)
+
+_KEY_END = '\U0010ffff'  # أكبر محرف: نهاية نطاق البادئة في المصفوفة المرتبة
+_ARTICLE = 'ال'
+
+# اسم الإصدار في reference_versions: يزيد مع كل معاملة تغير أسماء العملاء
+VERSION_NAME = 'clients'
+
+
+def _keys(name):
+    """مفاتيح الاسم: النص الموحد من بداية كل كلمة فيه، ومن بعد "ال" التعريف
+
+    فتطابق "امل" اسم "شركة الأمل" كما تطابقه "الامل".
+    """
+    words = normalize(name).split()
+    keys = set()
+    for index, word in enumerate(words):
+        rest = words[index + 1:]
+        keys.add(' '.join([word, *rest]))
+        if word.startswith(_ARTICLE) and len(word) > len(_ARTICLE) + 1:
+            keys.add(' '.join([word[len(_ARTICLE):], *rest]))
+    return keys
+
+
+class _State:
+    """نسخة الفهرس: مصفوفة (مفتاح، اسم) مرتبة وإحصاءات كل اسم وأفضل النتائج للبادئات الواسعة"""
+
+    def __init__(self, names):
+        self.names = names  # الاسم -> [عدد الصفقات، ترتيب تاريخ آخر صفقة]
+        self.keys = sorted((key, name) for name in names for key in _keys(name))
+        self.top = {}  # البادئة -> أفضل الأسماء لها (قائمة لا تُعدل، تُستبدل)
+
+
+class ClientAutocomplete:
+    """إكمال أسماء العملاء من فهرس بادئات في الذاكرة
+
+    الأسماء المميزة في مصفوفة مرتبة حسب النص الموحد لكل كلمة فيها، فالبحث
+    بادئة واحدة عبر bisect. الترتيب بعدد الصفقات مع تفضيل الأحدث:
+    count * 2^((آخر صفقة - اليوم) / عمر النصف)، ولأن اليوم يضرب كل الدرجات
+    بالعامل نفسه يكفي log2(count) + آخر صفقة / عمر النصف ولا تتقادم النتائج.
+
+    الطلب لا يفحص أكثر من AUTOCOMPLETE_SCAN_LIMIT مدخلاً؛ البادئات الأوسع
+    تُحسب أفضل نتائجها عند البناء من نتائج البادئات الأطول. الإضافة والتعديل
+    والحذف عبر الجلسة تُطبق بعد الالتزام. كل معاملة تغير الأسماء تزيد إصدار
+    clients في reference_versions، والبحث يقارنه بإصدار الفهرس كل
+    AUTOCOMPLETE_VERSION_INTERVAL ثانية على الأكثر: إن سبقته معاملة من عملية
+    أخرى (أو تعديل جماعي) يُعاد البناء في الخلفية. إعادة البناء كل
+    AUTOCOMPLETE_REFRESH_INTERVAL تبقى احتياطاً لما يُكتب خارج الجلسة.
+    """
+
+    def __init__(self, app=None):
+        self.max_results = 20
+        self.scan_limit = 500
+        self.half_life = 90.0
+        self.refresh_interval = 300.0
+        self.budget = 0.010
+        self.version_interval = 2.0
+        self._state = None
+        self._built_at = 0.0
+        self._version = None  # إصدار clients الذي يطابقه الفهرس
+        self._version_checked = 0.0
+        self._building = False
+        self._replay = None  # تغييرات ملتزمة أثناء البناء تُعاد على النسخة الجديدة
+        self._lock = threading.Lock()
+        self._app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('AUTOCOMPLETE_MAX_RESULTS', 20)
+        app.config.setdefault('AUTOCOMPLETE_SCAN_LIMIT', 500)
+        app.config.setdefault('AUTOCOMPLETE_HALF_LIFE_DAYS', 90)
+        app.config.setdefault('AUTOCOMPLETE_REFRESH_INTERVAL', 300)
+        app.config.setdefault('AUTOCOMPLETE_BUDGET_MS', 10)
+        app.config.setdefault('AUTOCOMPLETE_VERSION_INTERVAL', 2)
+        app.config.setdefault('AUTOCOMPLETE_WARM', True)
+        self.max_results = app.config['AUTOCOMPLETE_MAX_RESULTS']
+        self.scan_limit = app.config['AUTOCOMPLETE_SCAN_LIMIT']
+        self.half_life = float(app.config['AUTOCOMPLETE_HALF_LIFE_DAYS'])
+        self.refresh_interval = app.config['AUTOCOMPLETE_REFRESH_INTERVAL']
+        self.budget = app.config['AUTOCOMPLETE_BUDGET_MS'] / 1000.0
+        self.version_interval = app.config['AUTOCOMPLETE_VERSION_INTERVAL']
+        self._app = app
+        app.extensions['client_autocomplete'] = self
+
+        if not event.contains(db.session, 'after_flush', _collect_flushed):
+            event.listen(db.session, 'after_flush', _collect_flushed)
+            event.listen(db.session, 'do_orm_execute', _collect_bulk)
+            event.listen(db.session, 'after_commit', _apply_committed)
+            event.listen(db.session, 'after_rollback', _discard_collected)
+
+        metrics.register_cache('client_autocomplete', lambda: len(self._state.names) if self._state else 0)
+
+        if app.config['AUTOCOMPLETE_WARM']:
+            with app.app_context():
+                try:
+                    self.rebuild()
+                except Exception as e:
+                    # جدول المشاريع قد لا يكون أُنشئ بعد (flask init-db)
+                    logger.warning('تعذر بناء فهرس أسماء العملاء: %s', e)
+
+    # ===== البناء =====
+
+    def _connection(self):
+        engine = db.engines.get('reader') or db.engine
+        if isinstance(engine.pool, (StaticPool, SingletonThreadPool)):
+            # قاعدة في الذاكرة: الاتصال الوحيد مشترك مع الجلسة
+            return nullcontext(db.session.connection())
+        return engine.connect()
+
+    def rebuild(self):
+        """بناء الفهرس من جدول المشاريع ثم استبداله دفعة واحدة"""
+        with self._lock:
+            self._replay = []
+        try:
+            with self._connection() as connection:
+                # الإصدار أولاً: الأسماء المقروءة بعده ليست أقدم منه
+                version = _read_version(connection)
+                rows = connection.execute(
+                    select(Project.client_name, func.count(), func.max(Project.signature_date))
+                    .group_by(Project.client_name)
+                ).all()
+            names = {}
+            for name, count, last in rows:
+                if name and name.strip():
+                    names[name] = [count, last.toordinal() if last else 0]
+            state = _State(names)
+            self._fill_top(state, '', 0, len(state.keys))
+            with self._lock:
+                self._state = state
+                self._version = version
+                for change in self._replay:
+                    self._apply(state, *change)
+        finally:
+            with self._lock:
+                self._replay = None
+                self._built_at = time.monotonic()
+                self._building = False
+        return len(names)
+
+    def invalidate(self):
+        """طلب إعادة بناء في الخلفية عند أول استخدام قادم"""
+        self._built_at = 0.0
+
+    def _rebuild_in_background(self):
+        with self._lock:
+            if self._building or self._app is None:
+                return
+            self._building = True
+        app = self._app
+
+        def run():
+            with app.app_context():
+                try:
+                    self.rebuild()
+                except Exception:
+                    logger.exception('فشل بناء فهرس أسماء العملاء')
+                    with self._lock:
+                        self._building = False
+
+        threading.Thread(target=run, name='client-autocomplete-rebuild', daemon=True).start()
+
+    # ===== الترتيب =====
+
+    def _score(self, state, name):
+        count, last = state.names.get(name, (0, 0))
+        return (math.log2(count) if count > 0 else -math.inf) + last / self.half_life
+
+    def _best(self, state, names):
+        return heapq.nlargest(self.max_results, names, key=lambda name: (self._score(state, name), name))
+
+    def _fill_top(self, state, prefix, lo, hi):
+        """أفضل الأسماء للبادئة؛ النطاقات الواسعة تُدمج من نتائج البادئات الأطول وتُحفظ"""
+        if hi - lo <= self.scan_limit:
+            return self._best(state, {name for _, name in state.keys[lo:hi]})
+        cached = state.top.get(prefix)
+        if cached is not None:
+            return cached
+        keys = state.keys
+        candidates = set()
+        index = lo
+        while index < hi and keys[index][0] == prefix:
+            candidates.add(keys[index][1])
+            index += 1
+        while index < hi:
+            child = keys[index][0][:len(prefix) + 1]
+            end = bisect.bisect_left(keys, (child + _KEY_END,), index, hi)
+            candidates.update(self._fill_top(state, child, index, end))
+            index = end
+        best = self._best(state, candidates)
+        state.top[prefix] = best
+        return best
+
+    # ===== التحديث التدريجي =====
+
+    def apply(self, changes, version=None):
+        """تطبيق تغييرات ملتزمة: (الاسم، +1 أو -1، ترتيب تاريخ الصفقة)
+
+        version إصدار clients الذي كتبته المعاملة. إن تلا إصدار الفهرس مباشرة
+        فلا معاملة أخرى بينهما ويبقى الفهرس مطابقاً دون إعادة بناء.
+        """
+        with self._lock:
+            if self._replay is not None:
+                self._replay.extend(changes)
+            if version is not None and self._version is not None and version == self._version + 1:
+                self._version = version
+            if self._state is None:
+                return
+            for change in changes:
+                self._apply(self._state, *change)
+
+    def _apply(self, state, name, delta, ordinal):
+        if not name or not name.strip():
+            return
+        entry = state.names.get(name)
+        keys = _keys(name)
+        if delta > 0:
+            if entry is None:
+                entry = state.names[name] = [0, 0]
+                for key in keys:
+                    bisect.insort(state.keys, (key, name))
+            entry[0] += delta
+            entry[1] = max(entry[1], ordinal)
+            # الدرجة زادت فقط: يكفي إدخال الاسم في القوائم المحفوظة لبادئاته
+            for prefix in self._cached_prefixes(state, keys):
+                best = state.top[prefix]
+                if name in best or len(best) < self.max_results or \
+                        self._score(state, name) > self._score(state, best[-1]):
+                    state.top[prefix] = self._best(state, set(best) | {name})
+            return
+        if entry is None:
+            return
+        entry[0] += delta
+        if entry[0] <= 0:
+            del state.names[name]
+            for key in keys:
+                index = bisect.bisect_left(state.keys, (key, name))
+                if index < len(state.keys) and state.keys[index] == (key, name):
+                    del state.keys[index]
+        # الدرجة نقصت: القوائم التي تحويه تُحسب من جديد عند طلبها
+        for prefix in self._cached_prefixes(state, keys):
+            if name in state.top[prefix]:
+                del state.top[prefix]
+
+    @staticmethod
+    def _cached_prefixes(state, keys):
+        prefixes = set()
+        for key in keys:
+            for length in range(len(key) + 1):
+                if key[:length] in state.top:
+                    prefixes.add(key[:length])
+        return prefixes
+
+    # ===== البحث =====
+
+    def _check_version(self):
+        """إعادة البناء في الخلفية إذا غيرت معاملة أخرى أسماء العملاء منذ البناء"""
+        now = time.monotonic()
+        if now - self._version_checked < self.version_interval or self._building:
+            return
+        self._version_checked = now
+        try:
+            with self._connection() as connection:
+                version = _read_version(connection)
+        except Exception as e:
+            logger.warning('تعذر قراءة إصدار أسماء العملاء: %s', e)
+            return
+        if version != self._version:
+            self._rebuild_in_background()
+
+    def lookup(self, query, limit=10):
+        """أفضل أسماء العملاء المطابقة لبادئة في أي كلمة من الاسم"""
+        started = time.perf_counter()
+        state = self._state
+        if self._app is not None:
+            if time.monotonic() - self._built_at >= self.refresh_interval:
+                self._rebuild_in_background()
+            else:
+                self._check_version()
+        if state is None:
+            return None
+
+        prefix = ' '.join(normalize(query).split())
+        limit = max(1, min(limit, self.max_results))
+        lo = bisect.bisect_left(state.keys, (prefix,))
+        hi = bisect.bisect_left(state.keys, (prefix + _KEY_END,))
+        if hi - lo > self.scan_limit:
+            best = state.top.get(prefix)
+            metrics.cache_event('client_autocomplete', best is not None)
+            if best is None:
+                # أسقطها تعديل نقص درجة اسم فيها: تُدمج من البادئات الأطول
+                with self._lock:
+                    best = self._fill_top(state, prefix, lo, hi)
+        else:
+            best = self._best(state, {name for _, name in state.keys[lo:hi]})
+
+        items = []
+        for name in best[:limit]:
+            count, last = state.names.get(name, (0, 0))
+            items.append({'name': name, 'deals': count, 'last_deal': _date(last)})
+
+        elapsed = time.perf_counter() - started
+        if elapsed > self.budget:
+            logger.warning('إكمال أسماء العملاء تجاوز الميزانية: %.1f ms للبادئة %r', elapsed * 1000, prefix)
+        return items
+
+    def stats(self):
+        state = self._state
+        return {
+            'clients': len(state.names) if state else 0,
+            'keys': len(state.keys) if state else 0,
+            'cached_prefixes': len(state.top) if state else 0,
+            'building': self._building,
+            'version': self._version,
+            'age_seconds': round(time.monotonic() - self._built_at, 1) if state else None
+        }
+
+
+def _read_version(connection):
+    return connection.execute(
+        select(ReferenceVersion.version).where(ReferenceVersion.name == VERSION_NAME)
+    ).scalar() or 0
+
+
+def _date(ordinal):
+    return date.fromordinal(ordinal).isoformat() if ordinal > 0 else None
+
+
+client_autocomplete = ClientAutocomplete()
+
+
+def _collect_flushed(session, flush_context):
+    """تسجيل تغييرات أسماء العملاء لتُطبق بعد الالتزام"""
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, Project):
+            changes.append((obj.client_name, 1, _ordinal(obj.signature_date)))
+    for obj in session.dirty:
+        if not isinstance(obj, Project):
+            continue
+        state = inspect(obj)
+        name, signed = state.attrs.client_name.history, state.attrs.signature_date.history
+        if not (name.has_changes() or signed.has_changes()):
+            continue
+        old_name = name.deleted[0] if name.deleted else obj.client_name
+        changes.append((old_name, -1, 0))
+        changes.append((obj.client_name, 1, _ordinal(obj.signature_date)))
+    for obj in session.deleted:
+        if isinstance(obj, Project):
+            changes.append((obj.client_name, -1, 0))
+    if changes:
+        session.info.setdefault('client_autocomplete', []).extend(changes)
+        bump_versions(session, (VERSION_NAME,))
+        session.info['client_autocomplete_version'] = _read_version(session.connection())
+
+
+def _collect_bulk(orm_execute_state):
+    # query(Project).update()/delete() لا تمر بـ flush ولا تُعرف أسماؤها: يُعاد البناء
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.local_table is Project.__table__:
+        bump_versions(orm_execute_state.session, (VERSION_NAME,))
+        orm_execute_state.session.info['client_autocomplete_stale'] = True
+
+
+def _ordinal(value):
+    return value.toordinal() if value else 0
+
+
+def _apply_committed(session):
+    changes = session.info.pop('client_autocomplete', None)
+    version = session.info.pop('client_autocomplete_version', None)
+    if session.info.pop('client_autocomplete_stale', False):
+        client_autocomplete.invalidate()
+    elif changes:
+        client_autocomplete.apply(changes, version)
+
+
+def _discard_collected(session):
+    for key in ('client_autocomplete', 'client_autocomplete_version', 'client_autocomplete_stale'):
+        session.info.pop(key, None)
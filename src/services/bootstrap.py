@@ -0,0 +1,107 @@
+import contextvars
+import hashlib
+import logging
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
+
+from src.models.user import db
+
+logger = logging.getLogger(__name__)
+
+BootstrapResource = namedtuple('BootstrapResource', 'name loader roles')
+
+
+class AdminBootstrap:
+    """تحميل عدة موارد مسماة لشاشات الإدارة في طلب واحد
+
+    كل مورد يُحمل في خيط من مجمع صغير بجلسة مستقلة على محرك القراءة، ثم
+    يُرمّز JSON مرة واحدة ويُحسب ETag من نصه. الموارد التي أرسل العميل
+    ETag مطابقاً لها تُحذف من الاستجابة.
+    """
+
+    def __init__(self, app=None):
+        self.resources = {}
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._max_workers = 4
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('BOOTSTRAP_MAX_WORKERS', 4)
+        self._max_workers = app.config['BOOTSTRAP_MAX_WORKERS']
+        app.extensions['admin_bootstrap'] = self
+
+    def resource(self, name, roles=None):
+        """تسجيل دالة تحميل مورد: loader(session) تعيد بيانات قابلة للترميز"""
+        def decorator(loader):
+            self.resources[name] = BootstrapResource(name, loader, tuple(roles) if roles else None)
+            return loader
+        return decorator
+
+    def _get_executor(self):
+        # يُنشأ المجمع عند أول استخدام في كل عملية حتى يبقى آمناً بعد fork
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers, thread_name_prefix='bootstrap'
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def load(self, names, etags, role):
+        """نص JSON للاستجابة: {"resources": {...}, "errors": {...}}"""
+        dumps = current_app.json.dumps
+        engine = db.engines.get('reader')
+        errors = {}
+        wanted = []
+        for name in names:
+            resource = self.resources[name]
+            if resource.roles and role not in resource.roles:
+                errors[name] = 'ليس لديك صلاحية للوصول لهذا المورد'
+            else:
+                wanted.append(resource)
+
+        def encode(resource, session):
+            try:
+                return dumps(resource.loader(session)), None
+            except Exception as e:
+                logger.exception('فشل تحميل مورد التهيئة %s', resource.name)
+                return None, f'خطأ في جلب {resource.name}: {str(e)}'
+
+        def run(resource):
+            with Session(bind=engine) as session:
+                return encode(resource, session)
+
+        if len(wanted) > 1 and engine is not None and not isinstance(engine.pool, (StaticPool, SingletonThreadPool)):
+            # خيوط المجمع لا ترث متغيرات السياق: نسخة لكل مورد من خيط الطلب حتى
+            # تبقى مهلة الاستعلام (deadlines) نافذة على استعلاماته
+            contexts = [contextvars.copy_context() for _ in wanted]
+            results = list(self._get_executor().map(
+                lambda context, resource: context.run(run, resource), contexts, wanted
+            ))
+        else:
+            # دون محرك قراءة يحجز الطلب اتصال الكتابة الوحيد: تحميل متتابع بجلسة الطلب
+            results = [encode(resource, db.session) for resource in wanted]
+
+        parts = []
+        for resource, (body, error) in zip(wanted, results):
+            if error:
+                errors[resource.name] = error
+                continue
+            etag = hashlib.sha1(body.encode('utf-8')).hexdigest()[:16]
+            if etags.get(resource.name) == etag:
+                parts.append(f'{dumps(resource.name)}: {{"etag": {dumps(etag)}, "not_modified": true}}')
+            else:
+                parts.append(f'{dumps(resource.name)}: {{"etag": {dumps(etag)}, "data": {body}}}')
+        return f'{{"resources": {{{", ".join(parts)}}}, "errors": {dumps(errors)}}}'
+
+
+admin_bootstrap = AdminBootstrap()
@@ -0,0 +1,92 @@
+import zlib
+
+from flask import request
+
+# 31 = ترويسة gzip مع نافذة 32 كيلوبايت
+_GZIP_WBITS = 31
+
+
+def gzip_bytes(data, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _GZIP_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def gzip_stream(chunks, level):
+    """ضغط استجابة متدفقة قطعة بقطعة دون تجميعها في الذاكرة"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _GZIP_WBITS)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk)
+            # إفراغ بعد كل قطعة حتى تصل البيانات للعميل فور توليدها
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+class ResponseCompressor:
+    """ضغط استجابات JSON الكبيرة بـ gzip حسب Accept-Encoding
+
+    لا يلمس الاستجابات المضغوطة مسبقاً (الملفات الثابتة) ولا استجابات
+    النطاقات ولا بث الأحداث. الاستجابات المتدفقة تُضغط أثناء توليدها.
+    """
+
+    def __init__(self, app=None):
+        self.min_size = 1024
+        self.level = 6
+        self.mimetypes = ()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_ENABLED', True)
+        app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+        app.config.setdefault('COMPRESS_LEVEL', 6)
+        app.config.setdefault('COMPRESS_MIMETYPES', ('application/json', 'text/csv', 'text/plain'))
+        self.min_size = app.config['COMPRESS_MIN_SIZE']
+        self.level = app.config['COMPRESS_LEVEL']
+        self.mimetypes = tuple(app.config['COMPRESS_MIMETYPES'])
+        app.extensions['response_compressor'] = self
+
+        if app.config['COMPRESS_ENABLED']:
+            app.after_request(self._after_request)
+
+    def _after_request(self, response):
+        if response.mimetype not in self.mimetypes:
+            return response
+        if (
+            response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or 'Content-Range' in response.headers
+        ):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        if 'gzip' not in request.accept_encodings:
+            return response
+
+        if response.is_streamed:
+            response.response = gzip_stream(response.response, self.level)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            response.set_data(gzip_bytes(data, self.level))
+
+        response.headers['Content-Encoding'] = 'gzip'
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f'{etag}-gz', weak)
+        return response
+
+
+compressor = ResponseCompressor()
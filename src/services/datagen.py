@@ -0,0 +1,375 @@
+import json
+import random
+import time
+from datetime import date, datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, select
+
+from src.models.user import db
+from src.models.auth import User
+from src.models.period import ClosedPeriod, PeriodSnapshot
+from src.models.sales import (
+    Employee, Team, Project, Target, MarketingBudget,
+    PerformanceKPI, PerformanceScore, Commission, CommissionFingerprint
+)
+from src.services.reference_cache import TRACKED_TABLES, bump_versions
+from src.services.autocomplete import VERSION_NAME as CLIENTS_VERSION, client_autocomplete
+from src.services.periods import period_close
+from src.services.search import search_index
+
+PRODUCT_TYPES = ('حديد إنشائي', 'خشب', 'ألومنيوم', 'حديد ديكور')
+
+DEFAULT_KPIS = (
+    ('تحقيق الهدف', 'نسبة تحقيق الهدف الشهري', 0.4),
+    ('عدد العملاء الجدد', 'عدد العملاء الجدد المكتسبين', 0.2),
+    ('رضا العملاء', 'تقييم رضا العملاء', 0.2),
+    ('الالتزام بالتقارير', 'الالتزام بتسليم التقارير في الوقت المحدد', 0.1),
+    ('التطوير المهني', 'المشاركة في الدورات التدريبية', 0.1),
+)
+
+FIRST_NAMES = (
+    'محمد', 'أحمد', 'عبدالله', 'خالد', 'فهد', 'سعد', 'يوسف', 'عمر', 'عبدالرحمن', 'فيصل',
+    'سارة', 'نورة', 'فاطمة', 'ريم', 'هند', 'لمى', 'منى', 'عبير', 'أمل', 'جود',
+)
+LAST_NAMES = (
+    'العتيبي', 'القحطاني', 'الشهري', 'الغامدي', 'الزهراني', 'الدوسري', 'الحربي', 'المطيري',
+    'السبيعي', 'العنزي', 'الشمري', 'الرشيدي', 'البقمي', 'المالكي', 'الجهني', 'السهلي',
+)
+CLIENT_KINDS = ('شركة', 'مؤسسة', 'مكتب', 'مجموعة', 'مصنع', 'معرض')
+CLIENT_NAMES = (
+    'البناء', 'الإعمار', 'المقاولات', 'التطوير العقاري', 'الديكور', 'التشطيبات', 'الأثاث',
+    'الهندسة', 'التصميم', 'الإنشاءات', 'المعادن', 'النجارة', 'الواجهات', 'العمران',
+)
+CLIENT_QUALIFIERS = (
+    'المتطور', 'الحديثة', 'الراقية', 'السريع', 'الفاخر', 'العصري', 'المتحدة', 'الأولى',
+    'الذهبية', 'الوطنية', 'الخليجية', 'المتكاملة',
+)
+
+# الجداول التي تُمسح عند الاستبدال، بترتيب يحترم المفاتيح الأجنبية
+_GENERATED_MODELS = (
+    PeriodSnapshot, ClosedPeriod, CommissionFingerprint, Commission, PerformanceScore, PerformanceKPI,
+    MarketingBudget, Target, Project, Employee, Team
+)
+
+
+def _months(start_year, start_month, count):
+    year, month = start_year, start_month
+    for _ in range(count):
+        yield year, month
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+
+
+def _timestamp(day):
+    return datetime(day.year, day.month, day.day, 9, 0).isoformat(' ', 'microseconds')
+
+
+class _BulkWriter:
+    """إدراج دفعات مباشرة عبر executemany على اتصال الكتابة
+
+    القيم تُجهز بالصيغة التي يخزنها SQLAlchemy في SQLite (تواريخ ISO)،
+    فلا تمر الصفوف بمعالجة الأنواع صفاً صفاً ولا بأحداث الجلسة.
+    """
+
+    def __init__(self, batch_size, log):
+        self.batch_size = batch_size
+        self.log = log
+        self.counts = {}
+
+    def next_id(self, model):
+        return (db.session.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+    def insert(self, model, columns, rows):
+        table = model.__table__
+        statement = (
+            f"INSERT INTO {table.name} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})"
+        )
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._flush(table.name, statement, batch)
+                batch = []
+        if batch:
+            self._flush(table.name, statement, batch)
+
+    def _flush(self, name, statement, batch):
+        db.session.connection().exec_driver_sql(statement, batch)
+        if name in TRACKED_TABLES:
+            bump_versions(db.session, (TRACKED_TABLES[name],))
+        elif name == Project.__tablename__:
+            bump_versions(db.session, (CLIENTS_VERSION,))
+        db.session.commit()
+        self.counts[name] = self.counts.get(name, 0) + len(batch)
+        self.log(f'{name}: {self.counts[name]}')
+
+
+def generate_data(teams=4, employees_per_team=10, months=12, projects_per_rep=20,
+                  social_share=0.3, start_year=2024, start_month=1, seed=1,
+                  replace=False, batch_size=20000, progress=None, log=None):
+    """توليد بيانات تجريبية واقعية بحجم قابل للضبط
+
+    النتيجة حتمية لنفس البذرة ونفس حالة القاعدة. كل فريق له قائد واحد
+    والباقي مناديب؛ للمناديب مشاريع وأهداف ونقاط أداء لكل شهر، ولكل شهر
+    ميزانية تسويق واحدة. المشاريع تُسعّر وتحقيق الأهداف يُحسب كما لو أُدخلت
+    من الواجهة. الاستبدال يُرفض إذا ارتبطت حسابات مستخدمين بموظفين.
+    """
+    log = log or (lambda message: None)
+    if employees_per_team < 2:
+        raise ValueError('كل فريق يحتاج قائداً ومندوباً واحداً على الأقل')
+    if not 0 <= social_share <= 1:
+        raise ValueError('نسبة مشاريع التواصل الاجتماعي يجب أن تكون بين 0 و 1')
+
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    periods = list(_months(start_year, start_month, months))
+    writer = _BulkWriter(batch_size, log)
+
+    if replace:
+        # حسابات المستخدمين تشير إلى الموظفين؛ حذفهم يترك روابط معلقة
+        if db.session.execute(select(func.count(User.id)).where(User.employee_id.isnot(None))).scalar():
+            raise ValueError('لا يمكن استبدال البيانات: توجد حسابات مستخدمين مرتبطة بموظفين')
+        for model in _GENERATED_MODELS:
+            db.session.query(model).delete()
+        db.session.commit()
+        period_close.invalidate()
+
+    # الفرق والموظفون
+    team_base = writer.next_id(Team)
+    employee_base = writer.next_id(Employee)
+    now = _timestamp(date(start_year, start_month, 1))
+
+    manager_id = employee_base
+    employees = [(manager_id, 'sales_manager', None, 15000)]
+    reps_by_team = {}
+    next_employee = employee_base + 1
+    for index in range(teams):
+        team_id = team_base + index
+        employees.append((next_employee, 'team_leader', team_id, 8000))
+        next_employee += 1
+        reps_by_team[team_id] = list(range(next_employee, next_employee + employees_per_team - 1))
+        for employee_id in reps_by_team[team_id]:
+            employees.append((employee_id, 'sales_rep', team_id, 5000))
+        next_employee += employees_per_team - 1
+
+    writer.insert(Team, ('id', 'name', 'leader_id', 'created_at'), (
+        (team_base + index, f'فريق {index + 1}', employee_base + 1 + index * employees_per_team, now)
+        for index in range(teams)
+    ))
+    writer.insert(
+        Employee,
+        ('id', 'name', 'role', 'base_salary', 'team_id', 'phone', 'email', 'hire_date', 'is_active', 'created_at'),
+        (
+            (
+                employee_id,
+                f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                role,
+                salary,
+                team_id,
+                f'05{rng.randrange(10 ** 8):08d}',
+                f'emp{employee_id}@aloud.com',
+                date(rng.randint(min(2018, start_year - 1), start_year - 1), rng.randint(1, 12), rng.randint(1, 28)).isoformat(),
+                1,
+                now
+            )
+            for employee_id, role, team_id, salary in employees
+        )
+    )
+
+    # مؤشرات الأداء: تُستخدم الموجودة إن وُجدت
+    kpis = db.session.execute(
+        select(PerformanceKPI.id, PerformanceKPI.weight, PerformanceKPI.max_score)
+        .where(PerformanceKPI.is_active == True)
+    ).all()
+    if not kpis:
+        kpi_base = writer.next_id(PerformanceKPI)
+        writer.insert(
+            PerformanceKPI,
+            ('id', 'name', 'description', 'weight', 'max_score', 'is_active', 'created_at'),
+            (
+                (kpi_base + index, name, description, weight, 10.0, 1, now)
+                for index, (name, description, weight) in enumerate(DEFAULT_KPIS)
+            )
+        )
+        kpis = [(kpi_base + index, weight, 10.0) for index, (_, _, weight) in enumerate(DEFAULT_KPIS)]
+
+    # أهداف المناديب وميزانيات الأشهر قبل المشاريع: تسعير كل مشروع يحتاجها
+    reps = [employee_id for team_reps in reps_by_team.values() for employee_id in team_reps]
+    target_amounts = {
+        (employee_id, year, month): rng.randrange(80000, 160001, 5000)
+        for year, month in periods for employee_id in reps
+    }
+    existing_budgets = dict(
+        ((year, month), total)
+        for year, month, total in db.session.execute(
+            select(MarketingBudget.year, MarketingBudget.month, MarketingBudget.total_budget)
+        )
+    )
+    new_budgets = {
+        period: rng.randrange(30000, 80001, 1000) for period in periods if period not in existing_budgets
+    }
+    budget_amounts = {**existing_budgets, **new_budgets}
+
+    # أسماء العملاء: مجموعة محدودة بتوزيع غير متساوٍ كما في الواقع
+    total_projects = len(reps) * months * projects_per_rep
+    clients = sorted({
+        f'{rng.choice(CLIENT_KINDS)} {rng.choice(CLIENT_NAMES)} {rng.choice(CLIENT_QUALIFIERS)}'
+        for _ in range(max(50, min(total_projects // 20, 20000)))
+    })
+    rng.shuffle(clients)
+    client_weights = []
+    cumulative = 0.0
+    for rank in range(len(clients)):
+        cumulative += 1.0 / (rank + 1)
+        client_weights.append(cumulative)
+
+    achieved = {}
+
+    def projects():
+        """مشاريع كل شهر مسعّرة كما لو أُدخلت بترتيب توقيعها عبر POST /api/projects
+
+        نسبة العمولة من تحقيق المندوب قبل المشروع، وتكلفة التسويق حصة المشروع
+        من ميزانية الشهر بين مشاريع السوشيال ميديا كما يوزعها مسار إعادة التوزيع.
+        """
+        from src.routes.sales import get_commission_rate
+
+        done = 0
+        for year, month in periods:
+            rows = []
+            for employee_id in reps:
+                deals = sorted((
+                    (
+                        date(year, month, rng.randint(1, 28)),
+                        rng.choice(PRODUCT_TYPES),
+                        rng.choices(clients, cum_weights=client_weights)[0],
+                        round(rng.lognormvariate(11.3, 0.6), -2),
+                        rng.random() < social_share
+                    )
+                    for _ in range(projects_per_rep)
+                ), key=lambda deal: deal[0])
+                target = target_amounts[(employee_id, year, month)]
+                total = 0.0
+                for signed, product_type, client, value, social in deals:
+                    rate = get_commission_rate('sales_rep', total / target)
+                    if social:
+                        rate -= 0.005
+                    total += value
+                    rows.append([employee_id, client, value, product_type, signed, social, rate, value * rate])
+                achieved[(employee_id, year, month)] = total
+
+            social_total = sum(row[2] for row in rows if row[5])
+            budget = budget_amounts[(year, month)]
+            for employee_id, client, value, product_type, signed, social, rate, commission in rows:
+                allocated = budget * value / social_total if social else 0.0
+                stamp = _timestamp(signed)
+                yield (
+                    employee_id, client, value, product_type, signed.isoformat(), 1 if social else 0,
+                    allocated, rate, max(0, commission - allocated),
+                    f'مشروع تجريبي - {product_type}', stamp, stamp
+                )
+            done += len(rows)
+            if progress is not None:
+                progress(done, total_projects)
+
+    project_base = writer.next_id(Project)
+    writer.insert(
+        Project,
+        ('employee_id', 'client_name', 'project_value', 'product_type', 'signature_date',
+         'is_from_social_media', 'marketing_cost_allocated', 'commission_rate', 'final_commission',
+         'notes', 'created_at', 'updated_at'),
+        projects()
+    )
+
+    # فهرس البحث والإكمال: الإدراج المباشر لا يمر بأحداث الجلسة
+    if search_index.available:
+        search_index.index_from('employees', employee_base, batch_size, log)
+        search_index.index_from('projects', project_base, batch_size, log)
+    client_autocomplete.invalidate()
+
+    # الأهداف: هدف المندوب مع ما حققه، والقائد مجموع فريقه، والمدير مجموع الكل
+    def targets():
+        for year, month in periods:
+            stamp = _timestamp(date(year, month, 1))
+            overall = 0
+            for index, (team_id, team_reps) in enumerate(reps_by_team.items()):
+                team_total = 0
+                for employee_id in team_reps:
+                    amount = target_amounts[(employee_id, year, month)]
+                    done = achieved[(employee_id, year, month)]
+                    team_total += amount
+                    yield (employee_id, month, year, amount, done, done / amount, stamp, stamp)
+                leader_id = employee_base + 1 + index * employees_per_team
+                yield (leader_id, month, year, team_total, 0.0, 0.0, stamp, stamp)
+                overall += team_total
+            yield (manager_id, month, year, overall, 0.0, 0.0, stamp, stamp)
+
+    writer.insert(
+        Target,
+        ('employee_id', 'month', 'year', 'target_amount', 'achieved_amount',
+         'achievement_percentage', 'created_at', 'updated_at'),
+        targets()
+    )
+
+    def scores():
+        for year, month in periods:
+            stamp = _timestamp(date(year, month, 1))
+            for employee_id in reps:
+                for kpi_id, weight, max_score in kpis:
+                    score = round(rng.uniform(max_score * 0.5, max_score), 2)
+                    yield (employee_id, kpi_id, month, year, score, score * weight, stamp, stamp)
+
+    writer.insert(
+        PerformanceScore,
+        ('employee_id', 'kpi_id', 'month', 'year', 'score', 'weighted_score', 'created_at', 'updated_at'),
+        scores()
+    )
+
+    def budgets():
+        for (year, month), amount in new_budgets.items():
+            stamp = _timestamp(date(year, month, 1))
+            yield (month, year, amount, 0.0, amount, manager_id, stamp, stamp)
+
+    writer.insert(
+        MarketingBudget,
+        ('month', 'year', 'total_budget', 'allocated_budget', 'remaining_budget',
+         'created_by', 'created_at', 'updated_at'),
+        budgets()
+    )
+
+    return {
+        'seed': seed,
+        'rows': writer.counts,
+        'periods': [f'{year}-{month:02d}' for year, month in (periods[0], periods[-1])] if periods else [],
+        'seconds': round(time.perf_counter() - started, 2)
+    }
+
+
+@click.command('generate-data')
+@click.option('--teams', default=4, show_default=True)
+@click.option('--employees-per-team', default=10, show_default=True, help='قائد الفريق ضمنهم')
+@click.option('--months', default=12, show_default=True)
+@click.option('--projects-per-rep', default=20, show_default=True, help='مشاريع كل مندوب شهرياً')
+@click.option('--social-share', default=0.3, show_default=True)
+@click.option('--start', default='2024-01', show_default=True, help='أول شهر YYYY-MM')
+@click.option('--seed', default=1, show_default=True)
+@click.option('--replace', is_flag=True, help='حذف بيانات المبيعات الحالية أولاً')
+@click.option('--batch-size', default=20000, show_default=True)
+@with_appcontext
+def generate_data_command(teams, employees_per_team, months, projects_per_rep,
+                          social_share, start, seed, replace, batch_size):
+    """توليد بيانات تجريبية لاختبارات الحمل والسعة"""
+    try:
+        start_year, start_month = (int(part) for part in start.split('-'))
+        result = generate_data(
+            teams=teams, employees_per_team=employees_per_team, months=months,
+            projects_per_rep=projects_per_rep, social_share=social_share,
+            start_year=start_year, start_month=start_month, seed=seed,
+            replace=replace, batch_size=batch_size, log=click.echo
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(json.dumps(result, ensure_ascii=False, indent=2))
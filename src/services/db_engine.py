@@ -0,0 +1,170 @@
+import os
+
+import click
+from flask import current_app, has_request_context, request
+from flask.cli import with_appcontext
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# إعدادات PRAGMA لكل ملف تعريف
+SQLITE_PROFILES = {
+    # سلوك SQLite الافتراضي: سجل تراجع، الكاتب يحجب القراء
+    'default': {},
+    # WAL: القراء لا يُحجبون أثناء الكتابة
+    'wal': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,  # حوالي 64 ميغابايت لكل اتصال
+        'mmap_size': 268435456,  # 256 ميغابايت
+        'busy_timeout': 5000,  # ملي ثانية
+        'temp_store': 'MEMORY',
+    },
+}
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingSession(Session):
+    """جلسة توجه طلبات القراءة إلى مجمع اتصالات القراءة فقط
+
+    طلبات GET تقرأ عبر محرك 'reader' إن وُجد؛ أي flush أو طلب كتابة
+    أو عمل خارج الطلبات (مهام، أوامر CLI) يستخدم محرك الكتابة.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and 'reader' in self._db.engines
+            and has_request_context()
+            and request.method in READ_METHODS
+        ):
+            return self._db.engines['reader']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _is_file_database(uri):
+    url = make_url(uri)
+    return url.drivername.startswith('sqlite') and url.database not in (None, '', ':memory:')
+
+
+def configure_engine_options(app):
+    """ضبط خيارات المحركات حسب SQLITE_PROFILE (قبل db.init_app)"""
+    app.config.setdefault('SQLITE_PROFILE', 'wal')
+    app.config.setdefault('SQLITE_READ_POOL_SIZE', 8)
+    app.config.setdefault('SQLITE_WRITE_TIMEOUT', 30)
+
+    profile = app.config['SQLITE_PROFILE']
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f'ملف تعريف SQLite غير معروف: {profile}')
+
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if profile == 'default' or not _is_file_database(uri):
+        return
+
+    # كاتب واحد متسلسل
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    options.setdefault('pool_size', 1)
+    options.setdefault('max_overflow', 0)
+    options.setdefault('pool_timeout', app.config['SQLITE_WRITE_TIMEOUT'])
+
+    # مجمع قراءة فقط
+    url = make_url(uri)
+    reader_url = url.set(
+        database=f'file:{url.database}',
+        query={**url.query, 'mode': 'ro', 'uri': 'true'}
+    )
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    binds.setdefault('reader', {
+        'url': reader_url.render_as_string(hide_password=False),
+        'pool_size': app.config['SQLITE_READ_POOL_SIZE'],
+        'max_overflow': 0,
+        'pool_timeout': app.config['SQLITE_WRITE_TIMEOUT'],
+    })
+
+
+def install_engine_profile(app, db):
+    """تطبيق PRAGMA على كل اتصال جديد (بعد db.init_app)"""
+    pragmas = SQLITE_PROFILES[app.config['SQLITE_PROFILE']]
+    if not pragmas:
+        return
+
+    with app.app_context():
+        engines = db.engines
+        writer = engines[None]
+        if writer.dialect.name != 'sqlite':
+            return
+
+        @event.listens_for(writer, 'connect')
+        def _writer_connect(dbapi_connection, connection_record):
+            # إدارة المعاملات يدوياً حتى نبدأها بـ BEGIN IMMEDIATE
+            dbapi_connection.isolation_level = None
+            _apply_pragmas(dbapi_connection, pragmas)
+
+        @event.listens_for(writer, 'begin')
+        def _writer_begin(connection):
+            # حجز قفل الكتابة مقدماً: busy_timeout يسري على الانتظار بدلاً من
+            # فشل ترقية القفل فوراً بـ "database is locked"
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+        reader = engines.get('reader')
+        if reader is not None:
+            # journal_mode يُحفظ في الملف؛ لا يمكن ضبطه من اتصال قراءة فقط
+            reader_pragmas = {k: v for k, v in pragmas.items() if k != 'journal_mode'}
+
+            @event.listens_for(reader, 'connect')
+            def _reader_connect(dbapi_connection, connection_record):
+                _apply_pragmas(dbapi_connection, reader_pragmas)
+
+        # تفعيل WAL قبل فتح أي اتصال قراءة
+        with writer.connect() as connection:
+            connection.exec_driver_sql('SELECT 1')
+
+
+def install_fork_safety(app, db):
+    """إسقاط اتصالات العملية الأم في كل عملية ابنة بعد fork
+
+    الاتصالات الموروثة لا تُغلق (close=False) لأن العملية الأم ما زالت
+    تملكها؛ الابن يفتح اتصالاته الخاصة عند أول استخدام.
+    """
+    def _dispose_in_child():
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_dispose_in_child)
+
+
+def _apply_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def create_missing_indexes(db):
+    """إنشاء فهارس النماذج الناقصة في الجداول الموجودة
+
+    create_all لا يضيف فهارس جديدة لجدول موجود مسبقاً، فتُنشأ هنا بـ
+    checkfirst بعده؛ فهارس الجداول الجديدة موجودة أصلاً.
+    """
+    for table in db.metadata.tables.values():
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """إنشاء جداول قاعدة البيانات الناقصة"""
+    from src.models import archive, auth, event, job, period, reference, sales, user  # noqa: F401 تسجيل كل الجداول
+    from src.services.search import search_index
+    db = current_app.extensions['sqlalchemy']
+    db.create_all()
+    create_missing_indexes(db)
+    search_index.ensure_schema(log=click.echo)
+    click.echo(f"تم إنشاء الجداول: {len(db.metadata.tables)}")
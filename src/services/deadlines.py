@@ -0,0 +1,128 @@
+import logging
+import math
+import time
+from contextvars import ContextVar
+
+from flask import jsonify, request
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from src.services.db_engine import READ_METHODS
+
+logger = logging.getLogger(__name__)
+
+_state = ContextVar('query_deadline', default=None)  # [started, expires_at, interrupted]
+
+
+class QueryDeadlines:
+    """مهلة قصوى لاستعلامات طلبات القراءة عبر progress handler في SQLite
+
+    كل اتصال SQLite يستدعي المعالج كل QUERY_DEADLINE_CHECK_INTERVAL تعليمة
+    من آلة SQLite الافتراضية؛ إذا تجاوز الطلب مهلته يعيد 1 فيقطع SQLite
+    الاستعلام الجاري ويرفع OperationalError (interrupted). بعدها يُستبدل
+    رد الطلب أياً كان بـ 503 مع Retry-After.
+
+    المهلة تبدأ من بداية الطلب وتُحدد من QUERY_DEADLINES بالثواني: مفتاح
+    المسار الكامل (admin.get_projects) أولاً ثم اسم المخطط، وإلا
+    QUERY_DEADLINE_DEFAULT (0 = بلا مهلة). تُحسب عند أول استعلام لأن
+    المخططات المؤجلة لا يُعرف مسارها قبل تنفيذه. طلبات الكتابة والمهام
+    الخلفية لا تُقطع: لا يُترك تعديل نصف منفذ. تحويل الرد إلى JSON بعد
+    الاستعلام لا يدخل في المهلة.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.deadlines = {}
+        self.default = 0.0
+        self.retry_after = 5
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('QUERY_DEADLINES_ENABLED', True)
+        app.config.setdefault('QUERY_DEADLINES', {})
+        app.config.setdefault('QUERY_DEADLINE_DEFAULT', 0.0)
+        app.config.setdefault('QUERY_DEADLINE_CHECK_INTERVAL', 10000)
+        app.config.setdefault('QUERY_DEADLINE_RETRY_AFTER', 5)
+        self.enabled = app.config['QUERY_DEADLINES_ENABLED']
+        self.deadlines = dict(app.config['QUERY_DEADLINES'])
+        self.default = app.config['QUERY_DEADLINE_DEFAULT']
+        self.retry_after = app.config['QUERY_DEADLINE_RETRY_AFTER']
+        app.extensions['query_deadlines'] = self
+        if not self.enabled:
+            return
+
+        interval = app.config['QUERY_DEADLINE_CHECK_INTERVAL']
+        db = app.extensions['sqlalchemy']
+        with app.app_context():
+            for engine in db.engines.values():
+                if engine.dialect.name != 'sqlite':
+                    continue
+
+                # عند السحب لا الإنشاء: المجمع فيه اتصالات فُتحت قبل التهيئة
+                @event.listens_for(engine, 'checkout')
+                def _install_handler(dbapi_connection, connection_record, connection_proxy):
+                    dbapi_connection.set_progress_handler(self._progress, interval)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.register_error_handler(OperationalError, self._handle_interrupted)
+
+    def seconds(self, endpoint, blueprint):
+        """مهلة المسار بالثواني، أو None إن لم تكن له مهلة"""
+        seconds = self.deadlines.get(endpoint, self.deadlines.get(blueprint, self.default))
+        return seconds if seconds and seconds > 0 else None
+
+    # ===== دورة الطلب =====
+
+    def _before_request(self):
+        if request.method in READ_METHODS:
+            _state.set([time.monotonic(), None, False])
+
+    def _progress(self):
+        state = _state.get()
+        if state is None:
+            return 0
+        if state[1] is None:
+            seconds = self.seconds(request.endpoint, request.blueprint)
+            state[1] = state[0] + seconds if seconds else math.inf
+        if time.monotonic() < state[1]:
+            return 0
+        state[2] = True
+        return 1
+
+    def _timeout_response(self):
+        state = _state.get()
+        logger.warning('تجاوز مهلة الاستعلام: %s %s بعد %.2f ث',
+                       request.method, request.path, time.monotonic() - state[0])
+        response = jsonify({
+            'error': 'استغرق الاستعلام وقتاً أطول من المسموح، يرجى تضييق نطاق البحث أو المحاولة لاحقاً',
+            'retry_after': self.retry_after
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = str(self.retry_after)
+        return response
+
+    def _handle_interrupted(self, error):
+        if not interrupted():
+            raise error
+        return self._timeout_response()
+
+    def _after_request(self, response):
+        # مسارات الإدارة تلتقط الاستثناء وتعيد 500 بنصه؛ يُستبدل هنا أيضاً
+        if interrupted() and response.status_code != 503:
+            return self._timeout_response()
+        return response
+
+    def _teardown_request(self, exc):
+        _state.set(None)
+
+
+def interrupted():
+    """هل قُطع استعلام في الطلب الحالي لتجاوزه المهلة"""
+    state = _state.get()
+    return state is not None and state[2]
+
+
+query_deadlines = QueryDeadlines()
@@ -0,0 +1,298 @@
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime
+
+from sqlalchemy import delete, event, func, insert, select
+
+from src.models.user import db
+from src.models.event import ChangeEvent
+from src.models.sales import Project, Target, Commission, MarketingBudget
+
+logger = logging.getLogger(__name__)
+
+_PRUNE_EVERY = 1000  # تنظيف الجدول كل هذا العدد من دفعات الكتابة في العملية
+_inserted = itertools.count(1)
+
+
+def _period(year, month):
+    return f'{year}-{month:02d}' if year and month else None
+
+# استخراج الحقول المختصرة لكل جدول متابَع
+_EXTRACTORS = {
+    Project: lambda obj: (
+        obj.employee_id,
+        _period(obj.signature_date.year, obj.signature_date.month) if obj.signature_date else None
+    ),
+    Target: lambda obj: (obj.employee_id, _period(obj.year, obj.month)),
+    Commission: lambda obj: (obj.employee_id, _period(obj.year, obj.month)),
+    MarketingBudget: lambda obj: (None, _period(obj.year, obj.month)),
+}
+
+
+class Subscription:
+    """اتصال عميل واحد بمخزن مؤقت محدود"""
+
+    def __init__(self, buffer_size, tables=None):
+        self.queue = queue.Queue(maxsize=buffer_size)
+        self.tables = tables
+        self.dropped = False
+        self.last_seq = 0  # آخر حدث وُضع في المخزن؛ يمنع التكرار بعد الاستئناف
+
+    def wants(self, change):
+        return self.tables is None or change['table'] in self.tables
+
+
+class EventBroadcaster:
+    """بث أحداث التغيير بعد الالتزام إلى عملاء SSE في كل العمليات
+
+    التغييرات تُكتب في جدول change_events ضمن معاملة الكتابة نفسها، فلا
+    يظهر حدث لمعاملة تراجعت. في كل عملية لها عملاء خيط توزيع واحد يقرأ
+    الصفوف الجديدة كل EVENTS_POLL_INTERVAL ثانية (أو فوراً بعد التزام في
+    العملية نفسها) ويضعها في مخازن العملاء دون انتظار، فيصل الحدث لكل
+    العملاء أياً كانت العملية التي التزمت به. رقم الصف هو رقم الحدث
+    المشترك بين العمليات، ومنه يُستأنف Last-Event-ID. العميل البطيء الذي
+    يمتلئ مخزنه يُفصل ويُبلَّغ بحدث reset ليعيد الجلب كاملاً.
+    """
+
+    def __init__(self, app=None):
+        self._app = None
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._inbox = None
+        self._dispatcher = None
+        self._pid = None
+        self._last_id = 0
+        self.buffer_size = 100
+        self.max_clients = 500
+        self.heartbeat = 15
+        self.poll_interval = 0.5
+        self.replay_limit = 256
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('EVENTS_CLIENT_BUFFER', 100)
+        app.config.setdefault('EVENTS_MAX_CLIENTS', 500)
+        app.config.setdefault('EVENTS_HEARTBEAT_SECONDS', 15)
+        app.config.setdefault('EVENTS_POLL_INTERVAL', 0.5)
+        app.config.setdefault('EVENTS_REPLAY_LIMIT', 256)
+        app.config.setdefault('EVENTS_RETENTION', 10000)
+        self._app = app
+        self.buffer_size = app.config['EVENTS_CLIENT_BUFFER']
+        self.max_clients = app.config['EVENTS_MAX_CLIENTS']
+        self.heartbeat = app.config['EVENTS_HEARTBEAT_SECONDS']
+        self.poll_interval = app.config['EVENTS_POLL_INTERVAL']
+        self.replay_limit = app.config['EVENTS_REPLAY_LIMIT']
+        app.extensions['event_broadcaster'] = self
+
+        if not event.contains(db.session, 'after_flush', _record_changes):
+            event.listen(db.session, 'after_flush', _record_changes)
+            event.listen(db.session, 'after_commit', _notify_committed)
+
+    @property
+    def client_count(self):
+        return len(self._clients)
+
+    def _ensure_dispatcher(self):
+        # خيط التوزيع يُنشأ عند الحاجة في كل عملية حتى يبقى آمناً بعد fork
+        if self._dispatcher is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._dispatcher is None or self._pid != os.getpid():
+                self._inbox = queue.SimpleQueue()
+                self._clients = set()
+                self._pid = os.getpid()
+                self._last_id = self._fetch_max_id()
+                self._dispatcher = threading.Thread(
+                    target=self._dispatch, name='event-dispatcher', daemon=True
+                )
+                self._dispatcher.start()
+
+    def notify(self):
+        """إيقاظ خيط التوزيع بعد التزام في هذه العملية دون انتظار"""
+        if self._dispatcher is not None and self._pid == os.getpid() and self._clients:
+            self._inbox.put(True)
+
+    # ===== قراءة جدول الأحداث =====
+
+    def _connection(self):
+        engine = db.engines.get('reader') or db.engine
+        return engine.connect()
+
+    def _fetch_max_id(self):
+        with self._app.app_context(), self._connection() as connection:
+            return connection.execute(select(func.max(ChangeEvent.id))).scalar() or 0
+
+    def _fetch(self, after_id, limit):
+        table = ChangeEvent.__table__
+        with self._app.app_context(), self._connection() as connection:
+            rows = connection.execute(
+                select(table.c.id, table.c.table_name, table.c.op, table.c.row_id,
+                       table.c.employee_id, table.c.period)
+                .where(table.c.id > after_id).order_by(table.c.id).limit(limit)
+            ).all()
+        return [
+            {'table': table_name, 'op': op, 'id': row_id, 'employee_id': employee_id,
+             'period': period, 'seq': seq}
+            for seq, table_name, op, row_id, employee_id, period in rows
+        ]
+
+    def _dispatch(self):
+        while True:
+            try:
+                self._inbox.get(timeout=self.poll_interval)
+            except queue.Empty:
+                pass
+            if not self._clients:
+                continue
+            try:
+                changes = self._fetch(self._last_id, 1000)
+            except Exception:
+                logger.exception('تعذر قراءة أحداث التغيير')
+                continue
+            if not changes:
+                continue
+            with self._lock:
+                for change in changes:
+                    for client in list(self._clients):
+                        if change['seq'] <= client.last_seq or not client.wants(change):
+                            continue
+                        try:
+                            client.queue.put_nowait(change)
+                            client.last_seq = change['seq']
+                        except queue.Full:
+                            self._drop(client)
+                self._last_id = changes[-1]['seq']
+
+    def _drop(self, client):
+        # يُستدعى والقفل محجوز
+        client.dropped = True
+        self._clients.discard(client)
+        # إيقاظ العميل ليُغلق الاتصال
+        try:
+            client.queue.get_nowait()
+            client.queue.put_nowait(None)
+        except (queue.Empty, queue.Full):
+            pass
+
+    def subscribe(self, tables=None, last_event_id=None):
+        """تسجيل عميل جديد، أو None إذا بلغ عدد العملاء الحد الأقصى"""
+        self._ensure_dispatcher()
+        client = Subscription(self.buffer_size, tables)
+        # حجز المقعد والاستئناف تحت القفل: لا يتجاوز عميلان الحد معاً، ولا
+        # يفوت العميل حدثاً يوزَّع بين قراءة السجل وتسجيله
+        with self._lock:
+            if len(self._clients) >= self.max_clients:
+                return None
+            if not self._clients:
+                # التوزيع متوقف بلا عملاء: نبدأ من آخر حدث حالي لا من المتراكم
+                self._last_id = self._fetch_max_id()
+            client.last_seq = self._last_id
+            if last_event_id is not None:
+                if last_event_id < self._last_id - self.replay_limit:
+                    client.queue.put_nowait(None)  # فاته أكثر مما يُعاد: reset
+                else:
+                    client.last_seq = last_event_id
+                    for change in self._fetch(last_event_id, self.replay_limit):
+                        if change['seq'] > self._last_id:
+                            break  # الأحدث يصل من خيط التوزيع
+                        client.last_seq = change['seq']
+                        if not client.wants(change):
+                            continue
+                        try:
+                            client.queue.put_nowait(change)
+                        except queue.Full:
+                            client.dropped = True  # يُغلق بحدث reset عند أول قراءة
+                            break
+            self._clients.add(client)
+        return client
+
+    def unsubscribe(self, client):
+        with self._lock:
+            self._clients.discard(client)
+
+    def stream(self, client):
+        """مولد نص SSE لعميل مسجل"""
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    change = client.queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+
+                if change is None or client.dropped:
+                    yield 'event: reset\ndata: {}\n\n'
+                    return
+
+                yield (
+                    f"id: {change['seq']}\n"
+                    "event: change\n"
+                    f"data: {json.dumps(change, separators=(',', ':'))}\n\n"
+                )
+        finally:
+            self.unsubscribe(client)
+
+
+broadcaster = EventBroadcaster()
+
+
+def _record_changes(session, flush_context):
+    """كتابة التغييرات على الجداول المتابعة في change_events ضمن المعاملة نفسها"""
+    rows = []
+    now = datetime.utcnow()
+    for op, objects in (('insert', session.new), ('update', session.dirty), ('delete', session.deleted)):
+        for obj in objects:
+            extractor = _EXTRACTORS.get(type(obj))
+            if extractor is None:
+                continue
+            if op == 'update' and not session.is_modified(obj, include_collections=False):
+                continue
+            employee_id, period = extractor(obj)
+            rows.append({
+                'table_name': obj.__tablename__,
+                'op': op,
+                'row_id': obj.id,
+                'employee_id': employee_id,
+                'period': period,
+                'created_at': now
+            })
+    _write_events(session, rows)
+
+
+def record_updates(session, changes):
+    """تسجيل تحديثات جماعية لا تمر بـ flush الجلسة (update من Core) ضمن المعاملة نفسها
+
+    changes: صفوف (الجدول، رقم الصف، الموظف، السنة، الشهر)
+    """
+    now = datetime.utcnow()
+    _write_events(session, [
+        {'table_name': table_name, 'op': 'update', 'row_id': row_id, 'employee_id': employee_id,
+         'period': _period(year, month), 'created_at': now}
+        for table_name, row_id, employee_id, year, month in changes
+    ])
+
+
+def _write_events(session, rows):
+    if not rows:
+        return
+
+    table = ChangeEvent.__table__
+    connection = session.connection()
+    connection.execute(insert(table), rows)
+    if next(_inserted) % _PRUNE_EVERY == 0:
+        # الإبقاء على آخر EVENTS_RETENTION حدث فقط
+        retention = broadcaster._app.config['EVENTS_RETENTION'] if broadcaster._app else 10000
+        newest = connection.execute(select(func.max(table.c.id))).scalar() or 0
+        connection.execute(delete(table).where(table.c.id <= newest - retention))
+    session.info['change_events_recorded'] = True
+
+
+def _notify_committed(session):
+    if session.info.pop('change_events_recorded', None):
+        broadcaster.notify()
@@ -0,0 +1,207 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import jsonify, request
+from sqlalchemy.exc import IntegrityError
+
+from src.models.user import db
+from src.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    """طابور المهام ممتلئ"""
+
+
+class JobProgress:
+    """تقرير تقدم مهمة قيد التنفيذ
+
+    التقدم يُحفظ في جدول المهام كل JOBS_PROGRESS_INTERVAL ثانية على الأكثر
+    ليظهر لمن يستعلم من عملية أخرى. الحفظ يتم فقط بين معاملات المهمة: اتصال
+    الكتابة واحد، وفتح معاملة ثانية أثناء معاملة المهمة ينتظر نفسه.
+    """
+
+    def __init__(self, runner, job_id):
+        self._runner = runner
+        self.job_id = job_id
+        self._persisted_at = 0.0
+
+    def __call__(self, done, total=None):
+        self._runner._live[self.job_id] = (done, total)
+        interval = self._runner._app.config['JOBS_PROGRESS_INTERVAL']
+        if time.monotonic() - self._persisted_at < interval or db.session().in_transaction():
+            return
+        db.session.query(Job).filter(Job.id == self.job_id).update(
+            {'progress_done': done, 'progress_total': total}, synchronize_session=False
+        )
+        db.session.commit()
+        self._persisted_at = time.monotonic()
+
+
+class JobRunner:
+    """منفذ مهام داخل العملية بمجمع خيوط محدود وجدول مهام دائم
+
+    كل مهمة تُنفذ داخل سياق التطبيق بجلسة قاعدة بيانات خاصة بها. المهام
+    النشطة ذات المفتاح نفسه لا تتكرر: يعيد الإرسال المهمة الموجودة.
+    """
+
+    def __init__(self, app=None):
+        self._app = None
+        self._executor = None
+        self._pid = None
+        self._started_at = None
+        self._lock = threading.Lock()
+        self._live = {}  # job_id -> (done, total) للمهام في هذه العملية
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('JOBS_MAX_WORKERS', 2)
+        app.config.setdefault('JOBS_MAX_QUEUED', 20)
+        app.config.setdefault('JOBS_PROGRESS_INTERVAL', 1.0)
+        app.extensions['job_runner'] = self
+        self._app = app
+
+    def _get_executor(self):
+        # يُنشأ المجمع عند أول استخدام في كل عملية حتى يبقى آمناً بعد fork
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._app.config['JOBS_MAX_WORKERS'],
+                    thread_name_prefix='job'
+                )
+                self._pid = os.getpid()
+                self._started_at = datetime.utcnow()
+                self._live = {}
+            return self._executor
+
+    def submit(self, kind, key, func, params=None):
+        """إرسال مهمة أو إعادة المهمة النشطة ذات المفتاح نفسه
+
+        يعيد (job, created).
+        """
+        params = params or {}
+        dedup_key = ':'.join(str(part) for part in (kind,) + tuple(key))
+        executor = self._get_executor()
+
+        existing = self._active_job(dedup_key)
+        if existing is not None:
+            return existing, False
+
+        queued = Job.query.filter_by(status='queued').count()
+        if queued >= self._app.config['JOBS_MAX_QUEUED']:
+            raise JobQueueFull(f'عدد المهام المنتظرة بلغ الحد الأقصى ({queued})')
+
+        job = Job(
+            kind=kind,
+            dedup_key=dedup_key,
+            status='queued',
+            params=json.dumps(params),
+            worker_pid=os.getpid()
+        )
+        db.session.add(job)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # عملية أخرى سبقتنا بالمفتاح نفسه
+            db.session.rollback()
+            return self._active_job(dedup_key), False
+
+        self._live[job.id] = (0, None)
+        executor.submit(self._run, job.id, func, params)
+        return job, True
+
+    def _active_job(self, dedup_key):
+        job = Job.query.filter(
+            Job.dedup_key == dedup_key,
+            Job.status.in_(Job.ACTIVE_STATUSES)
+        ).first()
+        if job is not None and self._is_orphan(job):
+            job.status = 'failed'
+            job.error = 'توقفت العملية المنفذة قبل اكتمال المهمة'
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            return None
+        return job
+
+    def _is_orphan(self, job):
+        if job.worker_pid == os.getpid():
+            # رقم العملية نفسه من تشغيل سابق أُعيد استخدامه
+            return job.created_at < self._started_at
+        try:
+            os.kill(job.worker_pid, 0)
+        except ProcessLookupError:
+            return True
+        except (PermissionError, TypeError):
+            return False
+        return False
+
+    def _run(self, job_id, func, params):
+        with self._app.app_context():
+            try:
+                self._update(job_id, status='running', started_at=datetime.utcnow())
+                result = func(progress=JobProgress(self, job_id), **params)
+                self._update(job_id, status='succeeded', result=json.dumps(result), **self._final_progress(job_id))
+            except Exception as e:
+                # أي فشل، حتى في تسجيل البدء أو النتيجة، ينهي المهمة بحالة failed
+                db.session.rollback()
+                logger.exception('فشلت المهمة %s', job_id)
+                try:
+                    self._update(job_id, status='failed', error=str(e), **self._final_progress(job_id))
+                except Exception:
+                    db.session.rollback()
+                    logger.exception('تعذر تسجيل فشل المهمة %s', job_id)
+            finally:
+                self._live.pop(job_id, None)
+                db.session.remove()
+
+    def _final_progress(self, job_id):
+        done, total = self._live.get(job_id, (0, None))
+        return {'progress_done': done, 'progress_total': total, 'finished_at': datetime.utcnow()}
+
+    def _update(self, job_id, **values):
+        job = db.session.get(Job, job_id)
+        for key, value in values.items():
+            setattr(job, key, value)
+        db.session.commit()
+
+    def status(self, job):
+        """حالة المهمة مع التقدم الحي إن كانت تعمل في هذه العملية"""
+        data = job.to_dict()
+        live = self._live.get(job.id)
+        if live is not None and job.worker_pid == os.getpid():
+            data['progress'] = {'done': live[0], 'total': live[1]}
+        return data
+
+
+job_runner = JobRunner()
+
+
+def wants_async():
+    """هل طلب العميل التنفيذ في الخلفية عبر ?async=1"""
+    return request.args.get('async', '').lower() in ('1', 'true', 'yes')
+
+
+def submit_job(kind, key, func, params, **extra):
+    """إرسال مهمة خلفية وإرجاع رقمها فوراً، أو 503 إذا امتلأ الطابور"""
+    try:
+        job, created = job_runner.submit(kind, key, func, params)
+    except JobQueueFull as e:
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+
+    return jsonify({
+        'message': 'تمت جدولة المهمة' if created else 'توجد مهمة نشطة بنفس المدخلات',
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': f'/api/jobs/{job.id}',
+        'result_url': f'/api/jobs/{job.id}/result',
+        **extra
+    }), 202
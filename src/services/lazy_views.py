@@ -0,0 +1,100 @@
+import threading
+from importlib import import_module
+
+from flask import current_app, request
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import Map
+
+_METHODS = ['GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE']
+
+
+class _RuleCollector:
+    """بديل BlueprintSetupState يجمع مسارات المخطط في خريطة خاصة"""
+
+    def __init__(self, lazy, url_map, views):
+        self.lazy = lazy
+        self.url_map = url_map
+        self.views = views
+
+    def add_url_rule(self, rule, endpoint=None, view_func=None, **options):
+        blueprint = self.lazy.blueprint
+        endpoint = f'{blueprint.name}.{endpoint or view_func.__name__}'
+        options.pop('provide_automatic_options', None)
+        url_rule = self.lazy.app.url_rule_class(self.lazy.url_prefix + rule, endpoint=endpoint, **options)
+        self.url_map.add(url_rule)
+        self.views[endpoint] = view_func
+
+
+class LazyBlueprint:
+    """مخطط يُستورد عند أول طلب لمساراته بدلاً من وقت التشغيل
+
+    Flask لا يسمح بتسجيل مخطط بعد أول طلب، لذلك تُسجل مسارات بديلة عامة
+    عند التشغيل، ثم تُطابق الطلبات على خريطة خاصة بمسارات المخطط الحقيقية.
+    يُضبط request.url_rule على المسار المطابق فيبقى request.endpoint صحيحاً
+    داخل الدالة؛ دوال before_request تعمل قبل ذلك وترى اسم المسار البديل،
+    فتستخدم resolve_endpoint() إن احتاجت الاسم الحقيقي.
+    يدعم المخططات التي تعرّف مسارات فقط (دون before_request وما شابه).
+    """
+
+    def __init__(self, target, url_prefix, paths=('', '/<path:subpath>')):
+        self.target = target  # 'module:attribute'
+        self.url_prefix = url_prefix
+        self.paths = paths
+        self.name = target.rsplit(':', 1)[1]
+        self.app = None
+        self.blueprint = None
+        self._url_map = None
+        self._views = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        stubs = app.extensions.setdefault('lazy_blueprints', {})
+        for index, path in enumerate(self.paths):
+            endpoint = f'lazy_{self.name}_{index}'
+            app.add_url_rule(self.url_prefix + path, endpoint=endpoint, view_func=self.dispatch, methods=_METHODS)
+            stubs[endpoint] = self
+
+    def load(self):
+        if self._url_map is not None:
+            return
+        with self._lock:
+            if self._url_map is not None:
+                return
+            module, attribute = self.target.split(':')
+            self.blueprint = getattr(import_module(module), attribute)
+            url_map = Map(strict_slashes=self.app.url_map.strict_slashes)
+            views = {}
+            collector = _RuleCollector(self, url_map, views)
+            for deferred in self.blueprint.deferred_functions:
+                deferred(collector)
+            self._views = views
+            self._url_map = url_map
+
+    def match(self):
+        self.load()
+        adapter = self._url_map.bind_to_environ(request.environ)
+        return adapter.match(return_rule=True)
+
+    def dispatch(self, **kwargs):
+        rule, view_args = self.match()
+        request.url_rule = rule
+        request.view_args = view_args
+        return self.app.ensure_sync(self._views[rule.endpoint])(**view_args)
+
+
+def resolve_endpoint():
+    """اسم المسار الحقيقي للطلب الحالي حتى قبل تنفيذ مخطط مؤجل
+
+    يستورد المخطط المؤجل إن لم يُستورد بعد. إن لم يطابق الطلب أي مسار فيه
+    يُعاد اسم المسار البديل كما هو.
+    """
+    endpoint = request.endpoint
+    lazy = current_app.extensions.get('lazy_blueprints', {}).get(endpoint)
+    if lazy is None:
+        return endpoint
+    try:
+        rule, _ = lazy.match()
+    except HTTPException:
+        return endpoint
+    return rule.endpoint
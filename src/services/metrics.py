@@ -0,0 +1,343 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from flask import Response, request
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_state = ContextVar('metrics_request', default=None)  # [started, status]
+
+
+class _ThreadShard:
+    """عدادات خيط واحد؛ يكتب فيها خيطها فقط فلا تحتاج قفلاً"""
+
+    __slots__ = ('thread', 'requests', 'latency', 'in_flight', 'cache')
+
+    def __init__(self, thread):
+        self.thread = thread
+        self.requests = {}  # (blueprint, route, method, status) -> count
+        self.latency = {}   # (blueprint, route, method) -> [bucket counts..., +Inf, sum]
+        self.in_flight = 0
+        self.cache = {}     # (cache, result) -> count
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+class Metrics:
+    """مقاييس التشغيل بصيغة Prometheus على /metrics
+
+    كل خيط يسجل في عداداته الخاصة دون أقفال، وتُجمع العدادات عند القراءة
+    فقط. عدادات الخيوط المنتهية تُدمج في مجموع ثابت حتى لا تتراكم.
+
+    مع عدة عمال (server.py) يصل كل جمع إلى عامل عشوائي، فمع
+    METRICS_MULTIPROCESS_DIR يكتب كل عامل مجموعه في ملف باسم رقم عمليته كل
+    METRICS_WRITE_INTERVAL ثانية وعند خروجه، ويضيف العامل المجيب ملفات
+    الآخرين إلى قيمه الحية. عدادات العمال المنتهين تبقى في المجموع حتى لا
+    تنقص العدادات بعد إعادة التشغيل، والمقاييس اللحظية للعمال الأحياء فقط.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.buckets = DEFAULT_BUCKETS
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        self._retired = _ThreadShard(None)
+        self._gauges = {}  # name -> (help, labels, callback)
+        self._cache_sizes = {}  # cache -> callback
+        self.directory = None
+        self.write_interval = 5.0
+        self._writer_pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_PATH', '/metrics')
+        app.config.setdefault('METRICS_BUCKETS', DEFAULT_BUCKETS)
+        app.config.setdefault('METRICS_MULTIPROCESS_DIR', None)
+        app.config.setdefault('METRICS_WRITE_INTERVAL', 5.0)
+        self.enabled = app.config['METRICS_ENABLED']
+        self.buckets = tuple(sorted(app.config['METRICS_BUCKETS']))
+        self.directory = app.config['METRICS_MULTIPROCESS_DIR']
+        self.write_interval = app.config['METRICS_WRITE_INTERVAL']
+        app.extensions['metrics'] = self
+        if not self.enabled:
+            return
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule(app.config['METRICS_PATH'], 'metrics', self._view, methods=['GET'])
+
+        def pool_stats():
+            # يُقرأ أيضاً من خيط كتابة المقاييس خارج أي طلب
+            with app.app_context():
+                return _pool_stats(app)
+        self.register_gauge('db_pool_connections', 'اتصالات مجمع قاعدة البيانات', ('bind', 'state'), pool_stats)
+
+    # ===== التسجيل =====
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _ThreadShard(threading.current_thread())
+            with self._lock:
+                self._shards.append(shard)
+                if len(self._shards) > 256:
+                    self._retire_dead()
+        return shard
+
+    def _before_request(self):
+        if self.directory and self._writer_pid != os.getpid():
+            self._start_writer()
+        self._shard().in_flight += 1
+        _state.set([time.perf_counter(), 500])
+
+    def _after_request(self, response):
+        state = _state.get()
+        if state is not None:
+            state[1] = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        # يعمل حتى عند الاستثناءات فلا يبقى الطلب معلقاً في in_flight
+        state = _state.get()
+        if state is None:
+            return
+        _state.set(None)
+        shard = self._shard()
+        shard.in_flight -= 1
+
+        rule = request.url_rule
+        self.observe(
+            request.blueprint or '',
+            rule.rule if rule is not None else 'unmatched',
+            request.method,
+            state[1],
+            time.perf_counter() - state[0],
+            shard
+        )
+
+    def observe(self, blueprint, route, method, status, elapsed, shard=None):
+        """تسجيل طلب منتهٍ: العداد حسب الحالة ومدرج زمن الاستجابة"""
+        shard = shard or self._shard()
+        key = (blueprint, route, method, status)
+        shard.requests[key] = shard.requests.get(key, 0) + 1
+
+        key = key[:3]
+        histogram = shard.latency.get(key)
+        if histogram is None:
+            histogram = shard.latency[key] = [0] * (len(self.buckets) + 2)
+        histogram[bisect.bisect_left(self.buckets, elapsed)] += 1
+        histogram[-1] += elapsed
+
+    def cache_event(self, cache, hit):
+        """تسجيل إصابة أو إخفاق في ذاكرة تخزين مؤقت مسماة"""
+        shard = self._shard()
+        key = (cache, 'hit' if hit else 'miss')
+        shard.cache[key] = shard.cache.get(key, 0) + 1
+
+    def register_cache(self, cache, size_callback):
+        """حجم ذاكرة التخزين المؤقت يُقرأ عند كل جمع للمقاييس"""
+        self._cache_sizes[cache] = size_callback
+
+    def register_gauge(self, name, help_text, labels, callback):
+        """مقياس لحظي؛ callback يعيد {قيم التسميات: القيمة}"""
+        self._gauges[name] = (help_text, labels, callback)
+
+    # ===== التجميع =====
+
+    def _retire_dead(self):
+        # الخيط المنتهي لن يكتب مجدداً فيُدمج بأمان
+        alive = []
+        for shard in self._shards:
+            if shard.thread.is_alive():
+                alive.append(shard)
+            else:
+                self._merge(self._retired, shard.requests, shard.latency, shard.cache)
+        self._shards = alive
+
+    @staticmethod
+    def _merge(target, requests, latency, cache):
+        for key, value in requests.items():
+            target.requests[key] = target.requests.get(key, 0) + value
+        for key, values in latency.items():
+            current = target.latency.get(key)
+            if current is None:
+                target.latency[key] = list(values)
+            else:
+                for index, value in enumerate(values):
+                    current[index] += value
+        for key, value in cache.items():
+            target.cache[key] = target.cache.get(key, 0) + value
+
+    def snapshot(self):
+        """مجموع عدادات كل الخيوط في لحظة القراءة"""
+        total = _ThreadShard(None)
+        with self._lock:
+            self._retire_dead()
+            self._merge(total, self._retired.requests, self._retired.latency, self._retired.cache)
+            shards = list(self._shards)
+        for shard in shards:
+            # نسخ القاموس عملية ذرية؛ القوائم تُنسخ قبل الجمع
+            latency = {key: list(values) for key, values in shard.latency.copy().items()}
+            self._merge(total, shard.requests.copy(), latency, shard.cache.copy())
+            total.in_flight += shard.in_flight
+        return total
+
+    def _gauge_values(self):
+        """قيم المقاييس اللحظية في هذه العملية: {الاسم: {قيم التسميات: القيمة}}"""
+        values = {'cache_entries': {(cache,): callback() for cache, callback in self._cache_sizes.items()}}
+        for name, (_, _, callback) in self._gauges.items():
+            values[name] = dict(callback())
+        return values
+
+    # ===== عدة عمليات =====
+
+    def _start_writer(self):
+        # خيط الكتابة يُنشأ في كل عملية عند أول طلب حتى يبقى آمناً بعد fork
+        with self._lock:
+            if self._writer_pid == os.getpid():
+                return
+            self._writer_pid = os.getpid()
+        threading.Thread(target=self._write_loop, name='metrics-writer', daemon=True).start()
+
+    def _write_loop(self):
+        while True:
+            time.sleep(self.write_interval)
+            try:
+                self.write()
+            except Exception:
+                logger.exception('تعذر كتابة المقاييس في %s', self.directory)
+
+    def write(self):
+        """كتابة مجموع هذه العملية في METRICS_MULTIPROCESS_DIR ليجمعه أي عامل"""
+        if not self.directory:
+            return
+        total = self.snapshot()
+        state = {
+            'requests': [[*key, value] for key, value in total.requests.items()],
+            'latency': [[*key, values] for key, values in total.latency.items()],
+            'cache': [[*key, value] for key, value in total.cache.items()],
+            'in_flight': total.in_flight,
+            'gauges': {name: [[*key, value] for key, value in values.items()]
+                       for name, values in self._gauge_values().items()},
+        }
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        with open(f'{path}.tmp', 'w') as handle:
+            json.dump(state, handle)
+        os.replace(f'{path}.tmp', path)  # القارئ لا يرى ملفاً نصف مكتوب
+
+    def collect(self):
+        """مجموع هذه العملية مع ما كتبه العمال الآخرون: (العدادات، المقاييس اللحظية)"""
+        total = self.snapshot()
+        gauges = self._gauge_values()
+        if not self.directory:
+            return total, gauges
+
+        for name in os.listdir(self.directory):
+            pid, extension = os.path.splitext(name)
+            if extension != '.json' or not pid.isdigit() or int(pid) == os.getpid():
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as handle:
+                    state = json.load(handle)
+            except (OSError, ValueError):
+                continue
+
+            def rows(key):
+                return {tuple(row[:-1]): row[-1] for row in state[key]}
+            self._merge(total, rows('requests'), rows('latency'), rows('cache'))
+            if not _alive(int(pid)):
+                continue
+            total.in_flight += state['in_flight']
+            for gauge, values in state['gauges'].items():
+                target = gauges.setdefault(gauge, {})
+                for row in values:
+                    key = tuple(row[:-1])
+                    target[key] = target.get(key, 0) + row[-1]
+        return total, gauges
+
+    def render(self):
+        total, gauges = self.collect()
+        lines = []
+
+        def header(name, help_text, kind):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        header('http_requests_total', 'عدد الطلبات حسب المسار والحالة', 'counter')
+        for key, value in sorted(total.requests.items(), key=lambda item: tuple(map(str, item[0]))):
+            lines.append(f"http_requests_total{{{_labels(('blueprint', 'route', 'method', 'status'), key)}}} {value}")
+
+        header('http_request_duration_seconds', 'زمن معالجة الطلب', 'histogram')
+        bounds = [repr(float(bound)) for bound in self.buckets] + ['+Inf']
+        for key, values in sorted(total.latency.items()):
+            labels = _labels(('blueprint', 'route', 'method'), key)
+            cumulative = 0
+            for bound, count in zip(bounds, values[:-1]):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_sum{{{labels}}} {values[-1]:.6f}')
+            lines.append(f'http_request_duration_seconds_count{{{labels}}} {cumulative}')
+
+        header('http_requests_in_flight', 'الطلبات قيد المعالجة', 'gauge')
+        lines.append(f'http_requests_in_flight {total.in_flight}')
+
+        header('cache_requests_total', 'إصابات وإخفاقات ذاكرات التخزين المؤقت', 'counter')
+        for key, value in sorted(total.cache.items()):
+            lines.append(f"cache_requests_total{{{_labels(('cache', 'result'), key)}}} {value}")
+        header('cache_entries', 'عدد العناصر في ذاكرة التخزين المؤقت', 'gauge')
+        for key, value in sorted(gauges.get('cache_entries', {}).items()):
+            lines.append(f"cache_entries{{{_labels(('cache',), key)}}} {value}")
+
+        for name, (help_text, label_names, _) in self._gauges.items():
+            header(name, help_text, 'gauge')
+            for values, value in sorted(gauges.get(name, {}).items()):
+                lines.append(f'{name}{{{_labels(label_names, values)}}} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    def _view(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _pool_stats(app):
+    db = app.extensions['sqlalchemy']
+    stats = {}
+    for bind, engine in db.engines.items():
+        pool = engine.pool
+        bind = bind or 'default'
+        if hasattr(pool, 'checkedout'):
+            stats[(bind, 'checked_out')] = pool.checkedout()
+            stats[(bind, 'idle')] = pool.checkedin()
+            stats[(bind, 'overflow')] = max(pool.overflow(), 0)
+            stats[(bind, 'size')] = pool.size()
+    return stats
+
+
+metrics = Metrics()
@@ -0,0 +1,396 @@
+import atexit
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_sql(statement):
+    """شكل الاستعلام: بدون قيم حرفية، وقوائم IN مطوية، ومسافات موحدة"""
+    shape = _STRING.sub('?', statement)
+    shape = _NUMBER.sub('?', shape)
+    shape = _IN_LIST.sub('(?, ...)', shape)
+    return _SPACES.sub(' ', shape).strip()
+
+
+class RequestProfile:
+    """إحصاءات SQL لطلب واحد"""
+
+    __slots__ = ('method', 'path', 'endpoint', 'started', 'query_count', 'sql_time', 'statements')
+
+    def __init__(self, method, path, endpoint):
+        self.method = method
+        self.path = path
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.sql_time = 0.0
+        self.statements = {}  # statement -> [count, total_seconds]
+
+    def record(self, statement, elapsed):
+        self.query_count += 1
+        self.sql_time += elapsed
+        entry = self.statements.get(statement)
+        if entry is None:
+            self.statements[statement] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def summary(self, duration, status, top, n_plus_one_threshold):
+        # التجميع حسب الشكل يتم هنا فقط، بعيداً عن مسار التنفيذ
+        shapes = {}
+        for statement, (count, total) in self.statements.items():
+            shape = normalize_sql(statement)
+            entry = shapes.setdefault(shape, [0, 0.0])
+            entry[0] += count
+            entry[1] += total
+
+        ranked = sorted(shapes.items(), key=lambda item: item[1][1], reverse=True)
+        return {
+            'method': self.method,
+            'path': self.path,
+            'endpoint': self.endpoint,
+            'status': status,
+            'duration_ms': round(duration * 1000, 3),
+            'sql_time_ms': round(self.sql_time * 1000, 3),
+            'query_count': self.query_count,
+            'top_statements': [
+                {'sql': shape, 'count': count, 'total_ms': round(total * 1000, 3)}
+                for shape, (count, total) in ranked[:top]
+            ],
+            'n_plus_one_suspects': [
+                {'sql': shape, 'count': count}
+                for shape, (count, total) in ranked
+                if count >= n_plus_one_threshold
+            ],
+            'recorded_at': time.time()
+        }
+
+
+_current = ContextVar('request_profile', default=None)
+
+
+class SqlProfiler:
+    """مُحلل SQL لكل طلب مع ترويسة Server-Timing
+
+    يحتفظ بأبطأ الطلبات في مخزن محدود الحجم. عند التعطيل تُزال مستمعات
+    المحرك فلا تبقى أي كلفة على تنفيذ الاستعلامات.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._slowest = []  # كومة صغرى بحجم محدود: (duration, seq, summary)
+        self._sequence = itertools.count()
+        self.capacity = 50
+        self.top = 5
+        self.n_plus_one_threshold = 5
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PERF_PROFILER_ENABLED', True)
+        app.config.setdefault('PERF_SLOWEST_REQUESTS', 50)
+        app.config.setdefault('PERF_TOP_STATEMENTS', 5)
+        app.config.setdefault('PERF_N_PLUS_ONE_THRESHOLD', 5)
+        self.capacity = app.config['PERF_SLOWEST_REQUESTS']
+        self.top = app.config['PERF_TOP_STATEMENTS']
+        self.n_plus_one_threshold = app.config['PERF_N_PLUS_ONE_THRESHOLD']
+        app.extensions['sql_profiler'] = self
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+        if app.config['PERF_PROFILER_ENABLED']:
+            self.enable()
+
+    def enable(self):
+        self.enabled = True
+        _sync_listeners()
+
+    def disable(self):
+        self.enabled = False
+        _sync_listeners()
+
+    def _before_request(self):
+        if self.enabled:
+            _current.set(RequestProfile(request.method, request.path, request.endpoint))
+
+    def _after_request(self, response):
+        profile = _current.get()
+        if profile is None:
+            return response
+
+        duration = time.perf_counter() - profile.started
+        profile.endpoint = request.endpoint  # المخططات الكسولة تحدد المسار أثناء التنفيذ
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={profile.sql_time * 1000:.2f};desc="{profile.query_count} queries", '
+            f'app;dur={duration * 1000:.2f}'
+        )
+        self._remember(profile, duration, response.status_code)
+        return response
+
+    def _teardown_request(self, exc):
+        _current.set(None)
+
+    def _remember(self, profile, duration, status):
+        with self._lock:
+            if len(self._slowest) >= self.capacity and duration <= self._slowest[0][0]:
+                return
+        summary = profile.summary(duration, status, self.top, self.n_plus_one_threshold)
+        entry = (duration, next(self._sequence), summary)
+        with self._lock:
+            if len(self._slowest) < self.capacity:
+                heapq.heappush(self._slowest, entry)
+            elif duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def slowest(self, limit=None):
+        """أبطأ الطلبات المسجلة مرتبة تنازلياً"""
+        with self._lock:
+            entries = sorted(self._slowest, reverse=True)
+        return [summary for _, _, summary in entries[:limit]]
+
+    def reset(self):
+        with self._lock:
+            self._slowest = []
+
+
+class SlowQueryStats:
+    """إحصاءات بصمة استعلام بطيء واحدة"""
+
+    def __init__(self, fingerprint, sql, param_types, route, plan, sample_size):
+        self.fingerprint = fingerprint
+        self.sql = sql
+        self.param_types = param_types
+        self.routes = {route: 1}
+        self.plan = plan
+        self.count = 1
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=sample_size)
+        self.first_seen = datetime.utcnow()
+        self.last_seen = self.first_seen
+
+    def add(self, elapsed, route):
+        self.count += 1
+        self.routes[route] = self.routes.get(route, 0) + 1
+        self._time(elapsed)
+
+    def _time(self, elapsed):
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.samples.append(elapsed)
+        self.last_seen = datetime.utcnow()
+
+    def to_dict(self):
+        samples = sorted(self.samples)
+        return {
+            'fingerprint': self.fingerprint,
+            'sql': self.sql,
+            'param_types': self.param_types,
+            'routes': self.routes,
+            'count': self.count,
+            'total_ms': round(self.total * 1000, 3),
+            'p50_ms': round(_percentile(samples, 0.50) * 1000, 3),
+            'p95_ms': round(_percentile(samples, 0.95) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+            'query_plan': self.plan,
+            'first_seen': self.first_seen.isoformat(),
+            'last_seen': self.last_seen.isoformat()
+        }
+
+
+def _percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(round(fraction * (len(samples) - 1))))]
+
+
+class SlowQueryLog:
+    """سجل الاستعلامات البطيئة مجمعة حسب البصمة مع خطة التنفيذ
+
+    تُلتقط خطة EXPLAIN QUERY PLAN مرة واحدة عند أول ظهور للبصمة، على
+    الاتصال نفسه وبالمعاملات نفسها، فلا كلفة إضافية إلا على المسار البطيء.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.threshold = 0.1
+        self.max_fingerprints = 500
+        self.sample_size = 512
+        self.dump_path = None
+        self._entries = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SLOW_QUERY_LOG_ENABLED', True)
+        app.config.setdefault('SLOW_QUERY_THRESHOLD_MS', 100)
+        app.config.setdefault('SLOW_QUERY_MAX_FINGERPRINTS', 500)
+        app.config.setdefault('SLOW_QUERY_SAMPLES', 512)
+        app.config.setdefault('SLOW_QUERY_DUMP_PATH', None)  # يقبل {pid}
+        self.threshold = app.config['SLOW_QUERY_THRESHOLD_MS'] / 1000
+        self.max_fingerprints = app.config['SLOW_QUERY_MAX_FINGERPRINTS']
+        self.sample_size = app.config['SLOW_QUERY_SAMPLES']
+        self.dump_path = app.config['SLOW_QUERY_DUMP_PATH']
+        app.extensions['slow_query_log'] = self
+
+        if self.dump_path:
+            atexit.register(self._dump_at_exit)
+        if app.config['SLOW_QUERY_LOG_ENABLED']:
+            self.enable()
+
+    def enable(self):
+        self.enabled = True
+        _sync_listeners()
+
+    def disable(self):
+        self.enabled = False
+        _sync_listeners()
+
+    def record(self, conn, statement, parameters, elapsed, executemany):
+        sql = normalize_sql(statement)
+        fingerprint = hashlib.sha1(sql.encode()).hexdigest()[:16]
+        route = request.endpoint if has_request_context() else threading.current_thread().name
+
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is not None:
+                entry.add(elapsed, route)
+                return
+            if len(self._entries) >= self.max_fingerprints:
+                return
+
+        sample = parameters[0] if executemany and parameters else parameters
+        plan = None if executemany else _explain(conn, statement, parameters)
+        entry = SlowQueryStats(fingerprint, sql, _param_types(sample), route, plan, self.sample_size)
+        entry._time(elapsed)
+        with self._lock:
+            existing = self._entries.setdefault(fingerprint, entry)
+            if existing is not entry:
+                existing.add(elapsed, route)
+
+    def entries(self, order_by='total_ms'):
+        with self._lock:
+            entries = [entry.to_dict() for entry in self._entries.values()]
+        return sorted(entries, key=lambda entry: entry[order_by], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._entries = {}
+
+    def dump(self, path):
+        """كتابة السجل إلى ملف JSON لمقارنة الخطط بين الإصدارات"""
+        path = path.format(pid=os.getpid())
+        payload = {
+            'generated_at': datetime.utcnow().isoformat(),
+            'pid': os.getpid(),
+            'sqlite_version': sqlite3.sqlite_version,
+            'threshold_ms': self.threshold * 1000,
+            'queries': self.entries()
+        }
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as handle:
+            json.dump(payload, handle, ensure_ascii=False, indent=2)
+        return path
+
+    def dump_snapshot(self):
+        """نسخة من السجل بجوار SLOW_QUERY_DUMP_PATH باسم يولده الخادم
+
+        مسار الطلب لا يحدد الملف أبداً: الكتابة فقط في مجلد الإعداد.
+        """
+        if not self.dump_path:
+            return None
+        directory = os.path.dirname(os.path.abspath(self.dump_path.format(pid=os.getpid())))
+        name = f"slow-queries-{os.getpid()}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}.json"
+        return self.dump(os.path.join(directory, name))
+
+    def _dump_at_exit(self):
+        if self._entries:
+            self.dump(self.dump_path)
+
+
+def _param_types(parameters):
+    if parameters is None:
+        return []
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    return [type(value).__name__ for value in parameters]
+
+
+def _explain(conn, statement, parameters):
+    if statement.lstrip()[:6].upper() not in ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT'):
+        return None
+    if conn.dialect.name != 'sqlite':
+        return None
+    try:
+        # مؤشر مستقل حتى لا تتأثر نتائج الاستعلام الأصلي
+        cursor = conn.connection.driver_connection.cursor()
+        try:
+            rows = cursor.execute(f'EXPLAIN QUERY PLAN {statement}', parameters or ()).fetchall()
+        finally:
+            cursor.close()
+    except Exception as e:
+        return [f'تعذر الحصول على الخطة: {e}']
+
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node_id] + detail)
+    return lines
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start_time')
+    if not starts:
+        return  # فُعّلت المراقبة أثناء تنفيذ هذا الاستعلام
+    elapsed = time.perf_counter() - starts.pop()
+    profile = _current.get()
+    if profile is not None:
+        profile.record(statement, elapsed)
+    if elapsed >= slow_query_log.threshold and slow_query_log.enabled:
+        slow_query_log.record(conn, statement, parameters, elapsed, executemany)
+
+
+def _sync_listeners():
+    # المستمعات مثبتة فقط ما دام أحد المراقبَين مفعلاً
+    wanted = profiler.enabled or slow_query_log.enabled
+    installed = event.contains(Engine, 'after_cursor_execute', _after_cursor_execute)
+    if wanted and not installed:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    elif installed and not wanted:
+        event.remove(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.remove(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+profiler = SqlProfiler()
+slow_query_log = SlowQueryLog()
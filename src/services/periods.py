@@ -0,0 +1,221 @@
+import hashlib
+import json
+import threading
+import time
+from datetime import date
+
+from flask import Response, current_app, request
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import OperationalError
+
+from src.models.user import db
+from src.models.period import ClosedPeriod, PeriodSnapshot
+from src.models.sales import Commission, Employee, Project, Target
+from src.services import archive
+from src.services.serializers import serializer
+
+
+class PeriodError(Exception):
+    """تعذر إغلاق الشهر أو إعادة فتحه"""
+
+
+def _month_range(year, month):
+    start = date(year, month, 1)
+    return start, date(year + month // 12, month % 12 + 1, 1)
+
+
+def _commissions(year, month):
+    query, entity = archive.query(Commission, year)
+    commissions = serializer(Commission, 'list')
+    rows = query.outerjoin(Employee, Employee.id == entity.employee_id).with_entities(
+        *commissions.columns(entity, employee=Employee)
+    ).filter(entity.month == month, entity.year == year).order_by(entity.id).all()
+    return commissions.rows(rows)
+
+
+def _targets(year, month):
+    query, entity = archive.query(Target, year)
+    targets = serializer(Target, 'list')
+    rows = query.outerjoin(Employee, Employee.id == entity.employee_id).with_entities(
+        *targets.columns(entity, employee=Employee)
+    ).filter(entity.month == month, entity.year == year).order_by(entity.id).all()
+    return targets.rows(rows)
+
+
+def _projects(year, month):
+    # المشاريع بتكلفة التسويق الموزعة عليها والعمولة بعد خصمها
+    query, entity = archive.query(Project, year)
+    start, end = _month_range(year, month)
+    projects = serializer(Project, 'list')
+    rows = query.outerjoin(Employee, Employee.id == entity.employee_id).with_entities(
+        *projects.columns(entity, employee=Employee)
+    ).filter(entity.signature_date >= start, entity.signature_date < end).order_by(
+        entity.signature_date.desc(), entity.id.desc()
+    ).all()
+    return projects.rows(rows)
+
+
+# أنواع اللقطة بترتيب حفظها؛ كل نوع يطابق صفوف واجهة القراءة المقابلة
+SNAPSHOT_KINDS = {
+    'commissions': _commissions,
+    'targets': _targets,
+    'projects': _projects,
+}
+
+
+def _digest(rows):
+    digest = hashlib.sha256()
+    for kind, payload in rows:
+        digest.update(f'{kind}\n{payload}\n'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class PeriodClose:
+    """إغلاق الأشهر المحسوبة في لقطات ثابتة
+
+    عند الإغلاق تُحفظ صفوف العمولات والأهداف والمشاريع بتوزيع التسويق كما
+    تعيدها واجهات القراءة، مرمّزة JSON مسبقاً، مع SHA-256 لمحتواها. قراءة
+    شهر مغلق تجمع هذه النصوص كما هي دون أي تجميع، ويُرفض كل ما يعيد حساب
+    الشهر أو يعدل بياناته حتى يُعاد فتحه.
+
+    فهرس الأشهر المغلقة للقراءة نسخة في العملية تُحدّث كل PERIODS_CATALOG_TTL
+    ثانية؛ أما رفض التعديل فيتحقق من القاعدة ضمن معاملة الكتابة نفسها.
+    """
+
+    def __init__(self, app=None):
+        self.ttl = 5.0
+        self._periods = {}  # (year, month) -> (period_id, checksum)
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PERIODS_CATALOG_TTL', 5.0)
+        self.ttl = app.config['PERIODS_CATALOG_TTL']
+        app.extensions['period_close'] = self
+
+    # ===== فهرس الأشهر المغلقة =====
+
+    def _catalog(self):
+        if time.monotonic() - self._loaded_at >= self.ttl:
+            with self._lock:
+                if time.monotonic() - self._loaded_at >= self.ttl:
+                    try:
+                        rows = db.session.execute(select(
+                            ClosedPeriod.year, ClosedPeriod.month, ClosedPeriod.id, ClosedPeriod.checksum
+                        )).all()
+                    except OperationalError:
+                        rows = []  # قاعدة بيانات لم يُنشأ فيها الجدول بعد
+                    self._periods = {(year, month): (period_id, checksum) for year, month, period_id, checksum in rows}
+                    self._loaded_at = time.monotonic()
+        return self._periods
+
+    def invalidate(self):
+        self._loaded_at = 0.0
+
+    def is_closed(self, year, month):
+        """تحقق من القاعدة مباشرة (للتعديل): هل الشهر مغلق"""
+        try:
+            year, month = int(year), int(month)
+        except (TypeError, ValueError):
+            return False
+        return db.session.execute(
+            select(ClosedPeriod.id).where(ClosedPeriod.year == year, ClosedPeriod.month == month)
+        ).first() is not None
+
+    def periods(self):
+        return ClosedPeriod.query.order_by(ClosedPeriod.year.desc(), ClosedPeriod.month.desc()).all()
+
+    # ===== الإغلاق وإعادة الفتح =====
+
+    def close(self, year, month, closed_by=None):
+        """حفظ لقطة الشهر وإغلاقه في معاملة واحدة"""
+        if self.is_closed(year, month):
+            raise PeriodError(f'الشهر {month}/{year} مغلق مسبقاً')
+
+        period = ClosedPeriod(year=year, month=month, checksum='', closed_by=closed_by)
+        db.session.add(period)
+        db.session.flush()
+
+        dumps = current_app.json.dumps
+        rows, counts = [], {}
+        for kind, loader in SNAPSHOT_KINDS.items():
+            items = loader(year, month)
+            counts[kind] = len(items)
+            for item in items:
+                rows.append({
+                    'period_id': period.id, 'kind': kind,
+                    'employee_id': item.get('employee_id'), 'payload': dumps(item)
+                })
+        if rows:
+            db.session.execute(insert(PeriodSnapshot), rows)
+
+        period.checksum = _digest((row['kind'], row['payload']) for row in rows)
+        period.row_counts = json.dumps(counts)
+        db.session.commit()
+        self.invalidate()
+        return period.to_dict()
+
+    def reopen(self, year, month):
+        """حذف لقطة الشهر وإعادته للبيانات الحية"""
+        period = ClosedPeriod.query.filter_by(year=year, month=month).first()
+        if period is None:
+            raise PeriodError(f'الشهر {month}/{year} غير مغلق')
+        result = period.to_dict()
+        db.session.execute(delete(PeriodSnapshot).where(PeriodSnapshot.period_id == period.id))
+        db.session.delete(period)
+        db.session.commit()
+        self.invalidate()
+        return result
+
+    def verify(self, year, month):
+        """إعادة حساب checksum من صفوف اللقطة المحفوظة ومقارنته بالمسجل"""
+        period = ClosedPeriod.query.filter_by(year=year, month=month).first()
+        if period is None:
+            raise PeriodError(f'الشهر {month}/{year} غير مغلق')
+        rows = db.session.execute(
+            select(PeriodSnapshot.kind, PeriodSnapshot.payload)
+            .where(PeriodSnapshot.period_id == period.id).order_by(PeriodSnapshot.id)
+        ).all()
+        computed = _digest(rows)
+        return {**period.to_dict(), 'computed_checksum': computed, 'valid': computed == period.checksum}
+
+    # ===== القراءة =====
+
+    def snapshot_response(self, year, month, kind, employee_id=None):
+        """استجابة JSON من لقطة الشهر إن كان مغلقاً، وإلا None"""
+        try:
+            key = (int(year), int(month))
+            employee_id = int(employee_id) if employee_id else None
+        except (TypeError, ValueError):
+            return None
+        entry = self._catalog().get(key)
+        if entry is None:
+            return None
+
+        period_id, checksum = entry
+        etag = f"{checksum[:20]}-{kind}-{employee_id or 'all'}"
+        if etag in request.if_none_match or f'{etag}-gz' in request.if_none_match:
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        statement = select(PeriodSnapshot.payload).where(
+            PeriodSnapshot.period_id == period_id, PeriodSnapshot.kind == kind
+        )
+        if employee_id is not None:
+            statement = statement.where(PeriodSnapshot.employee_id == employee_id)
+        payloads = db.session.execute(statement.order_by(PeriodSnapshot.id)).scalars().all()
+        if not payloads and db.session.get(ClosedPeriod, period_id) is None:
+            # أُعيد فتح الشهر في عملية أخرى بعد آخر تحديث للفهرس
+            self.invalidate()
+            return None
+
+        response = Response(f"[{','.join(payloads)}]", mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['X-Period-Checksum'] = checksum
+        return response
+
+
+period_close = PeriodClose()
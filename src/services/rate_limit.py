@@ -0,0 +1,155 @@
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify, request
+
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600}
+
+
+def parse_rate(spec):
+    """'10/minute' أو '10/60' -> (سعة الدلو، رموز في الثانية)"""
+    count, _, period = spec.partition('/')
+    seconds = _PERIODS.get(period.strip()) or float(period)
+    count = int(count)
+    return count, count / seconds
+
+
+class _Shard:
+    __slots__ = ('lock', 'buckets', 'allowed', 'rejected')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}  # key -> [tokens, updated_at, capacity, rate]
+        self.allowed = {}
+        self.rejected = {}
+
+
+class RateLimiter:
+    """محدد معدل بدلو رموز في الذاكرة لكل مفتاح (عنوان IP أو اسم مستخدم)
+
+    المفاتيح موزعة على أجزاء لكل منها قفله، فلا تتنافس الطلبات المتزامنة
+    إلا إذا وقعت في الجزء نفسه. الرفض يحدث قبل أي عمل على قاعدة البيانات
+    أو حساب تجزئة كلمة المرور. الحدود لكل عملية عاملة على حدة.
+    """
+
+    def __init__(self, app=None, shards=64):
+        self._shards = [_Shard() for _ in range(shards)]
+        self.rules = {}
+        self.enabled = True
+        self.max_keys_per_shard = max(1, 65536 // shards)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RATELIMIT_ENABLED', True)
+        app.config.setdefault('RATELIMIT_LOGIN_PER_IP', '20/minute')
+        app.config.setdefault('RATELIMIT_LOGIN_PER_USER', '5/minute')
+        app.config.setdefault('RATELIMIT_INIT_ADMIN_PER_IP', '3/minute')
+        app.config.setdefault('RATELIMIT_MAX_KEYS', 65536)
+        self.enabled = app.config['RATELIMIT_ENABLED']
+        self.max_keys_per_shard = max(1, app.config['RATELIMIT_MAX_KEYS'] // len(self._shards))
+        self.rules = {
+            'login': (
+                ('ip', *parse_rate(app.config['RATELIMIT_LOGIN_PER_IP'])),
+                ('username', *parse_rate(app.config['RATELIMIT_LOGIN_PER_USER'])),
+            ),
+            'init_admin': (
+                ('ip', *parse_rate(app.config['RATELIMIT_INIT_ADMIN_PER_IP'])),
+            ),
+        }
+        app.extensions['rate_limiter'] = self
+
+    def hit(self, key, capacity, rate, counter):
+        """استهلاك رمز واحد؛ يعيد 0 عند القبول أو ثواني الانتظار عند الرفض"""
+        shard = self._shards[hash(key) % len(self._shards)]
+        now = time.monotonic()
+        with shard.lock:
+            bucket = shard.buckets.get(key)
+            if bucket is None:
+                if len(shard.buckets) >= self.max_keys_per_shard:
+                    self._evict(shard, now)
+                bucket = shard.buckets[key] = [float(capacity), now, capacity, rate]
+            else:
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                shard.allowed[counter] = shard.allowed.get(counter, 0) + 1
+                return 0
+            shard.rejected[counter] = shard.rejected.get(counter, 0) + 1
+            return (1 - bucket[0]) / rate
+
+    def _evict(self, shard, now):
+        # كل دلو يُقيَّم بسعة قاعدته ومعدلها: الجزء الواحد يجمع مفاتيح كل القواعد.
+        # الدلو الممتلئ مجدداً يساوي دلواً غير موجود؛ ثم الأقدم الذي لا يرفض الآن.
+        # دلو يرفض لا يُحذف وإن تجاوز الجزء حده مؤقتاً: حذفه يعيد المحاولات لمن رُفض
+        levels = {key: min(capacity, tokens + (now - updated) * rate)
+                  for key, (tokens, updated, capacity, rate) in shard.buckets.items()}
+        for key, level in levels.items():
+            if level >= shard.buckets[key][2]:
+                del shard.buckets[key]
+        if len(shard.buckets) >= self.max_keys_per_shard:
+            for key in shard.buckets:
+                if levels[key] >= 1:
+                    del shard.buckets[key]
+                    break
+
+    def _key_value(self, kind):
+        if kind == 'ip':
+            # خلف وكيل عكسي يجب ضبط TRUSTED_PROXY_COUNT وإلا تشارك كل العملاء دلواً واحداً
+            return request.remote_addr or 'unknown'
+        data = request.get_json(silent=True) or {}
+        username = data.get('username')
+        return str(username).strip().lower() if username else None
+
+    def check(self, rule):
+        """ثواني الانتظار إذا تجاوز الطلب أي حد في القاعدة، وإلا 0"""
+        for kind, capacity, rate in self.rules.get(rule, ()):
+            value = self._key_value(kind)
+            if value is None:
+                continue
+            wait = self.hit(f'{rule}:{kind}:{value}', capacity, rate, f'{rule}:{kind}')
+            if wait:
+                return wait
+        return 0
+
+    def limit(self, rule):
+        """ديكوريتر يرفض الطلب بـ 429 قبل تنفيذ المسار"""
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                if self.enabled:
+                    wait = self.check(rule)
+                    if wait:
+                        response = jsonify({'error': 'محاولات كثيرة، يرجى المحاولة لاحقاً'})
+                        response.headers['Retry-After'] = str(int(wait) + 1)
+                        return response, 429
+                return f(*args, **kwargs)
+            return decorated_function
+        return decorator
+
+    def counters(self):
+        """{rule:kind: {'allowed': n, 'rejected': n}} مجمعة من كل الأجزاء"""
+        totals = {}
+        for shard in self._shards:
+            with shard.lock:
+                for source, field in ((shard.allowed, 'allowed'), (shard.rejected, 'rejected')):
+                    for counter, value in source.items():
+                        entry = totals.setdefault(counter, {'allowed': 0, 'rejected': 0})
+                        entry[field] += value
+        return totals
+
+    def tracked_keys(self):
+        return sum(len(shard.buckets) for shard in self._shards)
+
+    def reset(self):
+        for shard in self._shards:
+            with shard.lock:
+                shard.buckets.clear()
+                shard.allowed.clear()
+                shard.rejected.clear()
+
+
+limiter = RateLimiter()
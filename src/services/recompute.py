@@ -0,0 +1,365 @@
+import logging
+from datetime import date, datetime
+
+from sqlalchemy import bindparam, case, event, func, inspect, select, update
+
+from src.models.user import db
+from src.models.sales import Commission, Employee, MarketingBudget, PerformanceScore, Project, Target
+from src.services.events import record_updates
+
+logger = logging.getLogger(__name__)
+
+SOCIAL_MEDIA_DISCOUNT = 0.005  # خصم نسبة العمولة لمشاريع السوشيال ميديا
+
+# الحقول التي تُحسب منها القيم المشتقة؛ تعديل غيرها لا يستدعي إعادة الحساب
+PROJECT_INPUTS = ('employee_id', 'project_value', 'signature_date', 'is_from_social_media')
+
+
+def _month_range(year, month):
+    start = date(year, month, 1)
+    return start, date(year + month // 12, month % 12 + 1, 1)
+
+
+class RecomputePlan:
+    """الخلايا (موظف، سنة، شهر) وأشهر السوشيال ميديا التي تمسها معاملة واحدة"""
+
+    def __init__(self):
+        self.cells = set()
+        self.priced = set()  # خلايا يُعاد تسعير مشاريعها: تغيرت مشاريعها أو مبلغ هدفها
+        self.social_months = set()
+
+    def __bool__(self):
+        return bool(self.cells or self.social_months)
+
+    def add_project(self, employee_id, signed, social):
+        if employee_id is None or signed is None:
+            return
+        cell = (employee_id, signed.year, signed.month)
+        self.cells.add(cell)
+        self.priced.add(cell)
+        if social:
+            self.social_months.add((signed.year, signed.month))
+
+    def to_dict(self):
+        return {
+            'cells': [list(cell) for cell in sorted(self.cells)],
+            'priced': [list(cell) for cell in sorted(self.priced)],
+            'social_months': [list(month) for month in sorted(self.social_months)]
+        }
+
+
+def _previous(state, key):
+    """القيمة قبل التعديل في هذه المعاملة (أو الحالية إن لم تتغير)"""
+    history = state.attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.object, key)
+
+
+class RecomputePlanner:
+    """إعادة حساب القيم المشتقة للخلايا التي غيّرتها المعاملة فقط
+
+    تعديل مشروع أو حذفه يسجل خلية الموظف في الشهر القديم والجديد، ومعها
+    شهر السوشيال ميديا إذا كان المشروع منه قبل التعديل أو بعده. تعديل مبلغ
+    هدف أو نقاط أداء موجودة يسجل خليته. تتجمع الخلايا في الجلسة وتُحسب مرة
+    واحدة قبل الالتزام بتحديثات جماعية ضمن المعاملة نفسها:
+
+    1. إعادة تسعير مشاريع الخلايا التي تغيرت مشاريعها أو أهدافها بترتيب
+       تاريخ التوقيع: نسبة كل مشروع من التحقيق قبله في الشهر كما عند
+       الإنشاء، فنقل مشروع أو تعديل قيمته يصحح شرائح ما بعده في الشهرين.
+    2. توزيع ميزانية كل شهر سوشيال ميديا على مشاريعه وعمولتها النهائية.
+    3. المحقق ونسبة التحقيق لأهداف الخلايا.
+    4. مجاميع سجلات العمولات الموجودة لتلك الخلايا.
+
+    المشاريع والأهداف والنقاط الجديدة لا تُسجل: مساراتها تحسبها بنفسها.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RECOMPUTE_ENABLED', True)
+        app.extensions['recompute_planner'] = self
+        if not app.config['RECOMPUTE_ENABLED']:
+            return
+        if not event.contains(db.session, 'after_flush', _record_flushed):
+            event.listen(db.session, 'after_flush', _record_flushed)
+            event.listen(db.session, 'before_commit', _execute_planned)
+            event.listen(db.session, 'after_rollback', _discard_planned)
+
+    # ===== التنفيذ =====
+
+    def execute(self, connection, plan):
+        """تنفيذ الخطة على اتصال المعاملة؛ يعيد ملخص ما أُعيد حسابه والصفوف التي تغيرت
+
+        الصفوف (الجدول، رقم الصف، الموظف، السنة، الشهر) تُسجل في change_events:
+        التحديثات هنا من Core فلا يراها مسجل الأحداث في flush الجلسة.
+        """
+        changes = []
+        if plan.priced:
+            self._price_cells(connection, plan.priced, changes)
+        priced = len(changes)
+
+        cells = set(plan.cells)
+        for year, month in sorted(plan.social_months):
+            cells.update(self._allocate_month(connection, year, month, changes))
+
+        by_month = {}
+        for employee_id, year, month in cells:
+            by_month.setdefault((year, month), set()).add(employee_id)
+
+        commissions = 0
+        for (year, month), employee_ids in sorted(by_month.items()):
+            self._recompute_targets(connection, year, month, employee_ids & {
+                cell[0] for cell in plan.cells if cell[1:] == (year, month)
+            }, changes)
+            commissions += self._recompute_commissions(connection, year, month, employee_ids, changes)
+
+        return {
+            'cells': len(cells),
+            'social_months': len(plan.social_months),
+            'projects': priced,
+            'commissions': commissions
+        }, changes
+
+    def _price_cells(self, connection, cells, changes):
+        """نسب مشاريع الخلايا من مجموع الشهر قبل كل مشروع بترتيب التوقيع"""
+        from src.routes.sales import get_commission_rate
+
+        projects, targets = Project.__table__, Target.__table__
+        roles = dict(connection.execute(
+            select(Employee.id, Employee.role).where(Employee.id.in_({cell[0] for cell in cells}))
+        ).all())
+
+        params = []
+        for employee_id, year, month in sorted(cells):
+            start, end = _month_range(year, month)
+            target = connection.execute(
+                select(targets.c.target_amount)
+                .where(targets.c.employee_id == employee_id, targets.c.year == year, targets.c.month == month)
+            ).scalar()
+            rows = connection.execute(
+                select(projects.c.id, projects.c.project_value, projects.c.is_from_social_media,
+                       projects.c.commission_rate, projects.c.final_commission,
+                       projects.c.marketing_cost_allocated)
+                .where(projects.c.employee_id == employee_id,
+                       projects.c.signature_date >= start, projects.c.signature_date < end)
+                .order_by(projects.c.signature_date, projects.c.id)
+            ).all()
+
+            total = 0.0
+            for project_id, value, social, old_rate, old_final, old_allocated in rows:
+                value = value or 0.0
+                rate = get_commission_rate(roles.get(employee_id), total / target if target else 0.0)
+                total += value
+                # حصة التسويق يعيدها توزيع الشهر؛ من خرج من السوشيال ميديا لا حصة له
+                allocated = old_allocated if social or not old_allocated else 0.0
+                final = value * rate
+                if social:
+                    rate -= SOCIAL_MEDIA_DISCOUNT
+                    final = max(0, value * rate - (allocated or 0.0))
+                if (rate, final, allocated) != (old_rate, old_final, old_allocated):
+                    params.append({'p_id': project_id, 'p_rate': rate, 'p_final': final, 'p_allocated': allocated})
+                    changes.append(('projects', project_id, employee_id, year, month))
+
+        if params:
+            connection.execute(
+                update(projects).where(projects.c.id == bindparam('p_id')).values(
+                    commission_rate=bindparam('p_rate'),
+                    final_commission=bindparam('p_final'),
+                    marketing_cost_allocated=bindparam('p_allocated'),
+                    updated_at=datetime.utcnow()
+                ),
+                params
+            )
+
+    def _allocate_month(self, connection, year, month, changes):
+        """توزيع ميزانية التسويق على مشاريع السوشيال ميديا في الشهر حسب قيمتها"""
+        projects = Project.__table__
+        start, end = _month_range(year, month)
+
+        rows = connection.execute(
+            select(projects.c.id, projects.c.employee_id, projects.c.project_value, projects.c.commission_rate,
+                   projects.c.final_commission, projects.c.marketing_cost_allocated)
+            .where(projects.c.signature_date >= start, projects.c.signature_date < end,
+                   projects.c.is_from_social_media == True)
+        ).all()
+        total = sum(row.project_value or 0.0 for row in rows)
+        # الميزانية من معاملة الكتابة نفسها: ذاكرة المرجع قد تتأخر حتى REFERENCE_CACHE_TTL
+        budget = connection.execute(
+            select(MarketingBudget.total_budget).where(MarketingBudget.year == year, MarketingBudget.month == month)
+        ).scalar()
+        factor = budget / total if budget and total else 0.0
+
+        params = []
+        for project_id, employee_id, value, rate, old_final, old_allocated in rows:
+            allocated = (value or 0.0) * factor
+            final = old_final if rate is None else max(0, (value or 0.0) * rate - allocated)
+            if (allocated, final) != (old_allocated, old_final):
+                params.append({'p_id': project_id, 'p_allocated': allocated, 'p_final': final})
+                changes.append(('projects', project_id, employee_id, year, month))
+        if params:
+            connection.execute(
+                update(projects).where(projects.c.id == bindparam('p_id')).values(
+                    marketing_cost_allocated=bindparam('p_allocated'),
+                    final_commission=bindparam('p_final'),
+                    updated_at=datetime.utcnow()
+                ),
+                params
+            )
+        # تغير التوزيع يغير العمولة النهائية لكل موظف له مشروع سوشيال في الشهر
+        return {(employee_id, year, month) for _, employee_id, *_ in rows}
+
+    def _recompute_targets(self, connection, year, month, employee_ids, changes):
+        """المحقق ونسبة التحقيق لأهداف الموظفين في الشهر من مجموع مشاريعهم"""
+        if not employee_ids:
+            return
+        projects, targets = Project.__table__, Target.__table__
+        start, end = _month_range(year, month)
+
+        totals = dict(connection.execute(
+            select(projects.c.employee_id, func.sum(projects.c.project_value))
+            .where(projects.c.employee_id.in_(employee_ids),
+                   projects.c.signature_date >= start, projects.c.signature_date < end)
+            .group_by(projects.c.employee_id)
+        ).all())
+        existing = dict(connection.execute(
+            select(targets.c.employee_id, targets.c.id)
+            .where(targets.c.employee_id.in_(employee_ids), targets.c.year == year, targets.c.month == month)
+        ).all())
+        if not existing:
+            return
+
+        total = bindparam('p_total')
+        connection.execute(
+            update(targets).where(
+                targets.c.employee_id == bindparam('p_employee'),
+                targets.c.year == year, targets.c.month == month
+            ).values(
+                achieved_amount=total,
+                achievement_percentage=case((targets.c.target_amount > 0, total / targets.c.target_amount),
+                                            else_=0.0),
+                updated_at=datetime.utcnow()
+            ),
+            [{'p_employee': employee_id, 'p_total': totals.get(employee_id) or 0.0} for employee_id in existing]
+        )
+        changes.extend(('targets', target_id, employee_id, year, month) for employee_id, target_id in existing.items())
+
+    def _recompute_commissions(self, connection, year, month, employee_ids, changes):
+        """تحديث سجلات العمولات الموجودة فقط؛ إنشاؤها يبقى لمسار حساب العمولات"""
+        projects, scores, commissions = Project.__table__, PerformanceScore.__table__, Commission.__table__
+        start, end = _month_range(year, month)
+
+        existing = dict(connection.execute(
+            select(commissions.c.employee_id, commissions.c.id).where(
+                commissions.c.employee_id.in_(employee_ids),
+                commissions.c.year == year, commissions.c.month == month
+            )
+        ).all())
+        if not existing:
+            return 0
+
+        sums = {row[0]: row[1:] for row in connection.execute(
+            select(projects.c.employee_id, func.sum(projects.c.final_commission),
+                   func.sum(projects.c.marketing_cost_allocated))
+            .where(projects.c.employee_id.in_(list(existing)),
+                   projects.c.signature_date >= start, projects.c.signature_date < end)
+            .group_by(projects.c.employee_id)
+        )}
+        weighted = dict(connection.execute(
+            select(scores.c.employee_id, func.sum(scores.c.weighted_score))
+            .where(scores.c.employee_id.in_(list(existing)), scores.c.year == year, scores.c.month == month)
+            .group_by(scores.c.employee_id)
+        ).all())
+        salaries = dict(connection.execute(
+            select(Employee.id, Employee.base_salary).where(Employee.id.in_(list(existing)))
+        ).all())
+
+        params = []
+        for employee_id in existing:
+            base, deduction = sums.get(employee_id, (0.0, 0.0))
+            bonus = (weighted.get(employee_id) or 0.0) * 1000  # 1000 ريال لكل نقطة أداء
+            final = (base or 0.0) + bonus
+            params.append({
+                'p_employee': employee_id, 'p_base': base or 0.0, 'p_deduction': deduction or 0.0,
+                'p_bonus': bonus, 'p_final': final, 'p_total': (salaries.get(employee_id) or 0.0) + final
+            })
+        connection.execute(
+            update(commissions).where(
+                commissions.c.employee_id == bindparam('p_employee'),
+                commissions.c.year == year, commissions.c.month == month
+            ).values(
+                base_commission=bindparam('p_base'),
+                marketing_deduction=bindparam('p_deduction'),
+                performance_bonus=bindparam('p_bonus'),
+                final_commission=bindparam('p_final'),
+                total_salary=bindparam('p_total'),
+                updated_at=datetime.utcnow()
+            ),
+            params
+        )
+        changes.extend(
+            ('commissions', commission_id, employee_id, year, month) for employee_id, commission_id in existing.items()
+        )
+        return len(params)
+
+
+recompute_planner = RecomputePlanner()
+
+
+def _record_flushed(session, flush_context):
+    """تسجيل الخلايا التي تمسها التعديلات المرسلة في هذا flush"""
+    if session.info.get('recompute_running'):
+        return
+    plan = session.info.get('recompute_plan') or RecomputePlan()
+
+    for obj in session.dirty:
+        if isinstance(obj, Project):
+            state = inspect(obj)
+            if not any(state.attrs[key].history.has_changes() for key in PROJECT_INPUTS):
+                continue
+            # الشهر القديم والجديد كلاهما يتأثر عند نقل المشروع
+            was_social = _previous(state, 'is_from_social_media')
+            plan.add_project(_previous(state, 'employee_id'), _previous(state, 'signature_date'), was_social)
+            plan.add_project(obj.employee_id, obj.signature_date, obj.is_from_social_media)
+        elif isinstance(obj, Target):
+            if inspect(obj).attrs.target_amount.history.has_changes():
+                # مبلغ الهدف يغير نسبة التحقيق قبل كل مشروع وبالتالي شرائحها
+                plan.cells.add((obj.employee_id, obj.year, obj.month))
+                plan.priced.add((obj.employee_id, obj.year, obj.month))
+        elif isinstance(obj, PerformanceScore):
+            if inspect(obj).attrs.weighted_score.history.has_changes():
+                plan.cells.add((obj.employee_id, obj.year, obj.month))
+
+    for obj in session.deleted:
+        if isinstance(obj, Project):
+            state = inspect(obj)
+            plan.add_project(_previous(state, 'employee_id'), _previous(state, 'signature_date'),
+                             _previous(state, 'is_from_social_media'))
+        elif isinstance(obj, PerformanceScore):
+            plan.cells.add((obj.employee_id, obj.year, obj.month))
+
+    if plan:
+        session.info['recompute_plan'] = plan
+
+
+def _execute_planned(session):
+    if session.info.get('recompute_running'):
+        return
+    session.flush()  # before_commit يسبق flush الالتزام: نرسل المعلق ليُسجل أولاً
+    plan = session.info.pop('recompute_plan', None)
+    if not plan:
+        return
+    session.info['recompute_running'] = True
+    try:
+        result, changes = recompute_planner.execute(session.connection(), plan)
+        record_updates(session, changes)
+        session.info['recomputed'] = {**result, 'touched': plan.to_dict()}
+        logger.debug('إعادة حساب: %s', session.info['recomputed'])
+    finally:
+        session.info.pop('recompute_running', None)
+
+
+def _discard_planned(session):
+    session.info.pop('recompute_plan', None)
@@ -0,0 +1,212 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+from contextlib import nullcontext
+from datetime import datetime
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
+
+from src.models.user import db
+from src.models.reference import ReferenceVersion
+from src.models.sales import Team, MarketingBudget, PerformanceKPI
+from src.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+KpiRef = namedtuple('KpiRef', 'id name weight max_score is_active')
+TeamRef = namedtuple('TeamRef', 'id name leader_id')
+BudgetRef = namedtuple('BudgetRef', 'id year month total_budget remaining_budget')
+
+# الجدول -> اسم مجموعة البيانات في reference_versions
+TRACKED_TABLES = {
+    PerformanceKPI.__tablename__: 'kpis',
+    Team.__tablename__: 'teams',
+    MarketingBudget.__tablename__: 'budgets',
+}
+
+
+def _load_kpis(connection):
+    rows = connection.execute(select(
+        PerformanceKPI.id, PerformanceKPI.name, PerformanceKPI.weight,
+        PerformanceKPI.max_score, PerformanceKPI.is_active
+    ))
+    return {row.id: KpiRef(*row) for row in rows}
+
+
+def _load_teams(connection):
+    rows = connection.execute(select(Team.id, Team.name, Team.leader_id))
+    return {row.id: TeamRef(*row) for row in rows}
+
+
+def _load_budgets(connection):
+    rows = connection.execute(select(
+        MarketingBudget.id, MarketingBudget.year, MarketingBudget.month,
+        MarketingBudget.total_budget, MarketingBudget.remaining_budget
+    ))
+    return {(row.year, row.month): BudgetRef(*row) for row in rows}
+
+
+LOADERS = {
+    'kpis': _load_kpis,
+    'teams': _load_teams,
+    'budgets': _load_budgets,
+}
+
+
+class ReferenceCache:
+    """ذاكرة مشتركة في العملية لجداول المرجع قليلة التغيير
+
+    كل تعديل على هذه الجداول يزيد رقم إصدارها في reference_versions ضمن
+    معاملة التعديل نفسها. العملية التي عدلت تُسقط نسختها فور الالتزام،
+    والعمليات الأخرى تقارن الإصدارات باستعلام صغير واحد كل
+    REFERENCE_CACHE_TTL ثانية على الأكثر. القراءة تتم عبر اتصال مستقل
+    فلا تدخل الذاكرة أي تعديلات غير ملتزم بها.
+    """
+
+    def __init__(self, app=None):
+        self.ttl = 2.0
+        self._data = {}      # name -> البيانات المحملة
+        self._versions = {}  # name -> الإصدار الذي حُملت عنده
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('REFERENCE_CACHE_TTL', 2.0)
+        app.config.setdefault('REFERENCE_CACHE_WARM', True)
+        self.ttl = app.config['REFERENCE_CACHE_TTL']
+        app.extensions['reference_cache'] = self
+
+        if not event.contains(db.session, 'after_flush', _bump_flushed):
+            event.listen(db.session, 'after_flush', _bump_flushed)
+            event.listen(db.session, 'do_orm_execute', _bump_bulk)
+            event.listen(db.session, 'after_commit', _invalidate_committed)
+            event.listen(db.session, 'after_rollback', _discard_bumped)
+
+        for name in LOADERS:
+            metrics.register_cache(f'reference_{name}', lambda name=name: len(self._data.get(name) or ()))
+
+        if app.config['REFERENCE_CACHE_WARM']:
+            with app.app_context():
+                try:
+                    self.refresh(force=True)
+                except Exception as e:
+                    # الجداول قد لا تكون أُنشئت بعد (flask init-db)
+                    logger.warning('تعذر تحميل بيانات المرجع مسبقاً: %s', e)
+
+    # ===== القراءة =====
+
+    def _get(self, name):
+        data = self._data.get(name)
+        if data is None or time.monotonic() - self._checked >= self.ttl:
+            self.refresh()
+            current = self._data.get(name)
+            metrics.cache_event(f'reference_{name}', current is data)
+            data = current
+        else:
+            metrics.cache_event(f'reference_{name}', True)
+        return data if data is not None else {}
+
+    def _connection(self):
+        engine = db.engines.get('reader') or db.engine
+        if isinstance(engine.pool, (StaticPool, SingletonThreadPool)):
+            # قاعدة في الذاكرة: الاتصال الوحيد مشترك مع الجلسة
+            return nullcontext(db.session.connection())
+        return engine.connect()
+
+    def refresh(self, force=False):
+        """إعادة تحميل المجموعات التي تغير إصدارها منذ آخر تحميل"""
+        with self._lock:
+            if not force and time.monotonic() - self._checked < self.ttl and len(self._data) == len(LOADERS):
+                return
+            with self._connection() as connection:
+                # الإصدارات أولاً: البيانات المحملة بعدها ليست أقدم منها
+                versions = dict(connection.execute(select(ReferenceVersion.name, ReferenceVersion.version)).all())
+                for name, loader in LOADERS.items():
+                    version = versions.get(name, 0)
+                    if force or name not in self._data or self._versions.get(name) != version:
+                        self._data[name] = loader(connection)
+                        self._versions[name] = version
+            self._checked = time.monotonic()
+
+    def invalidate(self, names=None):
+        """إسقاط النسخة المحلية لمجموعات محددة (أو الكل)"""
+        with self._lock:
+            for name in names or list(self._data):
+                self._data.pop(name, None)
+                self._versions.pop(name, None)
+
+    def kpi(self, kpi_id):
+        return self._get('kpis').get(kpi_id)
+
+    def kpis(self, active_only=True):
+        return [kpi for kpi in self._get('kpis').values() if kpi.is_active or not active_only]
+
+    def team(self, team_id):
+        return self._get('teams').get(team_id)
+
+    def teams(self):
+        return self._get('teams')
+
+    def budget(self, year, month):
+        return self._get('budgets').get((int(year), int(month)))
+
+    def versions(self):
+        with self._lock:
+            return dict(self._versions)
+
+
+reference_cache = ReferenceCache()
+
+
+def bump_versions(session, names):
+    """زيادة إصدار مجموعات البيانات ضمن معاملة الجلسة الحالية (مرة لكل معاملة)"""
+    bumped = session.info.setdefault('reference_bumped', set())
+    pending = set(names) - bumped
+    if not pending:
+        return
+    now = datetime.utcnow()
+    statement = insert(ReferenceVersion.__table__).values(
+        [{'name': name, 'version': 1, 'updated_at': now} for name in sorted(pending)]
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=['name'],
+        set_={'version': ReferenceVersion.__table__.c.version + 1, 'updated_at': statement.excluded.updated_at}
+    )
+    session.connection().execute(statement)
+    bumped.update(pending)
+
+
+def _bump_flushed(session, flush_context):
+    names = {
+        TRACKED_TABLES[obj.__tablename__]
+        for objects in (session.new, session.dirty, session.deleted)
+        for obj in objects
+        if getattr(obj, '__tablename__', None) in TRACKED_TABLES
+    }
+    if names:
+        bump_versions(session, names)
+
+
+def _bump_bulk(orm_execute_state):
+    # query(...).update()/delete() لا تمر بـ flush
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    name = TRACKED_TABLES.get(mapper.local_table.name) if mapper is not None else None
+    if name:
+        bump_versions(orm_execute_state.session, (name,))
+
+
+def _invalidate_committed(session):
+    names = session.info.pop('reference_bumped', None)
+    if names:
+        reference_cache.invalidate(names)
+
+
+def _discard_bumped(session):
+    session.info.pop('reference_bumped', None)
@@ -0,0 +1,266 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from flask import request
+
+from src.services.lazy_views import resolve_endpoint
+
+logger = logging.getLogger(__name__)
+
+MODES = ('cprofile', 'sampling', 'both')
+
+# منذ بايثون 3.12 يعمل cProfile على sys.monitoring: يقيس كل خيوط العملية
+# أثناء تفعيله لا خيط الطلب وحده، فلا يُنسب ناتجه للطلب المختار
+CPROFILE_PROCESS_WIDE = sys.version_info >= (3, 12)
+DEFAULT_MODE = 'sampling' if CPROFILE_PROCESS_WIDE else 'cprofile'
+
+_current = ContextVar('profiled_request', default=None)  # (session, profile)
+
+
+def _frame_name(code):
+    return f'{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class ProfileSession:
+    """جلسة تحليل واحدة: الطلبات المختارة ونتائجها المجمعة"""
+
+    def __init__(self, route, requests, sample_rate, mode, interval):
+        self.route = route
+        self.limit = requests
+        self.sample_rate = sample_rate
+        self.mode = mode
+        self.interval = interval
+        self.started_at = time.time()
+        self.finished_at = None
+        self.claimed = 0
+        self.completed = 0
+        self.skipped = 0  # طلبات مطابقة تُركت لأن cProfile آخر يعمل
+        self.samples = 0
+        self.stats = None
+        self.stacks = Counter()
+        self.threads = set()  # معرفات الخيوط التي تنفذ طلباً محللاً الآن
+        self.lock = threading.Lock()
+        self.done = False
+
+    def matches(self):
+        if self.route is None:
+            return True
+        # مسارات المخططات المؤجلة (admin) تظهر هنا باسم المسار البديل
+        endpoint = resolve_endpoint() or ''
+        return self.route in (endpoint, endpoint.rpartition('.')[2], request.path)
+
+    def claim(self):
+        """حجز مكان لطلب حسب العدد المتبقي ونسبة العينة"""
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return False
+        with self.lock:
+            if self.done or self.claimed >= self.limit:
+                return False
+            self.claimed += 1
+            return True
+
+    def skip(self, claimed):
+        """ترك طلب مطابق دون تحليل، مع إعادة مكانه إن كان محجوزاً"""
+        with self.lock:
+            self.skipped += 1
+            if claimed:
+                self.claimed -= 1
+
+    def add(self, profile):
+        with self.lock:
+            if profile is not None:
+                profile.create_stats()
+                if profile.stats:
+                    if self.stats is None:
+                        self.stats = pstats.Stats()
+                    self.stats.add(profile)
+            self.completed += 1
+            if self.completed >= self.limit:
+                self.finish()
+
+    def finish(self):
+        if not self.done:
+            self.done = True
+            self.finished_at = time.time()
+
+    def sample(self):
+        """لقطة من مكدسات الخيوط المحللة بصيغة collapsed"""
+        frames = sys._current_frames()
+        for thread_id in list(self.threads):
+            frame = frames.get(thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def pstats_text(self, sort='cumulative', limit=50):
+        with self.lock:
+            if self.stats is None:
+                return ''
+            stream = io.StringIO()
+            stats = pstats.Stats(stream=stream)
+            stats.add(self.stats)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def collapsed_text(self):
+        stacks = self.stacks.copy()
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+
+    def to_dict(self):
+        scope = None
+        if self.mode != 'sampling':
+            scope = 'process' if CPROFILE_PROCESS_WIDE else 'request'
+        return {
+            'route': self.route,
+            'mode': self.mode,
+            'requests': self.limit,
+            'sample_rate': self.sample_rate,
+            'interval_ms': self.interval * 1000,
+            'profiled': self.completed,
+            'in_progress': self.claimed - self.completed,
+            'skipped': self.skipped,
+            'samples': self.samples,
+            'cprofile_scope': scope,  # process: pstats يشمل خيوط العملية الأخرى أثناء الطلب
+            'done': self.done,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class RequestProfiler:
+    """تحليل زمن بايثون للطلبات القادمة عند الطلب في عملية تعمل
+
+    بدون جلسة نشطة لا يضيف سوى فحص متغير واحد لكل طلب. cprofile يقيس كل
+    استدعاء داخل الطلب، وsampling يلتقط مكدس خيوط الطلبات المختارة فقط كل
+    فترة من خيط منفصل بكلفة أقل. الجلسة لكل عملية عاملة على حدة.
+
+    على بايثون 3.12+ يشمل cprofile كل خيوط العملية أثناء الطلب المحلل
+    (طلبات أخرى ومنفذ المهام وخيط توزيع الأحداث)، فالنمط الافتراضي هناك
+    sampling، وcprofile_scope في الجلسة يبين نطاق pstats.
+    """
+
+    def __init__(self, app=None):
+        self._session = None
+        self._lock = threading.Lock()
+        # cProfile واحد فقط نشط في العملية: بايثون 3.12+ يرفض تفعيل ثانٍ بـ ValueError
+        self._cprofile_lock = threading.Lock()
+        self.max_requests = 1000
+        self.excluded_prefix = '/api/admin/perf/profile'
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PERF_PROFILE_MAX_REQUESTS', 1000)
+        self.max_requests = app.config['PERF_PROFILE_MAX_REQUESTS']
+        app.extensions['request_profiler'] = self
+
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+    @property
+    def session(self):
+        return self._session
+
+    def start(self, route=None, requests=10, sample_rate=1.0, mode=DEFAULT_MODE, interval_ms=5):
+        """بدء جلسة جديدة؛ ValueError للمعاملات غير الصالحة أو عند وجود جلسة جارية"""
+        if mode not in MODES:
+            raise ValueError(f'نمط غير معروف: {mode}')
+        if not 0 < requests <= self.max_requests:
+            raise ValueError(f'عدد الطلبات يجب أن يكون بين 1 و {self.max_requests}')
+        if not 0 < sample_rate <= 1:
+            raise ValueError('نسبة العينة يجب أن تكون بين 0 و 1')
+        if interval_ms < 1:
+            raise ValueError('فترة أخذ العينات يجب ألا تقل عن 1 ms')
+
+        with self._lock:
+            if self._session is not None and not self._session.done:
+                raise ValueError('توجد جلسة تحليل جارية')
+            session = ProfileSession(route, requests, sample_rate, mode, interval_ms / 1000)
+            self._session = session
+        if mode != 'cprofile':
+            threading.Thread(target=self._sampler, args=(session,), name='request-sampler', daemon=True).start()
+        return session
+
+    def stop(self):
+        """إنهاء الجلسة الجارية مع الاحتفاظ بما جُمع"""
+        session = self._session
+        if session is not None:
+            with session.lock:
+                session.finish()
+        return session
+
+    def _sampler(self, session):
+        while not session.done:
+            time.sleep(session.interval)
+            if session.threads:
+                session.sample()
+
+    def _before_request(self):
+        session = self._session
+        if session is None or session.done:
+            return
+        # التحليل لا يُفشل الطلب أبداً: أي خطأ هنا يُسجل ويُترك الطلب دون تحليل
+        try:
+            if request.path.startswith(self.excluded_prefix) or not session.matches():
+                return
+            self._begin(session)
+        except Exception:
+            logger.exception('تعذر بدء تحليل الطلب %s', request.path)
+
+    def _begin(self, session):
+        profiling = session.mode != 'sampling'
+        # طلب متزامن مع طلب محلل بـ cProfile يُترك ولا يُنتظر
+        if profiling and not self._cprofile_lock.acquire(blocking=False):
+            session.skip(claimed=False)
+            return
+        if not session.claim():
+            if profiling:
+                self._cprofile_lock.release()
+            return
+
+        profile = None
+        if profiling:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # أداة تحليل أخرى (sys.setprofile أو sys.monitoring) تعمل في العملية
+                self._cprofile_lock.release()
+                session.skip(claimed=True)
+                return
+        if session.mode != 'cprofile':
+            session.threads.add(threading.get_ident())
+        _current.set((session, profile))
+
+    def _teardown_request(self, exc):
+        current = _current.get()
+        if current is None:
+            return
+        session, profile = current
+        _current.set(None)
+        try:
+            if profile is not None:
+                try:
+                    profile.disable()
+                finally:
+                    self._cprofile_lock.release()
+            session.threads.discard(threading.get_ident())
+            session.add(profile)
+        except Exception:
+            logger.exception('تعذر حفظ تحليل الطلب %s', request.path)
+
+
+request_profiler = RequestProfiler()
@@ -0,0 +1,269 @@
+import logging
+import re
+import time
+from collections import namedtuple
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, inspect, select
+
+from src.models.user import db
+from src.models.sales import Employee, Project
+
+logger = logging.getLogger(__name__)
+
+# ===== توحيد النص العربي =====
+_ARABIC_FOLD = {
+    **{code: None for code in range(0x0610, 0x061B)},  # علامات قرآنية
+    **{code: None for code in range(0x064B, 0x0660)},  # التشكيل
+    0x0670: None,  # الألف الخنجرية
+    **{code: None for code in range(0x06D6, 0x06EE)},
+    0x0640: None,  # التطويل
+    0x0622: 'ا', 0x0623: 'ا', 0x0625: 'ا', 0x0671: 'ا',
+    0x0649: 'ي', 0x0626: 'ي',
+    0x0629: 'ه',
+    0x0624: 'و',
+    **{0x0660 + digit: str(digit) for digit in range(10)},
+    **{0x06F0 + digit: str(digit) for digit in range(10)},
+}
+_FOLD_TABLE = str.maketrans(_ARABIC_FOLD)
+_TOKEN = re.compile(r'\w+')
+_NON_DIGIT = re.compile(r'\D')
+
+
+def normalize(text):
+    """توحيد النص للبحث: حذف التشكيل والتطويل وتوحيد الألف والياء والتاء المربوطة والأرقام"""
+    if not text:
+        return ''
+    return text.translate(_FOLD_TABLE).lower()
+
+
+def match_expression(query):
+    """تعبير MATCH: الكلمات كلها مطلوبة، والأخيرة بادئة لأنها قد تكون قيد الكتابة"""
+    tokens = _TOKEN.findall(normalize(query))
+    return ' '.join([f'"{token}"' for token in tokens[:-1]] + [f'"{token}"*' for token in tokens[-1:]])
+
+
+def _phone(value):
+    # الرقم كما كُتب وأرقامه متصلة حتى يطابق البحث بأي صيغة
+    digits = _NON_DIGIT.sub('', normalize(value))
+    return f'{normalize(value)} {digits}' if digits else normalize(value)
+
+
+SearchSource = namedtuple('SearchSource', 'model table columns weights converters')
+
+SOURCES = {
+    'projects': SearchSource(Project, 'search_projects', ('client_name', 'notes'), (10.0, 1.0), {}),
+    'employees': SearchSource(Employee, 'search_employees', ('name', 'email', 'phone'), (10.0, 4.0, 4.0),
+                              {'phone': _phone}),
+}
+_SOURCE_BY_MODEL = {source.model: source for source in SOURCES.values()}
+
+
+def _document(source, values):
+    return tuple(
+        source.converters.get(column, normalize)(value)
+        for column, value in zip(source.columns, values)
+    )
+
+
+def _upsert_statement(source):
+    columns = ', '.join(source.columns)
+    placeholders = ', '.join('?' for _ in source.columns)
+    return f'INSERT OR REPLACE INTO {source.table} (rowid, {columns}) VALUES (?, {placeholders})'
+
+
+class SearchIndex:
+    """بحث نصي عبر فهارس FTS5 للمشاريع والموظفين
+
+    الفهرس يخزن النص بعد التوحيد. الإضافة والتعديل تُزامن من flush الجلسة
+    ضمن المعاملة نفسها، والحذف بمشغل في القاعدة فيشمل الحذف الجماعي
+    والأرشفة. الإدراج الجماعي خارج الجلسة يستدعي index_from.
+    """
+
+    def __init__(self, app=None):
+        self.available = False
+        self.rank_limit = 5000
+        self.max_per_page = 100
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SEARCH_RANK_LIMIT', 5000)
+        app.config.setdefault('SEARCH_MAX_PER_PAGE', 100)
+        self.rank_limit = app.config['SEARCH_RANK_LIMIT']
+        self.max_per_page = app.config['SEARCH_MAX_PER_PAGE']
+        app.extensions['search_index'] = self
+
+        with app.app_context():
+            try:
+                if app.config.get('AUTO_CREATE_SCHEMA'):
+                    self.ensure_schema()
+                self.available = self._tables_exist()
+            except Exception as e:
+                logger.warning('فهرس البحث غير متاح: %s', e)
+                self.available = False
+
+        if not event.contains(db.session, 'after_flush', _sync_flushed):
+            event.listen(db.session, 'after_flush', _sync_flushed)
+
+    # ===== المخطط =====
+
+    def _tables_exist(self):
+        names = {source.table for source in SOURCES.values()}
+        with db.engine.connect() as connection:
+            found = connection.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN (%s)"
+                % ', '.join('?' for _ in names), tuple(names)
+            ).scalars().all()
+        return set(found) == names
+
+    def create_schema(self, connection=None):
+        """إنشاء جداول FTS5 ومشغلات الحذف إن لم توجد"""
+        statements = []
+        for source in SOURCES.values():
+            table = source.model.__tablename__
+            statements.append(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {source.table} USING fts5("
+                f"{', '.join(source.columns)}, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            statements.append(
+                f'CREATE TRIGGER IF NOT EXISTS {source.table}_ad AFTER DELETE ON {table} '
+                f'BEGIN DELETE FROM {source.table} WHERE rowid = old.id; END'
+            )
+        if connection is not None:
+            for statement in statements:
+                connection.exec_driver_sql(statement)
+            return
+        with db.engine.begin() as connection:
+            for statement in statements:
+                connection.exec_driver_sql(statement)
+
+    def ensure_schema(self, log=None):
+        """إنشاء الفهارس عند غيابها وتعبئتها من البيانات الموجودة"""
+        if self._tables_exist():
+            return False
+        self.create_schema()
+        for name in SOURCES:
+            self.index_from(name, log=log)
+        return True
+
+    # ===== الفهرسة =====
+
+    def index_from(self, name, first_id=0, batch_size=20000, log=None):
+        """فهرسة صفوف المصدر ذات المعرف >= first_id على دفعات"""
+        log = log or (lambda message: None)
+        source = SOURCES[name]
+        model = source.model
+        columns = [getattr(model, column) for column in source.columns]
+        statement = _upsert_statement(source)
+        indexed = 0
+        last_id = first_id - 1
+        while True:
+            rows = db.session.execute(
+                select(model.id, *columns).where(model.id > last_id).order_by(model.id).limit(batch_size)
+            ).all()
+            if not rows:
+                db.session.rollback()  # إنهاء معاملة الكتابة المفتوحة
+                break
+            db.session.connection().exec_driver_sql(
+                statement, [(row[0], *_document(source, row[1:])) for row in rows]
+            )
+            db.session.commit()
+            last_id = rows[-1][0]
+            indexed += len(rows)
+            log(f'{source.table}: {indexed}')
+        return indexed
+
+    def rebuild(self, batch_size=20000, log=None):
+        """إعادة بناء الفهارس بالكامل"""
+        started = time.perf_counter()
+        with db.engine.begin() as connection:
+            for source in SOURCES.values():
+                connection.exec_driver_sql(f'DROP TABLE IF EXISTS {source.table}')
+                connection.exec_driver_sql(f'DROP TRIGGER IF EXISTS {source.table}_ad')
+            self.create_schema(connection)
+        counts = {}
+        for name, source in SOURCES.items():
+            counts[name] = self.index_from(name, batch_size=batch_size, log=log)
+            db.session.connection().exec_driver_sql(f"INSERT INTO {source.table}({source.table}) VALUES ('optimize')")
+            db.session.commit()
+        self.available = True
+        return {'rows': counts, 'seconds': round(time.perf_counter() - started, 2)}
+
+    # ===== البحث =====
+
+    def search(self, name, query, page=1, per_page=20):
+        """معرفات النتائج مرتبة بالصلة، مع العدد الكلي حتى rank_limit
+
+        إذا تجاوزت المطابقات rank_limit تُرتب حسب الأحدث بدلاً من الصلة
+        حتى لا يُحسب ترتيب كل الصفوف لكلمة شائعة.
+        """
+        source = SOURCES[name]
+        expression = match_expression(query)
+        per_page = max(1, min(per_page, self.max_per_page))
+        page = max(1, page)
+        if not expression:
+            return {'ids': [], 'total': 0, 'total_is_capped': False, 'ordering': 'rank'}
+
+        connection = db.session.connection()
+        offset = (page - 1) * per_page
+        # العد أولاً دون حساب الصلة؛ الترتيب بالصلة فقط إذا كانت المطابقات محدودة
+        total = connection.exec_driver_sql(
+            f'SELECT count(*) FROM (SELECT rowid FROM {source.table} WHERE {source.table} MATCH ? LIMIT ?)',
+            (expression, self.rank_limit + 1)
+        ).scalar()
+        capped = total > self.rank_limit
+        if capped:
+            ids = connection.exec_driver_sql(
+                f'SELECT rowid FROM {source.table} WHERE {source.table} MATCH ? '
+                f'ORDER BY rowid DESC LIMIT ? OFFSET ?',
+                (expression, per_page, offset)
+            ).scalars().all()
+        else:
+            weights = ', '.join(str(weight) for weight in source.weights)
+            ids = connection.exec_driver_sql(
+                f'SELECT rowid FROM {source.table} WHERE {source.table} MATCH ? '
+                f'ORDER BY bm25({source.table}, {weights}), rowid DESC LIMIT ? OFFSET ?',
+                (expression, per_page, offset)
+            ).scalars().all()
+        return {
+            'ids': ids,
+            'total': min(total, self.rank_limit),
+            'total_is_capped': capped,
+            'ordering': 'recent' if capped else 'rank'
+        }
+
+
+search_index = SearchIndex()
+
+
+def _sync_flushed(session, flush_context):
+    """مزامنة الصفوف المضافة أو المعدلة في الحقول المفهرسة"""
+    if not search_index.available:
+        return
+    pending = {}
+    for objects, is_new in ((session.new, True), (session.dirty, False)):
+        for obj in objects:
+            source = _SOURCE_BY_MODEL.get(type(obj))
+            if source is None:
+                continue
+            if not is_new:
+                state = inspect(obj)
+                if not any(state.attrs[column].history.has_changes() for column in source.columns):
+                    continue
+            values = [getattr(obj, column) for column in source.columns]
+            pending.setdefault(source.table, (source, []))[1].append((obj.id, *_document(source, values)))
+    if pending:
+        connection = session.connection()
+        for source, rows in pending.values():
+            connection.exec_driver_sql(_upsert_statement(source), rows)
+
+
+@click.command('search-reindex')
+@click.option('--batch-size', default=20000, show_default=True)
+@with_appcontext
+def search_reindex_command(batch_size):
+    """إعادة بناء فهارس البحث النصي"""
+    result = search_index.rebuild(batch_size=batch_size, log=click.echo)
+    click.echo(f"تمت الفهرسة: {result['rows']} في {result['seconds']} ثانية")
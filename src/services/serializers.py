@@ -0,0 +1,137 @@
+import threading
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Numeric, inspect
+
+from src.services.metrics import metrics
+
+# تحويل موحد لكل نوع عمود؛ {v} هو اسم المتغير المؤقت
+_CONVERTERS = {
+    DateTime: 'None if {v} is None else {v}.isoformat()',
+    Date: 'None if {v} is None else {v}.isoformat()',
+    Float: 'None if {v} is None else float({v})',
+    Numeric: 'None if {v} is None else float({v})',
+    Boolean: 'None if {v} is None else bool({v})',
+}
+
+
+def _converter(column_type):
+    for base, template in _CONVERTERS.items():
+        if isinstance(column_type, base):
+            return template
+    return None
+
+
+def _parse_field(spec):
+    # 'name' أو 'employee_name=employee.name'
+    key, _, path = spec.partition('=')
+    return key.strip(), (path or key).strip().split('.')
+
+
+class Serializer:
+    """دالة تحويل مولدة لنموذج ومجموعة حقول
+
+    one/many تعمل على كائنات ORM، وrows على صفوف بترتيب الحقول نفسه
+    (انظر columns). القيم تخرج بصيغة موحدة: التواريخ ISO والأعداد float.
+    """
+
+    def __init__(self, model, name, fields):
+        self.model = model
+        self.name = name
+        self.fields = [_parse_field(spec) for spec in fields]
+        self.keys = [key for key, _ in self.fields]
+        self.one = self._compile('obj')
+        self.row = self._compile('row')
+
+    def _resolve(self, path):
+        """نوع العمود في نهاية المسار، عبر العلاقات إن وُجدت"""
+        mapper = inspect(self.model)
+        for relation in path[:-1]:
+            mapper = mapper.relationships[relation].mapper
+        column = mapper.columns.get(path[-1])
+        return column.type if column is not None else None
+
+    def _compile(self, mode):
+        lines = [f'def serialize({mode}):']
+        items = []
+        for index, (key, path) in enumerate(self.fields):
+            variable = f'v{index}'
+            if mode == 'row':
+                lines.append(f'    {variable} = row[{index}]')
+            elif len(path) == 1:
+                lines.append(f'    {variable} = obj.{path[0]}')
+            else:
+                # العلاقة الفارغة تعطي None بدلاً من AttributeError
+                lines.append(f'    {variable} = obj')
+                for part in path:
+                    lines.append(f'    {variable} = None if {variable} is None else {variable}.{part}')
+            template = _converter(self._resolve(path))
+            items.append(f'{key!r}: {template.format(v=variable) if template else variable}')
+        lines.append(f"    return {{{', '.join(items)}}}")
+
+        namespace = {}
+        source = '\n'.join(lines)
+        exec(compile(source, f'<serializer {self.model.__name__}.{self.name}.{mode}>', 'exec'), namespace)
+        function = namespace['serialize']
+        function.__source__ = source
+        return function
+
+    def many(self, objects):
+        one = self.one
+        return [one(obj) for obj in objects]
+
+    def rows(self, rows):
+        row = self.row
+        return [row(values) for values in rows]
+
+    def columns(self, entity=None, **joined):
+        """أعمدة الاستعلام بترتيب الحقول لاستخدامها مع rows
+
+        الحقول عبر علاقة تحتاج كياناً مربوطاً باسم العلاقة:
+        columns(project, employee=Employee)
+        """
+        entity = entity if entity is not None else self.model
+        columns = []
+        for key, path in self.fields:
+            if len(path) == 1:
+                columns.append(getattr(entity, path[0]).label(key))
+            elif len(path) == 2 and path[0] in joined:
+                columns.append(getattr(joined[path[0]], path[1]).label(key))
+            else:
+                raise ValueError(f'الحقل {key} يحتاج كياناً مربوطاً للعلاقة {path[0]}')
+        return columns
+
+
+_registry = {}
+_lock = threading.Lock()
+
+
+def register(model, name, fields):
+    """تسجيل مجموعة حقول مسماة لنموذج (تحل محل المعرفة في __serializers__)"""
+    with _lock:
+        _registry[(model, name)] = Serializer(model, name, fields)
+    return _registry[(model, name)]
+
+
+def serializer(model, name='default'):
+    """المحوّل المولد لنموذج ومجموعة حقول؛ يُبنى مرة واحدة عند أول طلب"""
+    compiled = _registry.get((model, name))
+    metrics.cache_event('serializers', compiled is not None)
+    if compiled is None:
+        fields = getattr(model, '__serializers__', {}).get(name)
+        if fields is None:
+            if name != 'default':
+                raise KeyError(f'لا توجد مجموعة حقول {name} للنموذج {model.__name__}')
+            fields = [column.key for column in inspect(model).column_attrs]
+        compiled = register(model, name, fields)
+    return compiled
+
+
+metrics.register_cache('serializers', lambda: len(_registry))
+
+
+class SerializerMixin:
+    """to_dict عبر المحوّل المولد؛ الحقول من __serializers__ في النموذج"""
+
+    def to_dict(self, fields='default'):
+        return serializer(type(self), fields).one(self)
+
@@ -0,0 +1,169 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import time
+
+from flask import Response, request
+from werkzeug.http import http_date
+
+# ملفات Vite المسماة ببصمة المحتوى: index-CWpLeLbw.js
+_HASHED_NAME = re.compile(r'-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$')
+_COMPRESSIBLE = ('text/', 'application/javascript', 'application/json', 'image/svg+xml', 'image/x-icon',
+                 'image/vnd.microsoft.icon')
+
+
+class StaticAsset:
+    """ملف ثابت محمّل في الذاكرة مع نسخته المضغوطة"""
+
+    __slots__ = ('path', 'body', 'compressible', 'etag', 'mimetype', 'last_modified', 'cache_control',
+                 'mtime', 'gzip_level', '_gzipped')
+
+    def __init__(self, path, body, mimetype, mtime, cache_control, gzip_level, gzip_min_size):
+        self.path = path
+        self.body = body
+        self.mimetype = mimetype
+        self.mtime = mtime
+        self.last_modified = http_date(mtime)
+        self.cache_control = cache_control
+        self.etag = hashlib.sha1(body).hexdigest()[:20]
+        self.gzip_level = gzip_level
+        self.compressible = len(body) >= gzip_min_size and mimetype.startswith(_COMPRESSIBLE)
+        self._gzipped = None
+
+    @property
+    def gzipped(self):
+        # يُضغط عند التشغيل مع STATIC_PRECOMPRESS، وإلا عند أول طلب يقبل gzip
+        if self.compressible and self._gzipped is None:
+            compressed = gzip.compress(self.body, compresslevel=self.gzip_level, mtime=0)
+            if len(compressed) < len(self.body):
+                self._gzipped = compressed
+            else:
+                self.compressible = False
+        return self._gzipped
+
+
+class StaticAssets:
+    """تقديم واجهة SPA من فهرس في الذاكرة يُبنى عند التشغيل
+
+    لا يلمس نظام الملفات أثناء الطلبات: الملفات تُقرأ مرة واحدة وتُضغط مرة واحدة،
+    والملفات ذات البصمة تُخزن لدى المتصفح نهائياً. index.html وحده يُفحص
+    بعد STATIC_INDEX_TTL؛ إذا تغير بعد النشر يُعاد بناء الفهرس كاملاً حتى
+    تكون ملفات assets الجديدة التي يشير إليها موجودة قبل تقديمه. ملف
+    assets غير موجود يعيد 404 لا index.html: المتصفح لا ينتظر HTML مكان
+    JS أو CSS.
+
+    مع STATIC_PRECOMPRESS يُضغط كل شيء عند البناء: مع التحميل المسبق في
+    server.py يحدث ذلك مرة في العملية الرئيسية وتتشارك العمال النتيجة.
+    """
+
+    def __init__(self, app=None):
+        self.root = None
+        self._assets = {}
+        self._index_checked = 0.0
+        self._lock = threading.Lock()
+        self.index_ttl = 60
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('STATIC_GZIP_LEVEL', 9)
+        app.config.setdefault('STATIC_GZIP_MIN_SIZE', 1024)
+        app.config.setdefault('STATIC_INDEX_TTL', 60)
+        app.config.setdefault('STATIC_IMMUTABLE_MAX_AGE', 31536000)
+        app.config.setdefault('STATIC_DEFAULT_MAX_AGE', 3600)
+        app.config.setdefault('STATIC_MAX_FILE_SIZE', 16 * 1024 * 1024)
+        app.config.setdefault('STATIC_PRECOMPRESS', False)
+        self.config = app.config
+        self.root = app.static_folder
+        self.index_ttl = app.config['STATIC_INDEX_TTL']
+        app.extensions['static_assets'] = self
+        self.build()
+
+    def build(self):
+        """بناء الفهرس من مجلد الملفات الثابتة"""
+        assets = {}
+        if self.root and os.path.isdir(self.root):
+            for directory, _, files in os.walk(self.root):
+                for name in files:
+                    full_path = os.path.join(directory, name)
+                    relative = os.path.relpath(full_path, self.root).replace(os.sep, '/')
+                    asset = self._load(relative, full_path)
+                    if asset is not None:
+                        if self.config['STATIC_PRECOMPRESS']:
+                            asset.gzipped
+                        assets[relative] = asset
+        self._assets = assets
+        self._index_checked = time.monotonic()
+
+    def _load(self, relative, full_path):
+        stat = os.stat(full_path)
+        if stat.st_size > self.config['STATIC_MAX_FILE_SIZE']:
+            return None
+        with open(full_path, 'rb') as handle:
+            body = handle.read()
+
+        if relative == 'index.html':
+            cache_control = f'public, max-age={self.index_ttl}, must-revalidate'
+        elif _HASHED_NAME.search(relative):
+            cache_control = f"public, max-age={self.config['STATIC_IMMUTABLE_MAX_AGE']}, immutable"
+        else:
+            cache_control = f"public, max-age={self.config['STATIC_DEFAULT_MAX_AGE']}"
+
+        mimetype = mimetypes.guess_type(relative)[0] or 'application/octet-stream'
+        return StaticAsset(
+            relative, body, mimetype, stat.st_mtime, cache_control,
+            self.config['STATIC_GZIP_LEVEL'], self.config['STATIC_GZIP_MIN_SIZE']
+        )
+
+    def _index(self):
+        # بعد انتهاء المدة: إصدار جديد من index.html يعني نشراً جديداً، فيُعاد بناء الفهرس كله
+        if time.monotonic() - self._index_checked >= self.index_ttl:
+            with self._lock:
+                if time.monotonic() - self._index_checked >= self.index_ttl:
+                    self._index_checked = time.monotonic()
+                    current = self._assets.get('index.html')
+                    try:
+                        mtime = os.stat(os.path.join(self.root, 'index.html')).st_mtime
+                    except OSError:
+                        mtime = None
+                    if mtime != (current.mtime if current else None):
+                        self.build()
+        return self._assets.get('index.html')
+
+    def get(self, path):
+        """الملف المطلوب، أو index.html لمسارات الواجهة، أو None"""
+        if path and path != 'index.html':
+            asset = self._assets.get(path)
+            if asset is not None:
+                return asset
+            if path.startswith('assets/'):
+                # قد يكون من نشر لم يُبنَ فهرسه بعد
+                self._index()
+                return self._assets.get(path)
+        return self._index()
+
+    def respond(self, asset):
+        use_gzip = (
+            asset.compressible
+            and 'Range' not in request.headers  # النطاقات تُخدم من النسخة غير المضغوطة
+            and 'gzip' in request.accept_encodings
+            and asset.gzipped is not None
+        )
+        body = asset.gzipped if use_gzip else asset.body
+        response = Response(body, mimetype=asset.mimetype)
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+            response.set_etag(f'{asset.etag}-gz')
+        else:
+            response.set_etag(asset.etag)
+        if asset.compressible:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = asset.cache_control
+        response.headers['Last-Modified'] = asset.last_modified
+        return response.make_conditional(request, accept_ranges=True, complete_length=len(body))
+
+
+static_assets = StaticAssets()
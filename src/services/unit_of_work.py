@@ -0,0 +1,109 @@
+from datetime import date, datetime
+
+from sqlalchemy import func, select
+
+from src.models.user import db
+from src.models.sales import Employee, MarketingBudget, Project, Target
+from src.services.recompute import SOCIAL_MEDIA_DISCOUNT
+
+
+def _month_range(year, month):
+    start = date(year, month, 1)
+    return start, date(year + month // 12, month % 12 + 1, 1)
+
+
+class ProjectUnitOfWork:
+    """إنشاء مشروع بكل آثاره في معاملة كتابة واحدة
+
+    المسار السابق كان يلتزم ثلاث مرات (المشروع ثم الهدف ثم تكلفة التسويق)
+    ويحسب مجموع مبيعات الشهر مرتين، فيحجز قفل الكتابة عدة مرات لكل طلب
+    ويترك المشروع بلا هدف محدث إذا فشلت خطوة لاحقة. هنا يُحجز القفل مرة
+    ويُقرأ مجموع مبيعات الموظف في الشهر مرة واحدة قبل الإدراج:
+
+    1. نسبة العمولة من التحقيق قبل المشروع كما في السابق، فتتدرج نسب
+       صفقات الشهر ولا تتغير نسب الصفقات السابقة.
+    2. الهدف المحقق = المجموع نفسه + قيمة المشروع.
+    3. حصة المشروع من ميزانية التسويق إن كان من السوشيال ميديا.
+
+    أي خطأ يتراجع عن كل ذلك معاً. حصص مشاريع السوشيال الأخرى في الشهر لا
+    تُعاد هنا كما في السابق؛ إعادة توزيعها تبقى لمسار إعادة التوزيع.
+    """
+
+    def create_project(self, data):
+        from src.routes.sales import get_commission_rate
+
+        signed = datetime.strptime(data['signature_date'], '%Y-%m-%d').date()
+        employee = Employee.query.get_or_404(data['employee_id'])
+        start, end = _month_range(signed.year, signed.month)
+
+        project = Project(
+            employee_id=employee.id,
+            client_name=data['client_name'],
+            project_value=data['project_value'],
+            product_type=data['product_type'],
+            signature_date=signed,
+            is_from_social_media=data.get('is_from_social_media', False),
+            notes=data.get('notes')
+        )
+
+        try:
+            # أول استعلام يفتح معاملة الكتابة: المجموع لا يتغير حتى الالتزام
+            total = db.session.execute(
+                select(func.sum(Project.project_value)).where(
+                    Project.employee_id == employee.id,
+                    Project.signature_date >= start, Project.signature_date < end
+                )
+            ).scalar() or 0.0
+            target = Target.query.filter_by(employee_id=employee.id, month=signed.month, year=signed.year).first()
+            achievement = total / target.target_amount if target and target.target_amount else 0.0
+
+            project.commission_rate = get_commission_rate(employee.role, achievement)
+            if project.is_from_social_media:
+                project.commission_rate -= SOCIAL_MEDIA_DISCOUNT
+            project.final_commission = project.project_value * project.commission_rate
+
+            if project.is_from_social_media:
+                allocated = self._marketing_share(project, start, end)
+                if allocated is not None:
+                    project.marketing_cost_allocated = allocated
+                    project.final_commission = max(0, project.final_commission - allocated)
+
+            if target:
+                target.achieved_amount = total + project.project_value
+                target.achievement_percentage = (
+                    target.achieved_amount / target.target_amount if target.target_amount > 0 else 0.0
+                )
+                target.updated_at = datetime.utcnow()
+
+            db.session.add(project)
+            db.session.flush()
+            project_id = project.id  # قبل الالتزام: قراءته بعده تفتح معاملة كتابة جديدة
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        return project_id
+
+    def _marketing_share(self, project, start, end):
+        """حصة المشروع من ميزانية الشهر حسب قيمته بين مشاريع السوشيال ميديا، أو None بلا ميزانية"""
+        signed = project.signature_date
+        # الميزانية من معاملة الكتابة نفسها: ذاكرة المرجع قد تتأخر حتى REFERENCE_CACHE_TTL
+        budget = db.session.execute(
+            select(MarketingBudget.total_budget)
+            .where(MarketingBudget.year == signed.year, MarketingBudget.month == signed.month)
+        ).scalar()
+        if not budget:
+            return None
+
+        total = db.session.execute(
+            select(func.sum(Project.project_value)).where(
+                Project.is_from_social_media == True,
+                Project.signature_date >= start, Project.signature_date < end
+            )
+        ).scalar() or 0.0
+        total += project.project_value
+        return budget * project.project_value / total if total else None
+
+
+project_unit_of_work = ProjectUnitOfWork()
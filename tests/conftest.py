@@ -0,0 +1,107 @@
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# قبل استيراد src: الإعدادات تُقرأ من البيئة عند الاستيراد، وsrc.main ينشئ التطبيق فوراً
+_WORKDIR = tempfile.mkdtemp(prefix='alanood-tests-')
+os.environ['APP_PROFILE'] = 'testing'
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_WORKDIR, 'app.db')}"
+os.environ['PERF_PROFILER_ENABLED'] = '0'
+sys.path.insert(0, ROOT)
+
+YEAR, MONTH = 2024, 6  # شهر بيانات الاختبار
+
+
+@pytest.fixture
+def app():
+    """التطبيق على قاعدة ملف مؤقتة تُفرغ قبل كل اختبار"""
+    from src.main import app
+    from src.models.user import db
+    from src.services.db_engine import create_missing_indexes
+    from src.services.periods import period_close
+    from src.services.reference_cache import reference_cache
+
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        create_missing_indexes(db)
+    reference_cache.invalidate()
+    period_close.invalidate()
+    yield app
+    with app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(app):
+    """ترويسة جلسة لمستخدم admin"""
+    from src.models.user import db
+    from src.models.auth import User, UserSession
+
+    with app.app_context():
+        user = User(username='admin', email='admin@aloud.com', role='admin')
+        user.set_password('admin123')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(UserSession(
+            user_id=user.id, session_token='test-token', is_active=True,
+            expires_at=datetime.utcnow() + timedelta(hours=1)
+        ))
+        db.session.commit()
+    return {'Authorization': 'Bearer test-token'}
+
+
+@pytest.fixture
+def rep(app, auth_headers):
+    """مندوب بهدف 100 ألف ومؤشر أداء وميزانية تسويق للشهر"""
+    from src.models.user import db
+    from src.models.auth import User
+    from src.models.sales import Employee, MarketingBudget, PerformanceKPI, PerformanceScore, Target
+
+    with app.app_context():
+        admin = User.query.filter_by(username='admin').one()
+        employee = Employee(name='مندوب الاختبار', role='sales_rep', base_salary=5000)
+        kpi = PerformanceKPI(name='رضا العملاء', weight=0.5, max_score=10)
+        db.session.add_all([employee, kpi])
+        db.session.flush()
+        db.session.add_all([
+            Target(employee_id=employee.id, month=MONTH, year=YEAR, target_amount=100000),
+            PerformanceScore(employee_id=employee.id, kpi_id=kpi.id, month=MONTH, year=YEAR,
+                             score=8, weighted_score=4),
+            MarketingBudget(month=MONTH, year=YEAR, total_budget=900, allocated_budget=0, remaining_budget=900,
+                            created_by=admin.id)
+        ])
+        db.session.commit()
+        return {'employee_id': employee.id, 'kpi_id': kpi.id}
+
+
+def create_project(client, employee_id, value, social=False, day=1, month=MONTH):
+    """إنشاء مشروع عبر المسار وإعادة رقمه"""
+    response = client.post('/api/projects', json={
+        'employee_id': employee_id,
+        'client_name': f'عميل {value}-{day}',
+        'project_value': value,
+        'product_type': 'حديد إنشائي',
+        'signature_date': f'{YEAR}-{month:02d}-{day:02d}',
+        'is_from_social_media': social
+    })
+    assert response.status_code == 201
+    return response.get_json()['id']
+
+
+def calculate(client, month=MONTH):
+    """حساب عمولات الشهر وإعادة إحصاءاته"""
+    response = client.post('/api/commissions/calculate', json={'month': month, 'year': YEAR})
+    assert response.status_code == 200
+    return response.get_json()['stats']
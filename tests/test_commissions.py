@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy import event
+
+from conftest import MONTH, YEAR, calculate, create_project
+from src.models.user import db
+from src.models.sales import Commission, Employee, Project
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def count_writes(app, func):
+    """تنفيذ func وإعادة عدد جمل الكتابة المرسلة إلى القاعدة أثناءه"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(WRITES):
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        result = func()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return result, statements
+
+
+# ===== إعادة حساب العمولات =====
+
+def test_unchanged_inputs_are_skipped_without_writes(app, client, rep):
+    create_project(client, rep['employee_id'], 30000)
+    assert calculate(client)['computed'] == 1
+
+    stats, writes = count_writes(app, lambda: calculate(client))
+    assert stats == {'computed': 0, 'unchanged': 1, 'updated': 0}
+    assert writes == []
+
+
+def test_changed_score_is_recomputed(app, client, rep):
+    create_project(client, rep['employee_id'], 30000)
+    calculate(client)
+
+    response = client.post('/api/performance-scores', json={
+        'employee_id': rep['employee_id'], 'kpi_id': rep['kpi_id'], 'month': MONTH, 'year': YEAR, 'score': 6
+    })
+    assert response.status_code == 200
+    assert calculate(client)['computed'] == 1
+
+    with app.app_context():
+        commission = Commission.query.filter_by(employee_id=rep['employee_id'], month=MONTH, year=YEAR).one()
+        assert commission.performance_bonus == pytest.approx(6 * 0.5 * 1000)
+
+
+def test_changed_allocation_is_recomputed(app, client, rep, auth_headers):
+    project_id = create_project(client, rep['employee_id'], 30000, social=True)
+    with app.app_context():
+        other = Employee(name='مندوب آخر', role='sales_rep', base_salary=5000)
+        db.session.add(other)
+        db.session.commit()
+        other_id = other.id
+    other_project = create_project(client, other_id, 30000, social=True, day=2)
+    calculate(client)
+
+    # تعديل قيمة مشروع السوشيال الآخر يعيد توزيع الميزانية على مشروع المندوب
+    response = client.put(f'/api/admin/projects/{other_project}', json={'project_value': 60000},
+                          headers=auth_headers)
+    assert response.status_code == 200
+
+    with app.app_context():
+        assert db.session.get(Project, project_id).marketing_cost_allocated == pytest.approx(300)
+    stats = calculate(client)
+    assert stats['computed'] == 2
+    assert stats['unchanged'] == 0
@@ -0,0 +1,27 @@
+from src.services import deadlines
+from src.services.bootstrap import admin_bootstrap
+from src.services.deadlines import query_deadlines
+
+
+def test_bootstrap_pool_threads_keep_request_deadline(app):
+    seen = []
+
+    def probe(session):
+        seen.append(deadlines._state.get())
+        return {}
+
+    names = ('deadline_probe_a', 'deadline_probe_b')
+    for name in names:
+        admin_bootstrap.resource(name)(probe)
+    try:
+        with app.test_request_context('/api/admin/bootstrap'):
+            query_deadlines._before_request()
+            admin_bootstrap.load(names, {}, 'admin')
+            state = deadlines._state.get()
+    finally:
+        for name in names:
+            admin_bootstrap.resources.pop(name, None)
+
+    # القطع في خيط المجمع يجب أن يصل لحالة الطلب نفسها حتى يُستبدل الرد بـ 503
+    assert seen == [state, state]
+    assert all(item is state for item in seen)
@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src.services.metrics import metrics
+
+KEY = ('sales', '/api/projects', 'GET', 200)
+LABELS = 'blueprint="sales",route="/api/projects",method="GET",status="200"'
+
+
+@pytest.fixture
+def metrics_dir(app, tmp_path):
+    metrics.directory = str(tmp_path)
+    yield tmp_path
+    metrics.directory = None
+
+
+def worker_file(directory, pid, count, in_flight):
+    state = {
+        'requests': [['sales', '/api/projects', 'GET', 200, count]],
+        'latency': [], 'cache': [], 'in_flight': in_flight,
+        'gauges': {'db_pool_connections': [['default', 'checked_out', 1]]}
+    }
+    (directory / f'{pid}.json').write_text(json.dumps(state))
+
+
+def test_metrics_sum_all_workers(client, metrics_dir):
+    finished = subprocess.Popen([sys.executable, '-c', 'pass'])
+    finished.wait()
+    worker_file(metrics_dir, os.getppid(), 5, in_flight=2)
+    worker_file(metrics_dir, finished.pid, 7, in_flight=3)
+
+    client.get('/api/projects')
+    text = client.get('/metrics').get_data(as_text=True)
+
+    local = metrics.snapshot().requests[KEY]
+    # عدادات العامل المنتهي تبقى، ولحظياته لا تُحسب (الطلب الحالي + عامل حي)
+    assert f'http_requests_total{{{LABELS}}} {local + 12}' in text.splitlines()
+    assert 'http_requests_in_flight 3' in text
+
+
+def test_written_counters_are_collected_by_other_workers(app, client, metrics_dir):
+    client.get('/api/projects')
+    with app.app_context():
+        metrics.write()
+        # الملف نفسه كأنه من عامل آخر حي
+        os.replace(metrics_dir / f'{os.getpid()}.json', metrics_dir / f'{os.getppid()}.json')
+        total, gauges = metrics.collect()
+        local = metrics._gauge_values()['db_pool_connections']
+
+    assert total.requests[KEY] == 2 * metrics.snapshot().requests[KEY]
+    assert gauges['db_pool_connections'] == {key: 2 * value for key, value in local.items()}
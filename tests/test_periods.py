@@ -0,0 +1,23 @@
+from datetime import date
+
+from conftest import MONTH, YEAR, calculate, create_project
+from src.models.user import db
+from src.models.sales import Project
+
+
+def test_edit_in_closed_month_is_rejected(app, client, rep, auth_headers):
+    project_id = create_project(client, rep['employee_id'], 30000)
+    calculate(client)
+
+    response = client.post(f'/api/admin/periods/{YEAR}/{MONTH}/close', headers=auth_headers)
+    assert response.status_code == 201
+
+    response = client.put(f'/api/admin/projects/{project_id}', json={'project_value': 50000},
+                          headers=auth_headers)
+    assert response.status_code == 409
+    assert client.delete(f'/api/admin/projects/{project_id}', headers=auth_headers).status_code == 409
+
+    with app.app_context():
+        project = db.session.get(Project, project_id)
+        assert project.project_value == 30000
+        assert project.signature_date == date(YEAR, MONTH, 1)
@@ -0,0 +1,33 @@
+import pytest
+
+from conftest import MONTH, YEAR, create_project
+from src.models.user import db
+from src.models.sales import Project, Target
+
+
+def test_create_prices_each_deal_from_month_total_before_it(app, client, rep):
+    ids = [create_project(client, rep['employee_id'], 30000, day=day) for day in (1, 2, 3)]
+
+    with app.app_context():
+        rates = [db.session.get(Project, project_id).commission_rate for project_id in ids]
+        target = Target.query.filter_by(employee_id=rep['employee_id'], month=MONTH, year=YEAR).one()
+        assert rates == pytest.approx([0.01, 0.01, 0.015])
+        assert target.achieved_amount == pytest.approx(90000)
+        assert target.achievement_percentage == pytest.approx(0.9)
+
+
+def test_create_social_deal_takes_discount_and_budget_share(app, client, rep):
+    create_project(client, rep['employee_id'], 30000, day=1)
+    create_project(client, rep['employee_id'], 30000, day=2)
+    first = create_project(client, rep['employee_id'], 30000, social=True, day=3)
+    second = create_project(client, rep['employee_id'], 60000, social=True, day=4)
+
+    with app.app_context():
+        first, second = db.session.get(Project, first), db.session.get(Project, second)
+        assert first.commission_rate == pytest.approx(0.01)
+        assert first.marketing_cost_allocated == pytest.approx(900)
+        assert first.final_commission == pytest.approx(0)
+        # 90 ألف قبل الصفقة الرابعة: 0.02 ناقص خصم السوشيال، وحصتها من مجموع سوشيال الشهر
+        assert second.commission_rate == pytest.approx(0.015)
+        assert second.marketing_cost_allocated == pytest.approx(600)
+        assert second.final_commission == pytest.approx(60000 * 0.015 - 600)
@@ -0,0 +1,31 @@
+from src.services.rate_limit import RateLimiter
+
+
+def make_limiter(max_keys):
+    limiter = RateLimiter(shards=1)
+    limiter.max_keys_per_shard = max_keys
+    return limiter
+
+
+def test_eviction_uses_each_bucket_rule():
+    limiter = make_limiter(2)
+    # دلو IP بسعة 20 استُهلك منه 16: ممتلئ بمقياس قاعدة init_admin (3) لكنه ليس ممتلئاً بقاعدته
+    for _ in range(16):
+        limiter.hit('login:ip:1.2.3.4', 20, 20 / 60, 'login:ip')
+    limiter.hit('init_admin:ip:5.6.7.8', 3, 3 / 60, 'init_admin:ip')
+    limiter._shards[0].buckets['init_admin:ip:5.6.7.8'][1] -= 120  # امتلأ مجدداً
+    limiter.hit('init_admin:ip:9.9.9.9', 3, 3 / 60, 'init_admin:ip')
+
+    assert set(limiter._shards[0].buckets) == {'login:ip:1.2.3.4', 'init_admin:ip:9.9.9.9'}
+
+
+def test_throttled_bucket_is_never_evicted():
+    limiter = make_limiter(1)
+    for _ in range(5):
+        assert limiter.hit('login:username:admin', 5, 5 / 60, 'login:username') == 0
+    assert limiter.hit('login:username:admin', 5, 5 / 60, 'login:username') > 0
+
+    # أسماء مستخدمين جديدة تملأ الجزء ولا تعيد ضبط الدلو المرفوض
+    for index in range(10):
+        limiter.hit(f'login:username:user{index}', 5, 5 / 60, 'login:username')
+    assert limiter.hit('login:username:admin', 5, 5 / 60, 'login:username') > 0
@@ -0,0 +1,94 @@
+import pytest
+
+from conftest import MONTH, YEAR, calculate, create_project
+from src.models.event import ChangeEvent
+from src.models.user import db
+from src.models.sales import Commission, Project, Target
+
+NEXT = MONTH + 1
+
+
+@pytest.fixture
+def two_months(app, client, rep):
+    """ثلاث صفقات في الشهر وصفقتان في التالي، بهدف 100 ألف وعمولات محسوبة للشهرين"""
+    with app.app_context():
+        db.session.add(Target(employee_id=rep['employee_id'], month=NEXT, year=YEAR, target_amount=100000))
+        db.session.commit()
+    june = [create_project(client, rep['employee_id'], 30000, day=day) for day in (1, 2, 3)]
+    july = [create_project(client, rep['employee_id'], value, day=day, month=NEXT)
+            for day, value in ((1, 60000), (2, 30000))]
+    calculate(client)
+    calculate(client, month=NEXT)
+    return june, july
+
+
+def month_state(employee_id, month):
+    """نسب مشاريع الشهر بترتيب التوقيع والمحقق وأساس العمولة"""
+    rates = [project.commission_rate for project in Project.query.filter(
+        Project.employee_id == employee_id,
+        db.extract('year', Project.signature_date) == YEAR,
+        db.extract('month', Project.signature_date) == month
+    ).order_by(Project.signature_date, Project.id)]
+    target = Target.query.filter_by(employee_id=employee_id, month=month, year=YEAR).one()
+    commission = Commission.query.filter_by(employee_id=employee_id, month=month, year=YEAR).one()
+    return rates, target.achieved_amount, commission.base_commission
+
+
+def test_moving_deal_reprices_both_months(app, client, rep, auth_headers, two_months):
+    june, _ = two_months
+    assert client.put(f'/api/admin/projects/{june[0]}', json={'signature_date': f'{YEAR}-{NEXT:02d}-05'},
+                      headers=auth_headers).status_code == 200
+
+    with app.app_context():
+        rates, achieved, base = month_state(rep['employee_id'], MONTH)
+        assert rates == pytest.approx([0.01, 0.01])
+        assert achieved == pytest.approx(60000)
+        assert base == pytest.approx(600)
+
+        # 90 ألف قبل الصفقة المنقولة في الشهر التالي: شريحة 2%
+        rates, achieved, base = month_state(rep['employee_id'], NEXT)
+        assert rates == pytest.approx([0.01, 0.015, 0.02])
+        assert achieved == pytest.approx(120000)
+        assert base == pytest.approx(600 + 450 + 600)
+
+        commission = Commission.query.filter_by(employee_id=rep['employee_id'], month=MONTH, year=YEAR).one()
+        assert commission.final_commission == pytest.approx(600 + 4000)
+        assert commission.total_salary == pytest.approx(5000 + 600 + 4000)
+
+
+def test_value_edit_reprices_later_deals(app, client, rep, auth_headers, two_months):
+    june, _ = two_months
+    assert client.put(f'/api/admin/projects/{june[0]}', json={'project_value': 60000},
+                      headers=auth_headers).status_code == 200
+
+    with app.app_context():
+        rates, achieved, base = month_state(rep['employee_id'], MONTH)
+        assert rates == pytest.approx([0.01, 0.015, 0.02])
+        assert achieved == pytest.approx(120000)
+        assert base == pytest.approx(600 + 450 + 600)
+
+
+def test_target_change_reprices_month(app, client, rep, auth_headers, two_months):
+    with app.app_context():
+        target = Target.query.filter_by(employee_id=rep['employee_id'], month=MONTH, year=YEAR).one()
+        target.target_amount = 50000
+        db.session.commit()
+        rates, achieved, _ = month_state(rep['employee_id'], MONTH)
+        assert rates == pytest.approx([0.01, 0.015, 0.025])
+        assert achieved == pytest.approx(90000)
+
+
+def test_recomputed_rows_reach_change_feed(app, client, rep, auth_headers, two_months):
+    june, _ = two_months
+    with app.app_context():
+        last = db.session.query(db.func.max(ChangeEvent.id)).scalar() or 0
+    client.put(f'/api/admin/projects/{june[0]}', json={'project_value': 60000}, headers=auth_headers)
+
+    with app.app_context():
+        events = {(event.table_name, event.row_id) for event in ChangeEvent.query.filter(ChangeEvent.id > last)}
+        target = Target.query.filter_by(employee_id=rep['employee_id'], month=MONTH, year=YEAR).one()
+        commission = Commission.query.filter_by(employee_id=rep['employee_id'], month=MONTH, year=YEAR).one()
+        # الصفقتان اللاحقتان تغيرت نسبتهما بإعادة التسعير لا بتعديل مباشر
+        assert {('projects', june[1]), ('projects', june[2])} <= events
+        assert ('targets', target.id) in events
+        assert ('commissions', commission.id) in events
@@ -0,0 +1,40 @@
+import os
+
+from flask import Flask
+
+from src.services.static_assets import StaticAssets
+
+
+def write(root, relative, text, mtime):
+    path = os.path.join(root, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as handle:
+        handle.write(text)
+    os.utime(path, (mtime, mtime))
+
+
+def make_assets(root):
+    app = Flask(__name__, static_folder=str(root))
+    app.config['STATIC_INDEX_TTL'] = 0
+    return StaticAssets(app)
+
+
+def test_new_index_rebuilds_manifest(tmp_path):
+    write(tmp_path, 'index.html', '<script src="/assets/index-aaaaaaaa.js">', 1000)
+    write(tmp_path, 'assets/index-aaaaaaaa.js', 'old()', 1000)
+    assets = make_assets(tmp_path)
+
+    # نشر جديد دون إعادة تشغيل: index.html وملف JS جديد ببصمة أخرى
+    write(tmp_path, 'index.html', '<script src="/assets/index-bbbbbbbb.js">', 2000)
+    write(tmp_path, 'assets/index-bbbbbbbb.js', 'new()', 2000)
+
+    assert b'index-bbbbbbbb' in assets.get('dashboard').body
+    assert assets.get('assets/index-bbbbbbbb.js').body == b'new()'
+
+
+def test_missing_asset_is_not_served_as_index(tmp_path):
+    write(tmp_path, 'index.html', '<html>', 1000)
+    assets = make_assets(tmp_path)
+
+    assert assets.get('assets/index-cccccccc.css') is None
+    assert assets.get('reports/monthly').path == 'index.html'